@@ -0,0 +1,426 @@
+import re
+import time
+
+from http import HTTPStatus
+from urllib.parse import parse_qs
+
+from modules import (
+    batch,
+    pokeapi,
+    funtranslations,
+    hotkeys,
+    httpcache,
+    jsoncodec,
+    metrics,
+    offload,
+    responsecache,
+    sessions,
+)
+
+NOT_FOUND_MESSAGE = (
+    "The requested URL was not found on the server. If you entered the URL "
+    "manually please check your spelling and try again."
+)
+METHOD_NOT_ALLOWED_MESSAGE = "The method is not allowed for the requested URL."
+
+
+class Request:
+    def __init__(self, scope):
+        """
+        Initialise the request
+        :param scope: Dict of the ASGI connection scope
+        """
+        self.args = {
+            key: values[0]
+            for key, values in parse_qs(
+                scope.get("query_string", b"").decode("latin-1")
+            ).items()
+        }
+        # Header names are matched case insensitively
+        self._headers = {
+            name.decode("latin-1").lower(): value.decode("latin-1")
+            for name, value in scope.get("headers", [])
+        }
+
+    def header(self, name):
+        """
+        Gets the value of a request header
+        :param name: String name of the header
+        :return: String value of the header or None
+        """
+        return self._headers.get(name.lower())
+
+
+async def translate_description(item, mode, deadline=None):
+    """
+    Translates a Pokemon description without blocking
+    :param item: Tuple of the TranslationLanguage and String description
+    :param mode: TranslationMode to translate with
+    :param deadline: Number time.monotonic() time the translation must be
+    done by, None waits up to the request timeout
+    :return: A Tuple containing:
+    - Dict of the response data
+    - Integer HTTP Status Code
+    """
+    language, description = item
+    translate = funtranslations.AsyncFunTranslationsAPIWrapper(
+        deadline=deadline
+    )
+    if mode == funtranslations.TranslationMode.LOCAL:
+        return translate.translate_local(description, language)
+    if language == funtranslations.TranslationLanguage.YODA:
+        return await translate.translate_yoda(description)
+    return await translate.translate_shakespeare(description)
+
+
+async def record_hot_key(kind, pokemon_name):
+    """
+    Records a successful lookup as a hot key, merging into the hot key file
+    off the event loop
+    :param kind: String kind of lookup, SPECIES or TRANSLATED
+    :param pokemon_name: String name of the Pokemon looked up
+    """
+    await offload.offloader.run(
+        hotkeys.tracker.blocking, hotkeys.tracker.record, kind, pokemon_name
+    )
+
+
+async def record_found(kind, names, results):
+    """
+    Records every Pokemon of a batch lookup that was found as a hot key,
+    merging into the hot key file off the event loop
+    :param kind: String kind of lookup, SPECIES or TRANSLATED
+    :param names: List of String names of the Pokemon looked up
+    :param results: List of (Dict, Integer HTTP Status Code) Tuples in the
+    same order as names
+    """
+    await offload.offloader.run(
+        hotkeys.tracker.blocking,
+        hotkeys.tracker.record_found,
+        kind,
+        names,
+        results,
+    )
+
+
+def prepare(request, encoded, route_cache_control):
+    """
+    Prepares a response encoded ahead of time, without a body when the
+    client's If-None-Match shows it already holds it
+    :param request: Request being served
+    :param encoded: EncodedResponse to send
+    :param route_cache_control: String Cache-Control header of the route
+    :return: A Tuple containing:
+    - PreparedResponse
+    - Integer HTTP Status Code
+    """
+    prepared = httpcache.prepare(
+        encoded, request.header("If-None-Match"), route_cache_control
+    )
+    return prepared, prepared.status
+
+
+async def get_pokemon(request, pokemon_name):
+    """
+    Gets the details about a specific Pokemon
+    :param request: Request being served
+    :param pokemon_name: String name of the Pokemon to get
+    :return: A Tuple containing:
+    - Dict of the response data or PreparedResponse
+    - Integer HTTP Status Code
+    """
+    key = responsecache.pokemon_key(pokemon_name)
+    encoded = responsecache.responses.get(key)
+    if encoded is not None:
+        await record_hot_key(hotkeys.SPECIES, pokemon_name)
+        return prepare(request, encoded, httpcache.POKEMON_CACHE_CONTROL)
+    poke = pokeapi.AsyncPokeAPIWrapper()
+    result, status_code = await poke.get_pokemon_species_by_name(pokemon_name)
+    if status_code != HTTPStatus.OK:
+        return result, status_code
+    await record_hot_key(hotkeys.SPECIES, pokemon_name)
+    encoded = await offload.offloader.run(
+        pokeapi.species_cache.blocking,
+        lambda: responsecache.responses.store(
+            key, result, responsecache.species_sources(pokemon_name, result)
+        ),
+    )
+    return prepare(request, encoded, httpcache.POKEMON_CACHE_CONTROL)
+
+
+async def get_pokemon_batch(request):
+    """
+    Gets the details about several Pokemon at once, given as a comma
+    separated list in the names parameter, each one looked up as by
+    GET /pokemon/<name>
+    :param request: Request being served
+    :return: A Tuple containing:
+    - Dict of the response data
+    - Integer HTTP Status Code
+    """
+    result, status_code = batch.parse_names(request.args.get("names"))
+    if status_code != HTTPStatus.OK:
+        return result, status_code
+    names = result["names"]
+    poke = pokeapi.AsyncPokeAPIWrapper()
+    results = await batch.executor.async_map(
+        poke.get_pokemon_species_by_name, names
+    )
+    await record_found(hotkeys.SPECIES, names, results)
+    return batch.build_results(names, results), HTTPStatus.OK
+
+
+async def get_pokemon_translated(request, pokemon_name):
+    """
+    Gets the translated Pokemon description and basic information, the mode
+    parameter set to local translates without any network access. The
+    untranslated description is returned, marked as skipped, when the
+    latency budget runs out.
+    :param request: Request being served
+    :param pokemon_name: String name of the Pokemon to get
+    :return: A Tuple containing:
+    - Dict of the response data or PreparedResponse
+    - Integer HTTP Status Code
+    """
+    m_result, m_status_code = funtranslations.parse_translation_mode(
+        request.args.get("mode")
+    )
+    if m_status_code != HTTPStatus.OK:
+        return m_result, m_status_code
+    b_result, b_status_code = funtranslations.parse_latency_budget(
+        request.header(funtranslations.LATENCY_BUDGET_HEADER)
+    )
+    if b_status_code != HTTPStatus.OK:
+        return b_result, b_status_code
+    key = responsecache.translated_key(pokemon_name, m_result["mode"])
+    encoded = responsecache.responses.get(key)
+    if encoded is not None:
+        await record_hot_key(hotkeys.TRANSLATED, pokemon_name)
+        return prepare(request, encoded, httpcache.TRANSLATED_CACHE_CONTROL)
+    deadline = time.monotonic() + b_result["budget"]
+    poke = pokeapi.AsyncPokeAPIWrapper()
+    p_result, p_status_code = await poke.get_pokemon_species_by_name(
+        pokemon_name
+    )
+    # Attempt to translate description if possible
+    if p_status_code == HTTPStatus.OK:
+        await record_hot_key(hotkeys.TRANSLATED, pokemon_name)
+        language = funtranslations.species_translation_language(p_result)
+        t_result, t_status_code = await translate_description(
+            (language, p_result["description"]), m_result["mode"], deadline
+        )
+        if t_status_code == HTTPStatus.OK:
+            blocking = (
+                pokeapi.species_cache.blocking
+                or funtranslations.translation_cache.blocking
+            )
+            sources = await offload.offloader.run(
+                blocking,
+                responsecache.translated_sources,
+                pokemon_name,
+                p_result,
+                language,
+                t_result["translation"],
+                m_result["mode"],
+            )
+            p_result["description"] = t_result["translation"]
+            encoded = await offload.offloader.run(
+                blocking,
+                responsecache.responses.store,
+                key,
+                p_result,
+                sources,
+            )
+            return prepare(
+                request, encoded, httpcache.TRANSLATED_CACHE_CONTROL
+            )
+        if time.monotonic() >= deadline:
+            p_result["translationSkipped"] = True
+        # The untranslated fallback is never kept and is revalidated before
+        # every reuse
+        return prepare(
+            request,
+            responsecache.EncodedResponse.from_result(p_result, None),
+            httpcache.TRANSLATED_CACHE_CONTROL,
+        )
+    return p_result, p_status_code
+
+
+async def get_pokemon_translated_batch(request):
+    """
+    Gets the translated descriptions and basic information of several
+    Pokemon at once, given as a comma separated list in the names parameter,
+    each one looked up as by GET /pokemon/translated/<name>. The mode
+    parameter set to local translates without any network access.
+    :param request: Request being served
+    :return: A Tuple containing:
+    - Dict of the response data
+    - Integer HTTP Status Code
+    """
+    m_result, m_status_code = funtranslations.parse_translation_mode(
+        request.args.get("mode")
+    )
+    if m_status_code != HTTPStatus.OK:
+        return m_result, m_status_code
+    b_result, b_status_code = funtranslations.parse_latency_budget(
+        request.header(funtranslations.LATENCY_BUDGET_HEADER)
+    )
+    if b_status_code != HTTPStatus.OK:
+        return b_result, b_status_code
+    deadline = time.monotonic() + b_result["budget"]
+    result, status_code = batch.parse_names(request.args.get("names"))
+    if status_code != HTTPStatus.OK:
+        return result, status_code
+    names = result["names"]
+    poke = pokeapi.AsyncPokeAPIWrapper()
+    species = await batch.executor.async_map(
+        poke.get_pokemon_species_by_name, names
+    )
+    await record_found(hotkeys.TRANSLATED, names, species)
+    # Translate each distinct description once, whatever the batch size
+    items = batch.translation_items(species)
+    wanted = batch.group_translations(items)
+    translated = await batch.executor.async_map(
+        lambda item: translate_description(item, m_result["mode"], deadline),
+        wanted,
+    )
+    results = batch.apply_translations(
+        species,
+        items,
+        dict(zip(wanted, translated)),
+    )
+    return batch.build_results(names, results), HTTPStatus.OK
+
+
+async def get_metrics(request):
+    """
+    Gets the runtime metrics of this worker process
+    :param request: Request being served
+    :return: A Tuple containing:
+    - Dict of the response data
+    - Integer HTTP Status Code
+    """
+    # Reporting the shared caches queries SQLite, off the event loop
+    result = await offload.offloader.run(True, metrics.registry.snapshot)
+    return result, HTTPStatus.OK
+
+
+# The same routes served by the Flask app, matched against the request path
+ROUTES = [
+    (re.compile(r"^/pokemon/translated$"), get_pokemon_translated_batch),
+    (
+        re.compile(r"^/pokemon/translated/(?P<pokemon_name>[^/]+)$"),
+        get_pokemon_translated,
+    ),
+    (re.compile(r"^/pokemon/(?P<pokemon_name>[^/]+)$"), get_pokemon),
+    (re.compile(r"^/pokemon$"), get_pokemon_batch),
+    (re.compile(r"^/metrics$"), get_metrics),
+]
+
+# Preload the caches with the hottest keys before gunicorn forks the workers,
+# the blocking wrappers are used as no event loop is running yet
+hotkeys.warm_on_start()
+
+
+def resolve(path):
+    """
+    Finds the handler of a request path
+    :param path: String path of the request
+    :return: A Tuple containing:
+    - Callable handler or None when no route matches
+    - Dict of the keyword arguments to call the handler with
+    """
+    for pattern, handler in ROUTES:
+        match = pattern.match(path)
+        if match is not None:
+            return handler, match.groupdict()
+    return None, {}
+
+
+async def send_json(send, result, status_code):
+    """
+    Sends a JSON response in the same format as the Flask app
+    :param send: ASGI send callable
+    :param result: Dict of the response data
+    :param status_code: Integer HTTP Status Code
+    """
+    body = jsoncodec.dumps(result) + b"\n"
+    await send(
+        {
+            "type": "http.response.start",
+            "status": int(status_code),
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+async def send_prepared(send, prepared):
+    """
+    Writes a prepared response straight to the client
+    :param send: ASGI send callable
+    :param prepared: PreparedResponse to send
+    """
+    await send(
+        {
+            "type": "http.response.start",
+            "status": int(prepared.status),
+            "headers": [
+                (name.lower().encode("latin-1"), value.encode("latin-1"))
+                for name, value in prepared.headers
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": prepared.body})
+
+
+async def lifespan(receive, send):
+    """
+    Handles the ASGI lifespan protocol, closing pooled connections on shutdown
+    :param receive: ASGI receive callable
+    :param send: ASGI send callable
+    """
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await sessions.async_pool.close()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    """
+    The ASGI application, serves the same routes and JSON responses as the
+    Flask app without blocking on upstream requests
+    :param scope: Dict of the ASGI connection scope
+    :param receive: ASGI receive callable
+    :param send: ASGI send callable
+    """
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+
+    handler, kwargs = resolve(scope["path"])
+    if handler is None:
+        await send_json(
+            send, {"message": NOT_FOUND_MESSAGE}, HTTPStatus.NOT_FOUND
+        )
+    elif scope["method"] not in ("GET", "HEAD"):
+        await send_json(
+            send,
+            {"message": METHOD_NOT_ALLOWED_MESSAGE},
+            HTTPStatus.METHOD_NOT_ALLOWED,
+        )
+    else:
+        result, status_code = await handler(Request(scope), **kwargs)
+        if isinstance(result, httpcache.PreparedResponse):
+            await send_prepared(send, result)
+        else:
+            await send_json(send, result, status_code)
@@ -0,0 +1,232 @@
+import os
+import asyncio
+import threading
+
+from http import HTTPStatus
+
+from modules import (
+    funtranslations,
+    metrics,
+    offload,
+    sessions,
+    speciesindex,
+)
+
+
+class BatchExecutor:
+    # Most Pokemon a single batch request may ask for
+    MAX_ITEMS = int(os.environ.get("BATCH_MAX_ITEMS", 50))
+    # Upstream lookups a single batch request may run at the same time,
+    # defaults to the pooled connections per upstream host
+    MAX_FAN_OUT = int(
+        os.environ.get("BATCH_MAX_FAN_OUT", sessions.SessionPool.POOL_MAXSIZE)
+    )
+    # Threads per worker shared by every batch request
+    MAX_WORKERS = int(os.environ.get("BATCH_MAX_WORKERS", 16))
+
+    def __init__(self, max_workers=16, max_fan_out=6, pool_size=None):
+        """
+        Initialise the executor
+        :param max_workers: Integer number of threads shared by every batch
+        :param max_fan_out: Integer number of items a single batch may run
+        at the same time
+        :param pool_size: Integer pooled connections per upstream host of
+        the threaded server, None leaves the fan-out uncapped
+        """
+        self.max_workers = max_workers
+        self.max_fan_out = max(max_fan_out, 1)
+        # A threaded batch never runs more lookups than there are pooled
+        # connections, urllib3 discards the connections opened beyond them
+        self.threaded_fan_out = self.max_fan_out
+        if pool_size is not None:
+            self.threaded_fan_out = max(min(self.max_fan_out, pool_size), 1)
+        self._lock = threading.Lock()
+        self._threads = offload.ForkSafeExecutor(max_workers)
+        self._counters = {}
+        self._reset_counters()
+
+    def _reset_counters(self):
+        """
+        Resets the statistics counters, the caller must hold the lock
+        """
+        self._counters = {"batches": 0, "items": 0, "deduplicated": 0}
+
+    def shutdown(self):
+        """
+        Waits for the lookups of every batch and stops the shared threads,
+        the next batch starts new ones
+        """
+        self._threads.shutdown()
+
+    def _count(self, items, unique):
+        """
+        Records the size of a batch
+        :param items: List of every item requested
+        :param unique: List of the distinct items requested
+        """
+        with self._lock:
+            self._counters["batches"] += 1
+            self._counters["items"] += len(items)
+            self._counters["deduplicated"] += len(items) - len(unique)
+
+    def map(self, fn, items):
+        """
+        Runs fn for every distinct item concurrently, with no more than
+        threaded_fan_out items in flight at once
+        :param fn: Callable taking a single item
+        :param items: List of hashable items
+        :return: List of the result of fn for each item, in the same order
+        """
+        unique = list(dict.fromkeys(items))
+        self._count(items, unique)
+        if len(unique) == 1:
+            # Not worth a thread hop
+            return [fn(unique[0])] * len(items)
+
+        executor = self._threads.get()
+        slots = threading.BoundedSemaphore(self.threaded_fan_out)
+        futures = {}
+        for item in unique:
+            slots.acquire()
+            future = executor.submit(fn, item)
+            future.add_done_callback(lambda _: slots.release())
+            futures[item] = future
+        results = {item: future.result() for item, future in futures.items()}
+        return [results[item] for item in items]
+
+    async def async_map(self, fn, items):
+        """
+        Awaits fn for every distinct item concurrently, with no more than
+        max_fan_out items in flight at once
+        :param fn: Callable taking a single item and returning an awaitable
+        :param items: List of hashable items
+        :return: List of the result of fn for each item, in the same order
+        """
+        unique = list(dict.fromkeys(items))
+        self._count(items, unique)
+        slots = asyncio.Semaphore(self.max_fan_out)
+
+        async def run(item):
+            async with slots:
+                return await fn(item)
+
+        results = await asyncio.gather(*[run(item) for item in unique])
+        results = dict(zip(unique, results))
+        return [results[item] for item in items]
+
+    def stats(self):
+        """
+        Reports how many batches and items were run
+        :return: Dict of the batch statistics
+        """
+        with self._lock:
+            return dict(self._counters)
+
+    def reset(self):
+        """
+        Resets the statistics counters
+        """
+        with self._lock:
+            self._reset_counters()
+
+
+def parse_names(names):
+    """
+    Parses the comma separated Pokemon names of a batch request
+    :param names: String comma separated names, may be None
+    :return: A Tuple containing:
+    - Dict of the normalised names under "names" or an error message
+    - Integer HTTP Status Code
+    """
+    parsed = [
+        speciesindex.normalise_name(name)
+        for name in (names or "").split(",")
+        if name.strip()
+    ]
+    if not parsed:
+        return {
+            "message": "Error: No Pokemon names given"
+        }, HTTPStatus.BAD_REQUEST
+    if len(parsed) > BatchExecutor.MAX_ITEMS:
+        return {
+            "message": f"Error: At most {BatchExecutor.MAX_ITEMS} Pokemon "
+            "may be requested at once"
+        }, HTTPStatus.BAD_REQUEST
+    return {"names": parsed}, HTTPStatus.OK
+
+
+def translation_items(species_results):
+    """
+    Picks the translation each species of a batch needs, following the same
+    rule as a single translated lookup
+    :param species_results: List of (Dict, Integer HTTP Status Code) Tuples
+    :return: List of (TranslationLanguage, String description) Tuples in the
+    same order, None for species that could not be found
+    """
+    items = []
+    for result, status_code in species_results:
+        if status_code != HTTPStatus.OK:
+            items.append(None)
+            continue
+        language = funtranslations.species_translation_language(result)
+        items.append((language, result["description"]))
+    return items
+
+
+def group_translations(items):
+    """
+    Groups the translations of a batch by language, dropping duplicate texts
+    so each distinct text is only translated once
+    :param items: List of (TranslationLanguage, String text) Tuples or None
+    :return: List of the distinct (TranslationLanguage, String text) Tuples
+    """
+    unique = {item for item in items if item is not None}
+    return sorted(unique, key=lambda item: (item[0].name, item[1]))
+
+
+def apply_translations(species_results, items, translations):
+    """
+    Replaces each species description with its translation when translating
+    it succeeded, marking it as skipped when the latency budget ran out
+    before it could be translated
+    :param species_results: List of (Dict, Integer HTTP Status Code) Tuples
+    :param items: List of translation items from translation_items
+    :param translations: Dict of translation item to (Dict, Integer HTTP
+    Status Code) Tuple of the translation response
+    :return: List of (Dict, Integer HTTP Status Code) Tuples
+    """
+    results = []
+    for (result, status_code), item in zip(species_results, items):
+        if item is not None:
+            t_result, t_status_code = translations[item]
+            if t_status_code == HTTPStatus.OK:
+                result = dict(result, description=t_result["translation"])
+            elif t_status_code == HTTPStatus.GATEWAY_TIMEOUT:
+                result = dict(result, translationSkipped=True)
+        results.append((result, status_code))
+    return results
+
+
+def build_results(names, results):
+    """
+    Builds the body of a batch response
+    :param names: List of the names requested
+    :param results: List of (Dict, Integer HTTP Status Code) Tuples in the
+    same order as names
+    :return: Dict of the per item results and status codes
+    """
+    return {
+        "results": [
+            {"name": name, "status": int(status_code), "result": result}
+            for name, (result, status_code) in zip(names, results)
+        ]
+    }
+
+
+# The process wide executor shared by every batch request
+executor = BatchExecutor(
+    BatchExecutor.MAX_WORKERS,
+    BatchExecutor.MAX_FAN_OUT,
+    pool_size=sessions.SessionPool.POOL_MAXSIZE,
+)
+metrics.registry.register_source("batch", executor.stats)
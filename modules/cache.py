@@ -0,0 +1,662 @@
+import os
+import re
+import abc
+import sys
+import json
+import time
+import sqlite3
+import threading
+
+from collections import OrderedDict
+
+
+def estimate_size(value):
+    """
+    Estimates the memory used by a value and everything it contains
+    :param value: The value to measure
+    :return: Integer size in bytes
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += estimate_size(key) + estimate_size(item)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for item in value:
+            size += estimate_size(item)
+    elif hasattr(value, "__slots__"):
+        for slot in value.__slots__:
+            size += estimate_size(getattr(value, slot, None))
+    return size
+
+
+def encode_value(value):
+    """
+    Encodes a value stored in a shared cache as JSON, values such as compact
+    records that are not plain JSON are stored as their to_dict() Dict
+    :param value: The value to encode
+    :return: String JSON document
+    """
+
+    def default(item):
+        if not hasattr(item, "to_dict"):
+            raise TypeError(f"{type(item).__name__} is not JSON serializable")
+        return item.to_dict()
+
+    return json.dumps(value, default=default)
+
+
+# Cache backend used by both API wrappers, "memory" keeps a cache in every
+# worker process while "shared" keeps one SQLite cache per host that every
+# worker reads from
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "memory")
+# Path of the SQLite database used by the shared backend, this should be on
+# a memory backed filesystem such as /dev/shm
+CACHE_SHARED_PATH = os.environ.get(
+    "CACHE_SHARED_PATH", "/dev/shm/pokedex-cache.sqlite3"
+)
+
+
+def build_cache(name, max_entries, ttl=None, max_bytes=None, stale_ttl=0):
+    """
+    Builds a cache using the configured backend
+    :param name: String name of the cache, used as the shared table name
+    :param max_entries: Integer maximum number of entries held
+    :param ttl: Number of seconds an entry stays fresh, None never expires
+    :param max_bytes: Integer memory ceiling of an in process cache
+    :param stale_ttl: Number of seconds an expired entry may still be served
+    stale
+    :return: Cache
+    """
+    if CACHE_BACKEND == "memory":
+        return LRUCache(
+            max_entries=max_entries,
+            ttl=ttl,
+            max_bytes=max_bytes,
+            stale_ttl=stale_ttl,
+        )
+    if CACHE_BACKEND == "shared":
+        return SQLiteCache(
+            CACHE_SHARED_PATH,
+            max_entries=max_entries,
+            ttl=ttl,
+            stale_ttl=stale_ttl,
+            table=name,
+        )
+    raise RuntimeError(f"Unknown cache backend '{CACHE_BACKEND}'")
+
+
+class Cache(abc.ABC):
+    """
+    The interface shared by every cache backend
+    """
+
+    # Whether reading or writing the cache may block on disk
+    blocking = False
+    # Callables told about every entry stored or removed, see subscribe()
+    _listeners = ()
+
+    def subscribe(self, listener):
+        """
+        Registers a callable told whenever this process stores or removes an
+        entry, so values derived from an entry can be dropped with it
+        :param listener: Callable taking the key of the changed entry, None
+        when every entry was removed
+        """
+        self._listeners = self._listeners + (listener,)
+
+    def _notify(self, key):
+        """
+        Tells every listener an entry was stored or removed
+        :param key: The key of the entry, None when every entry was removed
+        """
+        for listener in self._listeners:
+            listener(key)
+
+    def get(self, key, default=None):
+        """
+        Gets a fresh value from the cache
+        :param key: The key of the entry
+        :param default: The value returned when there is no fresh entry
+        :return: The cached value or the default
+        """
+        entry = self.get_entry(key)
+        if entry is None or not entry[1]:
+            return default
+        return entry[0]
+
+    @abc.abstractmethod
+    def get_entry(self, key):
+        """
+        Gets a value from the cache along with whether it is still fresh,
+        expired values are returned until their stale period ends
+        :param key: The key of the entry
+        :return: A Tuple of the value and Boolean freshness, or None
+        """
+
+    @abc.abstractmethod
+    def time_left(self, key):
+        """
+        Gets how long an entry stays fresh, without counting a lookup
+        :param key: The key of the entry
+        :return: Number of seconds, 0 when there is no fresh entry, None when
+        the entry never expires
+        """
+
+    @abc.abstractmethod
+    def set(self, key, value, ttl=None):
+        """
+        Stores a value in the cache
+        :param key: The key of the entry
+        :param value: The value to store
+        :param ttl: Number of seconds the entry stays fresh
+        """
+
+    @abc.abstractmethod
+    def delete(self, key):
+        """
+        Removes an entry from the cache if present
+        :param key: The key of the entry
+        """
+
+    @abc.abstractmethod
+    def clear(self):
+        """
+        Removes every entry and resets the statistics
+        """
+
+    @abc.abstractmethod
+    def stats(self):
+        """
+        Reports the statistics of the cache
+        :return: Dict of the cache statistics
+        """
+
+
+class LRUCache(Cache):
+    def __init__(
+        self,
+        max_entries=1024,
+        ttl=None,
+        max_bytes=None,
+        stale_ttl=0,
+        clock=time.monotonic,
+    ):
+        """
+        Initialise the cache
+        :param max_entries: Integer maximum number of entries held
+        :param ttl: Number of seconds an entry stays fresh, None never expires
+        :param max_bytes: Integer memory ceiling of all entries, None is
+        unbounded
+        :param stale_ttl: Number of seconds an expired entry may still be
+        served stale
+        :param clock: Callable returning the current time in seconds
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stale_ttl = stale_ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        # Key to a Tuple of (value, expiry time, size in bytes)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._counters = {}
+        self._reset_counters()
+
+    def _reset_counters(self):
+        """
+        Resets the statistics counters, the caller must hold the lock
+        """
+        self._counters = {
+            "hits": 0,
+            "staleHits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+
+    def _remove(self, key):
+        """
+        Removes an entry, the caller must hold the lock
+        :param key: The key of the entry
+        """
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def get_entry(self, key):
+        """
+        Gets a value from the cache along with whether it is still fresh,
+        expired values are returned until their stale period ends
+        :param key: The key of the entry
+        :return: A Tuple of the value and Boolean freshness, or None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+            value, expires_at, _ = entry
+            now = self._clock()
+            fresh = expires_at is None or expires_at > now
+            if not fresh and expires_at + self.stale_ttl <= now:
+                self._remove(key)
+                self._counters["expirations"] += 1
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters["hits" if fresh else "staleHits"] += 1
+            return value, fresh
+
+    def time_left(self, key):
+        """
+        Gets how long an entry stays fresh, without counting a lookup
+        :param key: The key of the entry
+        :return: Number of seconds, 0 when there is no fresh entry, None when
+        the entry never expires
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return 0
+        expires_at = entry[1]
+        if expires_at is None:
+            return None
+        return max(expires_at - self._clock(), 0)
+
+    def set(self, key, value, ttl=None):
+        """
+        Stores a value in the cache, evicting the least recently used entries
+        when the cache is full
+        :param key: The key of the entry
+        :param value: The value to store
+        :param ttl: Number of seconds the entry stays fresh, defaults to the
+        cache TTL
+        """
+        if self.max_entries <= 0:
+            return
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = None if ttl is None else self._clock() + ttl
+        size = estimate_size(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, expires_at, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or (
+                self.max_bytes is not None and self._bytes > self.max_bytes
+            ):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._counters["evictions"] += 1
+        self._notify(key)
+
+    def delete(self, key):
+        """
+        Removes an entry from the cache if present
+        :param key: The key of the entry
+        """
+        with self._lock:
+            if key not in self._entries:
+                return
+            self._remove(key)
+        self._notify(key)
+
+    def clear(self):
+        """
+        Removes every entry and resets the statistics
+        """
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._reset_counters()
+        self._notify(None)
+
+    def stats(self):
+        """
+        Reports the size and hit/miss/eviction counters of the cache
+        :return: Dict of the cache statistics
+        """
+        with self._lock:
+            result = dict(self._counters)
+            result["entries"] = len(self._entries)
+            result["bytes"] = self._bytes
+            result["avgEntryBytes"] = (
+                round(self._bytes / len(self._entries)) if self._entries else 0
+            )
+        return result
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class SQLiteCache(Cache):
+    # Number of writes between each prune of expired and excess entries
+    PRUNE_INTERVAL = 256
+
+    blocking = True
+
+    def __init__(
+        self,
+        path,
+        max_entries=None,
+        ttl=None,
+        stale_ttl=0,
+        table="cache",
+        clock=time.time,
+    ):
+        """
+        Initialise the cache
+        :param path: String path of the SQLite database file
+        :param max_entries: Integer maximum number of entries kept, None is
+        unbounded
+        :param ttl: Number of seconds an entry stays fresh, None never expires
+        :param stale_ttl: Number of seconds an expired entry may still be
+        served stale
+        :param table: String name of the table, letting several caches share
+        one database file
+        :param clock: Callable returning the current wall clock time
+        """
+        if not re.match(r"^[A-Za-z_][A-Za-z0-9_]*$", table):
+            raise ValueError(f"Invalid cache table name '{table}'")
+        self.path = path
+        self.table = table
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._clock = clock
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._counters = {}
+        self._reset_counters()
+
+    def _reset_counters(self):
+        """
+        Resets the statistics counters
+        """
+        self._counters = {"hits": 0, "staleHits": 0, "misses": 0, "errors": 0}
+
+    def _count(self, name):
+        """
+        Increments a statistics counter
+        :param name: String name of the counter
+        """
+        with self._lock:
+            self._counters[name] += 1
+
+    def _connection(self):
+        """
+        Gets the SQLite connection of the current thread, opening it if
+        needed. Connections are never shared across threads or processes.
+        :return: sqlite3.Connection
+        """
+        connection = getattr(self._local, "connection", None)
+        if connection is not None and self._local.pid == os.getpid():
+            return connection
+        connection = sqlite3.connect(self.path, timeout=5)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+        )
+        connection.commit()
+        self._local.connection = connection
+        self._local.pid = os.getpid()
+        return connection
+
+    @staticmethod
+    def _encode_key(key):
+        """
+        Encodes a cache key into the string stored in the database
+        :param key: String or Tuple key of the entry
+        :return: String encoded key
+        """
+        return json.dumps(key, separators=(",", ":"))
+
+    def get_entry(self, key):
+        """
+        Gets a value from the cache along with whether it is still fresh,
+        expired values are returned until their stale period ends
+        :param key: String or Tuple key of the entry
+        :return: A Tuple of the value and Boolean freshness, or None
+        """
+        try:
+            row = (
+                self._connection()
+                .execute(
+                    f"SELECT value, expires_at FROM {self.table} "
+                    "WHERE key = ?",
+                    (self._encode_key(key),),
+                )
+                .fetchone()
+            )
+        except sqlite3.Error:
+            self._count("errors")
+            return None
+        if row is None:
+            self._count("misses")
+            return None
+        value, expires_at = row
+        now = self._clock()
+        fresh = expires_at is None or expires_at > now
+        if not fresh and expires_at + self.stale_ttl <= now:
+            self._count("misses")
+            return None
+        self._count("hits" if fresh else "staleHits")
+        return json.loads(value), fresh
+
+    def time_left(self, key):
+        """
+        Gets how long an entry stays fresh, without counting a lookup
+        :param key: String or Tuple key of the entry
+        :return: Number of seconds, 0 when there is no fresh entry, None when
+        the entry never expires
+        """
+        try:
+            row = (
+                self._connection()
+                .execute(
+                    f"SELECT expires_at FROM {self.table} WHERE key = ?",
+                    (self._encode_key(key),),
+                )
+                .fetchone()
+            )
+        except sqlite3.Error:
+            self._count("errors")
+            return 0
+        if row is None:
+            return 0
+        if row[0] is None:
+            return None
+        return max(row[0] - self._clock(), 0)
+
+    def set(self, key, value, ttl=None):
+        """
+        Stores a JSON serialisable value in the cache
+        :param key: String or Tuple key of the entry
+        :param value: The value to store
+        :param ttl: Number of seconds the entry stays fresh, defaults to the
+        cache TTL
+        """
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = None if ttl is None else self._clock() + ttl
+        try:
+            connection = self._connection()
+            with connection:
+                connection.execute(
+                    f"INSERT OR REPLACE INTO {self.table} "
+                    "(key, value, expires_at) VALUES (?, ?, ?)",
+                    (self._encode_key(key), encode_value(value), expires_at),
+                )
+            with self._lock:
+                self._writes += 1
+                prune = self._writes % SQLiteCache.PRUNE_INTERVAL == 0
+            if prune:
+                self.prune()
+        except sqlite3.Error:
+            self._count("errors")
+        self._notify(key)
+
+    def prune(self):
+        """
+        Removes entries past their stale period and the oldest entries beyond
+        max_entries
+        """
+        try:
+            connection = self._connection()
+            with connection:
+                connection.execute(
+                    f"DELETE FROM {self.table} WHERE expires_at <= ?",
+                    (self._clock() - self.stale_ttl,),
+                )
+                if self.max_entries is not None:
+                    connection.execute(
+                        f"DELETE FROM {self.table} WHERE rowid NOT IN ("
+                        f"SELECT rowid FROM {self.table} ORDER BY rowid DESC "
+                        "LIMIT ?)",
+                        (self.max_entries,),
+                    )
+        except sqlite3.Error:
+            self._count("errors")
+
+    def delete(self, key):
+        """
+        Removes an entry from the cache if present
+        :param key: String or Tuple key of the entry
+        """
+        try:
+            connection = self._connection()
+            with connection:
+                connection.execute(
+                    f"DELETE FROM {self.table} WHERE key = ?",
+                    (self._encode_key(key),),
+                )
+        except sqlite3.Error:
+            self._count("errors")
+        self._notify(key)
+
+    def clear(self):
+        """
+        Removes every entry and resets the statistics
+        """
+        try:
+            connection = self._connection()
+            with connection:
+                connection.execute(f"DELETE FROM {self.table}")
+        except sqlite3.Error:
+            self._count("errors")
+        with self._lock:
+            self._reset_counters()
+        self._notify(None)
+
+    def stats(self):
+        """
+        Reports the size and hit/miss counters of the cache
+        :return: Dict of the cache statistics
+        """
+        with self._lock:
+            result = dict(self._counters)
+        try:
+            result["entries"] = (
+                self._connection()
+                .execute(f"SELECT COUNT(*) FROM {self.table}")
+                .fetchone()[0]
+            )
+        except sqlite3.Error:
+            result["entries"] = None
+        return result
+
+
+class TieredCache(Cache):
+    def __init__(self, front, back=None):
+        """
+        Initialise the cache
+        :param front: The fast in process cache checked first
+        :param back: The slower persistent cache behind it, None disables it
+        """
+        self.front = front
+        self.back = back
+
+    @property
+    def blocking(self):
+        """
+        Gets whether reading or writing the cache may block on disk
+        :return: Boolean
+        """
+        return self.front.blocking or self.back is not None
+
+    def get_entry(self, key):
+        """
+        Gets a value from the front cache, falling back to the back cache when
+        the front has no fresh value and promoting fresh values found there
+        :param key: The key of the entry
+        :return: A Tuple of the value and Boolean freshness, or None
+        """
+        entry = self.front.get_entry(key)
+        if (entry is not None and entry[1]) or self.back is None:
+            return entry
+        back_entry = self.back.get_entry(key)
+        if back_entry is None:
+            return entry
+        if back_entry[1]:
+            self.front.set(key, back_entry[0])
+            return back_entry
+        return entry or back_entry
+
+    def time_left(self, key):
+        """
+        Gets how long an entry stays fresh in the front cache, or the back
+        cache when the front has no fresh entry
+        :param key: The key of the entry
+        :return: Number of seconds, 0 when there is no fresh entry, None when
+        the entry never expires
+        """
+        left = self.front.time_left(key)
+        if left == 0 and self.back is not None:
+            return self.back.time_left(key)
+        return left
+
+    def set(self, key, value, ttl=None):
+        """
+        Stores a value in both caches
+        :param key: The key of the entry
+        :param value: The value to store
+        :param ttl: Number of seconds the entry stays fresh
+        """
+        self.front.set(key, value, ttl)
+        if self.back is not None:
+            self.back.set(key, value, ttl)
+        self._notify(key)
+
+    def delete(self, key):
+        """
+        Removes an entry from both caches
+        :param key: The key of the entry
+        """
+        self.front.delete(key)
+        if self.back is not None:
+            self.back.delete(key)
+        self._notify(key)
+
+    def clear(self):
+        """
+        Removes every entry from both caches
+        """
+        self.front.clear()
+        if self.back is not None:
+            self.back.clear()
+        self._notify(None)
+
+    def stats(self):
+        """
+        Reports the statistics of both caches
+        :return: Dict of the cache statistics
+        """
+        result = {"front": self.front.stats()}
+        if self.back is not None:
+            result["back"] = self.back.stats()
+        return result
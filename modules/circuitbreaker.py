@@ -0,0 +1,226 @@
+import os
+import time
+import threading
+
+from enum import Enum
+from collections import deque
+
+from modules import metrics
+
+
+class CircuitState(Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "halfOpen"
+
+
+class CircuitBreaker:
+    # Number of recent upstream calls the failure and slow call rates are
+    # taken from
+    WINDOW = int(os.environ.get("CIRCUIT_BREAKER_WINDOW", 20))
+    # Calls needed in the window before the circuit may open
+    MIN_CALLS = int(os.environ.get("CIRCUIT_BREAKER_MIN_CALLS", 10))
+    # Share of failed calls in the window that opens the circuit
+    FAILURE_RATE = float(os.environ.get("CIRCUIT_BREAKER_FAILURE_RATE", 0.5))
+    # Seconds after which a successful call still counts as slow
+    SLOW_CALL_SECONDS = float(
+        os.environ.get("CIRCUIT_BREAKER_SLOW_CALL_SECONDS", 5)
+    )
+    # Share of slow calls in the window that opens the circuit
+    SLOW_CALL_RATE = float(
+        os.environ.get("CIRCUIT_BREAKER_SLOW_CALL_RATE", 0.8)
+    )
+    # Seconds the circuit stays open before probe calls are let through
+    OPEN_SECONDS = float(os.environ.get("CIRCUIT_BREAKER_OPEN_SECONDS", 30))
+    # Number of probe calls let through while half-open, the circuit closes
+    # once they all succeed
+    HALF_OPEN_CALLS = int(os.environ.get("CIRCUIT_BREAKER_HALF_OPEN_CALLS", 1))
+
+    def __init__(
+        self,
+        window=20,
+        min_calls=10,
+        failure_rate=0.5,
+        slow_call_seconds=5.0,
+        slow_call_rate=0.8,
+        open_seconds=30.0,
+        half_open_calls=1,
+        clock=time.monotonic,
+    ):
+        """
+        Initialise the breaker
+        :param window: Integer number of recent calls the rates are taken from
+        :param min_calls: Integer calls needed before the circuit may open
+        :param failure_rate: Number share of failed calls opening the circuit
+        :param slow_call_seconds: Number of seconds a slow call takes
+        :param slow_call_rate: Number share of slow calls opening the circuit
+        :param open_seconds: Number of seconds the circuit stays open
+        :param half_open_calls: Integer number of probe calls while half-open
+        :param clock: Callable returning the current monotonic time
+        """
+        self.window = max(window, 1)
+        self.min_calls = max(min(min_calls, self.window), 1)
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.half_open_calls = max(half_open_calls, 1)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CircuitState.CLOSED
+        self._opened_at = 0.0
+        self._calls = deque(maxlen=self.window)
+        self._probes = 0
+        self._probe_successes = 0
+        self._counters = {}
+        self._reset_counters()
+
+    def _reset_counters(self):
+        """
+        Resets the statistics counters, the caller must hold the lock
+        """
+        self._counters = {"opened": 0, "rejected": 0}
+
+    def _update_state(self):
+        """
+        Moves an open circuit to half-open once it has been open long
+        enough, the caller must hold the lock
+        """
+        if (
+            self._state is CircuitState.OPEN
+            and self._clock() - self._opened_at >= self.open_seconds
+        ):
+            self._state = CircuitState.HALF_OPEN
+            self._probes = 0
+            self._probe_successes = 0
+
+    def _open(self):
+        """
+        Opens the circuit, the caller must hold the lock
+        """
+        self._state = CircuitState.OPEN
+        self._opened_at = self._clock()
+        self._calls.clear()
+        self._counters["opened"] += 1
+
+    def state(self):
+        """
+        Gets the current state of the circuit
+        :return: CircuitState
+        """
+        with self._lock:
+            self._update_state()
+            return self._state
+
+    def allow(self):
+        """
+        Checks whether a call may be sent upstream, every allowed call must
+        be followed by a call to record
+        :return: Boolean whether the call may be sent
+        """
+        with self._lock:
+            self._update_state()
+            if self._state is CircuitState.CLOSED:
+                return True
+            if (
+                self._state is CircuitState.HALF_OPEN
+                and self._probes < self.half_open_calls
+            ):
+                self._probes += 1
+                return True
+            self._counters["rejected"] += 1
+            return False
+
+    def record(self, success, seconds=0.0):
+        """
+        Records the outcome of a call that was allowed through
+        :param success: Boolean whether the upstream answered healthily
+        :param seconds: Number of seconds the call took
+        """
+        slow = seconds >= self.slow_call_seconds
+        with self._lock:
+            if self._state is CircuitState.HALF_OPEN:
+                if not success or slow:
+                    self._open()
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_calls:
+                    self._state = CircuitState.CLOSED
+                return
+            if self._state is not CircuitState.CLOSED:
+                return
+            self._calls.append((success, slow))
+            if len(self._calls) < self.min_calls:
+                return
+            failures = sum(1 for ok, _ in self._calls if not ok)
+            slow_calls = sum(1 for _, is_slow in self._calls if is_slow)
+            if (
+                failures / len(self._calls) >= self.failure_rate
+                or slow_calls / len(self._calls) >= self.slow_call_rate
+            ):
+                self._open()
+
+    def stats(self):
+        """
+        Reports the state of the circuit and its recent call outcomes
+        :return: Dict of the circuit breaker statistics
+        """
+        with self._lock:
+            self._update_state()
+            calls = len(self._calls)
+            failures = sum(1 for ok, _ in self._calls if not ok)
+            slow_calls = sum(1 for _, is_slow in self._calls if is_slow)
+            result = dict(self._counters)
+            result["state"] = self._state.value
+            result["calls"] = calls
+            result["failureRate"] = round(failures / calls, 4) if calls else 0
+            result["slowCallRate"] = (
+                round(slow_calls / calls, 4) if calls else 0
+            )
+        return result
+
+    def reset(self):
+        """
+        Closes the circuit and forgets every recorded call
+        """
+        with self._lock:
+            self._state = CircuitState.CLOSED
+            self._calls.clear()
+            self._probes = 0
+            self._probe_successes = 0
+            self._reset_counters()
+
+
+def build_breaker():
+    """
+    Builds a circuit breaker from the environment configuration
+    :return: CircuitBreaker
+    """
+    return CircuitBreaker(
+        window=CircuitBreaker.WINDOW,
+        min_calls=CircuitBreaker.MIN_CALLS,
+        failure_rate=CircuitBreaker.FAILURE_RATE,
+        slow_call_seconds=CircuitBreaker.SLOW_CALL_SECONDS,
+        slow_call_rate=CircuitBreaker.SLOW_CALL_RATE,
+        open_seconds=CircuitBreaker.OPEN_SECONDS,
+        half_open_calls=CircuitBreaker.HALF_OPEN_CALLS,
+    )
+
+
+# The process wide circuit breaker of each upstream API
+pokeapi = build_breaker()
+funtranslations = build_breaker()
+
+
+def stats():
+    """
+    Reports the circuit breaker of each upstream API
+    :return: Dict of upstream name to Dict of circuit breaker statistics
+    """
+    return {
+        "pokeapi": pokeapi.stats(),
+        "funtranslations": funtranslations.stats(),
+    }
+
+
+metrics.registry.register_source("circuitBreakers", stats)
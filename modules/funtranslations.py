@@ -1,30 +1,208 @@
 import os
+import time
+import asyncio
+import hashlib
 import requests
 
 from http import HTTPStatus
 from enum import Enum, auto
 
+from modules import (
+    cache,
+    circuitbreaker,
+    jsoncodec,
+    localtranslations,
+    metrics,
+    offload,
+    ratelimit,
+    refresh,
+    retry,
+    sessions,
+    singleflight,
+    timeouts,
+)
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - only needed by the async mode
+    httpx = None
+
+
+# Header a client sets to override the latency budget of a translated request
+LATENCY_BUDGET_HEADER = "X-Latency-Budget"
+
 
 class TranslationLanguage(Enum):
     YODA = auto()
     SHAKESPEARE = auto()
 
 
-class FunTranslationsAPIWrapper:
+class TranslationMode(Enum):
+    REMOTE = "remote"
+    LOCAL = "local"
+
+
+def parse_translation_mode(mode):
+    """
+    Parses the translation mode requested by a client
+    :param mode: String mode, None for the default remote mode
+    :return: A Tuple containing:
+    - Dict of the TranslationMode under "mode" or an error message
+    - Integer HTTP Status Code
+    """
+    try:
+        return {"mode": TranslationMode(mode or "remote")}, HTTPStatus.OK
+    except ValueError:
+        return {
+            "message": "Error: Unknown translation mode, expected one of "
+            + ", ".join(option.value for option in TranslationMode)
+        }, HTTPStatus.BAD_REQUEST
+
+
+def parse_latency_budget(budget):
+    """
+    Parses the latency budget of a translated request
+    :param budget: String number of seconds, None for the default budget
+    :return: A Tuple containing:
+    - Dict of the budget in seconds under "budget" or an error message
+    - Integer HTTP Status Code
+    """
+    if budget is None:
+        return {
+            "budget": FunTranslationsBase.LATENCY_BUDGET
+        }, HTTPStatus.OK
+    try:
+        seconds = float(budget)
+    except ValueError:
+        seconds = -1
+    if not 0 <= seconds < float("inf"):
+        return {
+            "message": f"Error: {LATENCY_BUDGET_HEADER} must be a positive "
+            "number of seconds"
+        }, HTTPStatus.BAD_REQUEST
+    return {"budget": seconds}, HTTPStatus.OK
+
+
+def translation_cache_key(text_to_translate, translation_lang):
+    """
+    Builds the cache key of a translation from its language and text digest
+    :param text_to_translate: String text being translated
+    :param translation_lang: TranslationLanguage being translated to
+    :return: Tuple cache key
+    """
+    digest = hashlib.sha256(text_to_translate.encode("utf-8")).hexdigest()
+    return ("translation", translation_lang.name, digest)
+
+
+def species_translation_language(pokemon_species):
+    """
+    Picks the language a Pokemon's description is translated to, Yoda for
+    cave dwelling or legendary Pokemon and Shakespeare for every other
+    :param pokemon_species: Dict of the Pokemon species data
+    :return: TranslationLanguage to use
+    """
+    if (
+        pokemon_species["habitat"].lower() == "cave"
+        or pokemon_species["isLegendary"]
+    ):
+        return TranslationLanguage.YODA
+    return TranslationLanguage.SHAKESPEARE
+
+
+class FunTranslationsBase:
+    """
+    The parsing, caching and fallbacks shared by the blocking and
+    non-blocking funtranslations.com wrappers, it never sends a request
+    itself
+    """
+
     # The URL of Funtranslations, including the inital API path
     FUNTRANSLATIONS_URL = os.environ.get("FUNTRANSLATIONS_URL", None)
-    # Set the maximum timeout time of every request
-    REQUEST_TIMEOUT_TIME = 10
+    # Maximum number of translations held in memory
+    TRANSLATION_CACHE_MAX_ENTRIES = int(
+        os.environ.get("TRANSLATION_CACHE_MAX_ENTRIES", 4096)
+    )
+    # Number of seconds a cached translation stays fresh
+    TRANSLATION_CACHE_TTL = int(
+        os.environ.get("TRANSLATION_CACHE_TTL", 30 * 86400)
+    )
+    # Number of seconds an expired translation is still served while it is
+    # refreshed in the background, or while funtranslations is failing
+    TRANSLATION_CACHE_STALE_TTL = int(
+        os.environ.get("TRANSLATION_CACHE_STALE_TTL", 90 * 86400)
+    )
+    # Path of the SQLite database persisting translations across restarts,
+    # unset keeps translations in memory only
+    TRANSLATION_CACHE_PATH = os.environ.get("TRANSLATION_CACHE_PATH", None)
+    # Number of requests per hour we allow ourselves to send, matching the
+    # funtranslations.com quota, 0 disables the limit
+    RATE_LIMIT_PER_HOUR = float(
+        os.environ.get("FUNTRANSLATIONS_RATE_LIMIT_PER_HOUR", 5)
+    )
+    # Number of requests that may be sent back to back
+    RATE_LIMIT_BURST = int(os.environ.get("FUNTRANSLATIONS_RATE_BURST", 5))
+    # Number of requests that may wait for the next token to be added
+    RATE_LIMIT_QUEUE_SIZE = int(
+        os.environ.get("FUNTRANSLATIONS_RATE_QUEUE_SIZE", 8)
+    )
+    # Number of seconds a request may wait in the queue for a token
+    RATE_LIMIT_QUEUE_TIMEOUT = float(
+        os.environ.get("FUNTRANSLATIONS_RATE_QUEUE_TIMEOUT", 2)
+    )
+    # Path of the file holding the token bucket so every worker on the host
+    # shares it, unset shares the bucket within each worker only
+    RATE_LIMIT_PATH = os.environ.get("FUNTRANSLATIONS_RATE_LIMIT_PATH", None)
+    # Translate with the offline engine when funtranslations.com refuses,
+    # fails or times out a request
+    LOCAL_FALLBACK = os.environ.get("LOCAL_TRANSLATION_FALLBACK", "0") == "1"
+    # Number of seconds a translated request may take in total, whatever is
+    # left after getting the species bounds the translation
+    LATENCY_BUDGET = float(os.environ.get("TRANSLATED_LATENCY_BUDGET", 5))
 
-    def __init__(self):
+    def __init__(self, deadline=None):
         """
         Initialise the wrapper
+        :param deadline: Number time.monotonic() time by which every request
+        must have been answered, None waits up to the upstream timeouts
         """
-        if FunTranslationsAPIWrapper.FUNTRANSLATIONS_URL is None:
+        if FunTranslationsBase.FUNTRANSLATIONS_URL is None:
             raise RuntimeError(
                 "Missing required environment variable "
                 "'FunTranslationsAPIWrapper'"
             )
+        self.deadline = deadline
+
+    def _time_left(self, limit):
+        """
+        Gets how long a request may take without overrunning the deadline
+        :param limit: Number of seconds the request may take at most
+        :return: Number of seconds, 0 or less once the deadline has passed
+        """
+        if self.deadline is None:
+            return limit
+        return min(limit, self.deadline - time.monotonic())
+
+    def _wait_limit(self):
+        """
+        Gets how long a request may wait on an identical one already in
+        flight without overrunning the deadline
+        :return: Number of seconds, None when there is no deadline
+        """
+        if self.deadline is None:
+            return None
+        return max(self.deadline - time.monotonic(), 0)
+
+    def _out_of_time(self):
+        """
+        Builds the response given when the deadline passes before a request
+        could be sent
+        :return: A Tuple containing:
+        - Dict of the response data
+        - Integer HTTP Status Code
+        """
+        return {
+            "message": "Error: Latency budget exhausted before translating"
+        }, HTTPStatus.GATEWAY_TIMEOUT
 
     def _build_fun_translator_url(self, path):
         """
@@ -33,32 +211,248 @@ class FunTranslationsAPIWrapper:
         :return: String full URL to target
         """
         if path.startswith("/"):
-            return f"{FunTranslationsAPIWrapper.FUNTRANSLATIONS_URL}{path}"
-        return f"{FunTranslationsAPIWrapper.FUNTRANSLATIONS_URL}/{path}"
+            return f"{FunTranslationsBase.FUNTRANSLATIONS_URL}{path}"
+        return f"{FunTranslationsBase.FUNTRANSLATIONS_URL}/{path}"
+
+    def _circuit_open(self):
+        """
+        Builds the response given while the circuit breaker of
+        funtranslations.com is open, without sending a request
+        :return: A Tuple containing:
+        - Dict of the response data
+        - Integer HTTP Status Code
+        """
+        return {
+            "message": "Error: Translation service is unavailable, please "
+            "try again later"
+        }, HTTPStatus.SERVICE_UNAVAILABLE
+
+    def _rate_limited(self):
+        """
+        Builds the response given when our own rate limit is reached, without
+        spending any of the funtranslations.com quota
+        :return: A Tuple containing:
+        - Dict of the response data
+        - Integer HTTP Status Code
+        """
+        return {
+            "message": "Error: Translation rate limit reached, please try "
+            "again later"
+        }, HTTPStatus.TOO_MANY_REQUESTS
+
+    def _read_fun_translator_response(self, response):
+        """
+        Reads the data out of a funtranslations.com response
+        :param response: The requests or httpx Response received
+        :return: A Tuple containing:
+        - Dict of the response data
+        - Integer HTTP Status Code
+        """
+        json_data = jsoncodec.loads(response.content)
+        if response.status_code != HTTPStatus.OK:
+            error = json_data["error"]["message"]
+            return {"message": f"Error: {error}"}, response.status_code
+        return json_data, response.status_code
+
+    def _translation_endpoint(self, translation_lang):
+        """
+        Gets the funtranslations.com endpoint of a translation language
+        :param translation_lang: TranslationLanguage to use
+        :return: String endpoint path or None for an unknown language
+        """
+        if translation_lang == TranslationLanguage.YODA:
+            return "/yoda.json"
+        if translation_lang == TranslationLanguage.SHAKESPEARE:
+            return "/shakespeare.json"
+        return None
+
+    def _get_cached_translation(self, cache_key, refresh_fn):
+        """
+        Gets a translation from the cache, scheduling a background refresh
+        when it is stale
+        :param cache_key: Tuple cache key of the translation
+        :param refresh_fn: Callable run in the background to refresh it
+        :return: String translated text or None
+        """
+        entry = translation_cache.get_entry(cache_key)
+        if entry is None:
+            return None
+        cached, fresh = entry
+        if not fresh:
+            refresh.refresher.submit(cache_key, refresh_fn)
+        return cached
+
+    def _store_translation(self, result, status_code, cache_key):
+        """
+        Parses a funtranslations.com response and caches the translation
+        :param result: Dict of the response data
+        :param status_code: Integer HTTP Status Code of the response
+        :param cache_key: Tuple cache key of the translation
+        :return: A Tuple containing:
+        - Dict of the response data
+        - Integer HTTP Status Code
+        """
+        if status_code != HTTPStatus.OK:
+            return result, status_code
+
+        try:
+            translated_text = result["contents"]["translated"]
+        except Exception:
+            return {
+                "message": "Error: Failed to parse data"
+            }, HTTPStatus.INTERNAL_SERVER_ERROR
+        translation_cache.set(cache_key, translated_text)
+        return {"translation": translated_text}, HTTPStatus.OK
+
+    def _fall_back(self, text_to_translate, translation_lang, result, status):
+        """
+        Swaps a refused or failed translation for a local one when the local
+        fallback is enabled. Local translations are never cached so the real
+        translation is fetched once funtranslations.com is available again.
+        A failure once the deadline has passed is always given as the latency
+        budget running out, so the caller skips the translation instead of
+        spending more time on a local one.
+        :param text_to_translate: String text being translated
+        :param translation_lang: TranslationLanguage being translated to
+        :param result: Dict of the funtranslations.com response data
+        :param status: Integer HTTP Status Code of the response
+        :return: A Tuple containing:
+        - Dict of the response data
+        - Integer HTTP Status Code
+        """
+        if status == HTTPStatus.OK:
+            return result, status
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return self._out_of_time()
+        if not FunTranslationsBase.LOCAL_FALLBACK:
+            return result, status
+        if (
+            status != HTTPStatus.TOO_MANY_REQUESTS
+            and status < HTTPStatus.INTERNAL_SERVER_ERROR
+        ):
+            return result, status
+        return self.translate_local(text_to_translate, translation_lang)
+
+    def translate_local(self, text_to_translate, translation_lang):
+        """
+        Translates a string with the offline engine, without any network
+        access
+        :param text_to_translate: String text to translate
+        :param translation_lang: TranslationLanguage to use
+        :return: A Tuple containing:
+        - Dict of the response data
+        - Integer HTTP Status Code
+        """
+        if translation_lang == TranslationLanguage.YODA:
+            translation = localtranslations.translate_yoda(text_to_translate)
+        elif translation_lang == TranslationLanguage.SHAKESPEARE:
+            translation = localtranslations.translate_shakespeare(
+                text_to_translate
+            )
+        else:
+            return {}, HTTPStatus.BAD_REQUEST
+        metrics.registry.increment("localTranslations")
+        return {"translation": translation}, HTTPStatus.OK
+
+
+class FunTranslationsAPIWrapper(FunTranslationsBase):
+    """
+    Translates text with funtranslations.com, blocking until each request
+    is answered
+    """
 
     def _send_fun_translator_get(self, path, params={}):
         """
-        A generic method to send GET requests to funtranslations.com
+        A generic method to send GET requests to funtranslations.com,
+        concurrent requests for the same path and parameters share a single
+        upstream request
         :param path: String target path to hit on the API
         :param params: Dict of GET parameters to send with the request
         :return: A Tuple containing:
         - Dict of the response data
         - Integer HTTP Status Code
         """
-        result = {}
         url = self._build_fun_translator_url(path)
-        try:
-            response = requests.get(
-                url,
-                params=params,
-                timeout=FunTranslationsAPIWrapper.REQUEST_TIMEOUT_TIME,
+        return singleflight.group.do(
+            singleflight.request_key(url, params),
+            lambda: self._fetch_fun_translator(url, params),
+            timeout=self._wait_limit(),
+            on_timeout=self._out_of_time,
+        )
+
+    def _fetch_fun_translator(self, url, params):
+        """
+        Sends a GET request to funtranslations.com, retrying transient
+        failures with a jittered backoff while the retry budget and the
+        deadline allow
+        :param url: String full URL to target
+        :param params: Dict of GET parameters to send with the request
+        :return: A Tuple containing:
+        - Dict of the response data
+        - Integer HTTP Status Code
+        """
+        if self._time_left(1) <= 0:
+            return self._out_of_time()
+        retry.budget.deposit()
+        attempt = 0
+        while True:
+            result, status_code, retryable = self._attempt_fun_translator(
+                url, params, attempt
             )
-            json_data = response.json()
-            if response.status_code != HTTPStatus.OK:
-                error = json_data["error"]["message"]
-                result["message"] = f"Error: {error}"
-                return result, response.status_code
-            return json_data, response.status_code
+            delay = None
+            if retryable:
+                delay = retry.policy.next_delay(
+                    "funtranslations", attempt, self._time_left(float("inf"))
+                )
+            if delay is None:
+                return result, status_code
+            time.sleep(delay)
+            attempt += 1
+
+    def _attempt_fun_translator(self, url, params, attempt):
+        """
+        Sends a single attempt of a GET request to funtranslations.com.
+        Only the first attempt queues for a rate limit token.
+        :param url: String full URL to target
+        :param params: Dict of GET parameters to send with the request
+        :param attempt: Integer index of the attempt, starting at 0
+        :return: A Tuple containing:
+        - Dict of the response data
+        - Integer HTTP Status Code
+        - Boolean whether the attempt may be retried
+        """
+        if not circuitbreaker.funtranslations.allow():
+            result, status_code = self._circuit_open()
+            return result, status_code, False
+        queue_timeout = 0
+        if attempt == 0:
+            queue_timeout = FunTranslationsBase.RATE_LIMIT_QUEUE_TIMEOUT
+        if not rate_limiter.acquire(self._time_left(queue_timeout)):
+            result, status_code = self._rate_limited()
+            return result, status_code, False
+        time_left = self._time_left(float("inf"))
+        if time_left <= 0:
+            result, status_code = self._out_of_time()
+            return result, status_code, False
+        timeout = timeouts.policy.timeout(url, limit=time_left)
+        result = {}
+        healthy = False
+        retryable = False
+        start = time.monotonic()
+        try:
+            response = sessions.pool.get(url, params=params, timeout=timeout)
+            healthy = response.status_code < HTTPStatus.INTERNAL_SERVER_ERROR
+            retryable = response.status_code in retry.RETRYABLE_STATUS_CODES
+            result, status_code = self._read_fun_translator_response(response)
+            return result, status_code, retryable
+        except (
+            requests.exceptions.ConnectionError,
+            requests.exceptions.Timeout,
+        ):
+            retryable = True
+            result[
+                "message"
+            ] = "Error: Failed to retrieve data, please try again later"
         except requests.exceptions.RequestException:
             result[
                 "message"
@@ -67,33 +461,53 @@ class FunTranslationsAPIWrapper:
             result[
                 "message"
             ] = "Error: Bad response received from remote server"
-        return result, HTTPStatus.INTERNAL_SERVER_ERROR
+        finally:
+            elapsed = time.monotonic() - start
+            circuitbreaker.funtranslations.record(healthy, elapsed)
+            retry.policy.record_attempt("funtranslations", attempt, elapsed)
+        return result, HTTPStatus.INTERNAL_SERVER_ERROR, retryable
 
     def _translate(self, text_to_translate, translation_lang):
         """
-        Translates a string to a given translation language
+        Translates a string to a given translation language, stale cached
+        translations are returned straight away and refreshed in the
+        background
         :param text_to_translate: String text to translate to Shakespeare
         :param translation_lang: TranslationLanguage to use
         """
         params = {"text": text_to_translate}
-        if translation_lang == TranslationLanguage.YODA:
-            endpoint = "/yoda.json"
-        elif translation_lang == TranslationLanguage.SHAKESPEARE:
-            endpoint = "/shakespeare.json"
-        else:
+        endpoint = self._translation_endpoint(translation_lang)
+        if endpoint is None:
             return {}, HTTPStatus.BAD_REQUEST
 
-        result, status_code = self._send_fun_translator_get(endpoint, params)
-        if status_code != HTTPStatus.OK:
-            return result, status_code
+        cache_key = translation_cache_key(text_to_translate, translation_lang)
+        cached = self._get_cached_translation(
+            cache_key,
+            lambda: FunTranslationsAPIWrapper()._fetch_translation(
+                endpoint, params, cache_key
+            ),
+        )
+        if cached is not None:
+            return {"translation": cached}, HTTPStatus.OK
+        result, status_code = self._fetch_translation(
+            endpoint, params, cache_key
+        )
+        return self._fall_back(
+            text_to_translate, translation_lang, result, status_code
+        )
 
-        try:
-            translated_text = result["contents"]["translated"]
-        except Exception:
-            return {
-                "message": "Error: Failed to parse data"
-            }, HTTPStatus.INTERNAL_SERVER_ERROR
-        return {"translation": translated_text}, HTTPStatus.OK
+    def _fetch_translation(self, endpoint, params, cache_key):
+        """
+        Fetches a translation from funtranslations.com and caches it
+        :param endpoint: String translation endpoint to hit on the API
+        :param params: Dict of GET parameters holding the text to translate
+        :param cache_key: Tuple cache key of the translation
+        :return: A Tuple containing:
+        - Dict of the response data
+        - Integer HTTP Status Code
+        """
+        result, status_code = self._send_fun_translator_get(endpoint, params)
+        return self._store_translation(result, status_code, cache_key)
 
     def translate_yoda(self, text_to_translate):
         """
@@ -116,3 +530,213 @@ class FunTranslationsAPIWrapper:
         return self._translate(
             text_to_translate, TranslationLanguage.SHAKESPEARE
         )
+
+
+class AsyncFunTranslationsAPIWrapper(FunTranslationsBase):
+    """
+    A non-blocking variant of FunTranslationsAPIWrapper for the async serving
+    mode, it shares the translation cache of the blocking wrapper. A
+    translation cache that may block is read and written on the offload
+    threads.
+    """
+
+    async def _send_fun_translator_get(self, path, params={}):
+        """
+        A generic method to send GET requests to funtranslations.com,
+        concurrent requests for the same path and parameters share a single
+        upstream request
+        :param path: String target path to hit on the API
+        :param params: Dict of GET parameters to send with the request
+        :return: A Tuple containing:
+        - Dict of the response data
+        - Integer HTTP Status Code
+        """
+        url = self._build_fun_translator_url(path)
+        return await singleflight.async_group.do(
+            singleflight.request_key(url, params),
+            lambda: self._fetch_fun_translator(url, params),
+            timeout=self._wait_limit(),
+            on_timeout=self._out_of_time,
+        )
+
+    async def _fetch_fun_translator(self, url, params):
+        """
+        Sends a GET request to funtranslations.com without blocking the event
+        loop, retrying transient failures with a jittered backoff while the
+        retry budget and the deadline allow
+        :param url: String full URL to target
+        :param params: Dict of GET parameters to send with the request
+        :return: A Tuple containing:
+        - Dict of the response data
+        - Integer HTTP Status Code
+        """
+        if self._time_left(1) <= 0:
+            return self._out_of_time()
+        retry.budget.deposit()
+        attempt = 0
+        while True:
+            result, status_code, retryable = (
+                await self._attempt_fun_translator(url, params, attempt)
+            )
+            delay = None
+            if retryable:
+                delay = retry.policy.next_delay(
+                    "funtranslations", attempt, self._time_left(float("inf"))
+                )
+            if delay is None:
+                return result, status_code
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _attempt_fun_translator(self, url, params, attempt):
+        """
+        Sends a single attempt of a GET request to funtranslations.com.
+        Only the first attempt queues for a rate limit token.
+        :param url: String full URL to target
+        :param params: Dict of GET parameters to send with the request
+        :param attempt: Integer index of the attempt, starting at 0
+        :return: A Tuple containing:
+        - Dict of the response data
+        - Integer HTTP Status Code
+        - Boolean whether the attempt may be retried
+        """
+        if not circuitbreaker.funtranslations.allow():
+            result, status_code = self._circuit_open()
+            return result, status_code, False
+        queue_timeout = 0
+        if attempt == 0:
+            queue_timeout = FunTranslationsBase.RATE_LIMIT_QUEUE_TIMEOUT
+        if not await rate_limiter.async_acquire(
+            self._time_left(queue_timeout)
+        ):
+            result, status_code = self._rate_limited()
+            return result, status_code, False
+        time_left = self._time_left(float("inf"))
+        if time_left <= 0:
+            result, status_code = self._out_of_time()
+            return result, status_code, False
+        timeout = timeouts.policy.timeout(url, limit=time_left)
+        result = {}
+        healthy = False
+        retryable = False
+        start = time.monotonic()
+        try:
+            response = await sessions.async_pool.get(
+                url, params=params, timeout=timeout
+            )
+            healthy = response.status_code < HTTPStatus.INTERNAL_SERVER_ERROR
+            retryable = response.status_code in retry.RETRYABLE_STATUS_CODES
+            result, status_code = self._read_fun_translator_response(response)
+            return result, status_code, retryable
+        except httpx.TransportError:
+            retryable = True
+            result[
+                "message"
+            ] = "Error: Failed to retrieve data, please try again later"
+        except httpx.HTTPError:
+            result[
+                "message"
+            ] = "Error: Failed to retrieve data, please try again later"
+        except Exception:
+            result[
+                "message"
+            ] = "Error: Bad response received from remote server"
+        finally:
+            elapsed = time.monotonic() - start
+            circuitbreaker.funtranslations.record(healthy, elapsed)
+            retry.policy.record_attempt("funtranslations", attempt, elapsed)
+        return result, HTTPStatus.INTERNAL_SERVER_ERROR, retryable
+
+    async def _translate(self, text_to_translate, translation_lang):
+        """
+        Translates a string to a given translation language, stale cached
+        translations are returned straight away and refreshed in the
+        background
+        :param text_to_translate: String text to translate
+        :param translation_lang: TranslationLanguage to use
+        """
+        params = {"text": text_to_translate}
+        endpoint = self._translation_endpoint(translation_lang)
+        if endpoint is None:
+            return {}, HTTPStatus.BAD_REQUEST
+
+        cache_key = translation_cache_key(text_to_translate, translation_lang)
+        cached = await offload.offloader.run(
+            translation_cache.blocking,
+            self._get_cached_translation,
+            cache_key,
+            lambda: FunTranslationsAPIWrapper()._fetch_translation(
+                endpoint, params, cache_key
+            ),
+        )
+        if cached is not None:
+            return {"translation": cached}, HTTPStatus.OK
+        result, status_code = await self._send_fun_translator_get(
+            endpoint, params
+        )
+        result, status_code = await offload.offloader.run(
+            translation_cache.blocking,
+            self._store_translation,
+            result,
+            status_code,
+            cache_key,
+        )
+        return self._fall_back(
+            text_to_translate, translation_lang, result, status_code
+        )
+
+    async def translate_yoda(self, text_to_translate):
+        """
+        Given a string, translates it to the Yoda equivalent
+        :param text_to_translate: String text to translate to Yoda
+        :return: A Tuple containing:
+        - Dict of the response data
+        - Integer HTTP Status Code
+        """
+        return await self._translate(
+            text_to_translate, TranslationLanguage.YODA
+        )
+
+    async def translate_shakespeare(self, text_to_translate):
+        """
+        Given a string, translates it to the Shakespeare equivalent
+        :param text_to_translate: String text to translate to Shakespeare
+        :return: A Tuple containing:
+        - Dict of the response data
+        - Integer HTTP Status Code
+        """
+        return await self._translate(
+            text_to_translate, TranslationLanguage.SHAKESPEARE
+        )
+
+
+# Translations shared by every FunTranslationsAPIWrapper, backed by SQLite
+# when a persistent path is configured
+translation_cache = cache.TieredCache(
+    cache.build_cache(
+        "translations",
+        max_entries=FunTranslationsBase.TRANSLATION_CACHE_MAX_ENTRIES,
+        ttl=FunTranslationsBase.TRANSLATION_CACHE_TTL,
+        stale_ttl=FunTranslationsBase.TRANSLATION_CACHE_STALE_TTL,
+    ),
+    (
+        cache.SQLiteCache(
+            FunTranslationsBase.TRANSLATION_CACHE_PATH,
+            ttl=FunTranslationsBase.TRANSLATION_CACHE_TTL,
+            stale_ttl=FunTranslationsBase.TRANSLATION_CACHE_STALE_TTL,
+        )
+        if FunTranslationsBase.TRANSLATION_CACHE_PATH
+        else None
+    ),
+)
+metrics.registry.register_source("translationCache", translation_cache.stats)
+
+# The token bucket shared by every FunTranslationsAPIWrapper, so requests
+# are only ever sent within the funtranslations.com quota
+rate_limiter = ratelimit.TokenBucket(
+    rate=FunTranslationsBase.RATE_LIMIT_PER_HOUR / 3600,
+    burst=FunTranslationsBase.RATE_LIMIT_BURST,
+    max_waiting=FunTranslationsBase.RATE_LIMIT_QUEUE_SIZE,
+    path=FunTranslationsBase.RATE_LIMIT_PATH,
+)
+metrics.registry.register_source("translationRateLimit", rate_limiter.stats)
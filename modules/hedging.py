@@ -0,0 +1,242 @@
+import os
+import asyncio
+import threading
+
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from modules import metrics, offload, retry, timeouts
+
+
+class Hedger:
+    # Send a second identical request when the first is slower than usual
+    ENABLED = os.environ.get("POKEAPI_HEDGING", "0") == "1"
+    # Latency percentile of the host after which the hedge is sent
+    PERCENTILE = float(os.environ.get("HEDGE_PERCENTILE", 95))
+    # Share of requests that may be hedged
+    MAX_RATIO = float(os.environ.get("HEDGE_MAX_RATIO", 0.05))
+    # Most hedges that can be banked while requests are fast
+    RESERVE = float(os.environ.get("HEDGE_RESERVE", 5))
+    # Samples needed before the latency percentile of a host is trusted
+    MIN_SAMPLES = int(os.environ.get("HEDGE_MIN_SAMPLES", 50))
+    # Number of threads sending hedged requests in the threaded server
+    MAX_WORKERS = int(os.environ.get("HEDGE_MAX_WORKERS", 16))
+
+    def __init__(
+        self,
+        tracker,
+        enabled=False,
+        percentile=95.0,
+        max_ratio=0.05,
+        reserve=5.0,
+        min_samples=50,
+        max_workers=16,
+    ):
+        """
+        Initialise the hedger
+        :param tracker: LatencyTracker recording upstream latency
+        :param enabled: Boolean whether requests are hedged at all
+        :param percentile: Number latency percentile after which a hedge is
+        sent
+        :param max_ratio: Number share of requests that may be hedged
+        :param reserve: Number of hedges that can be banked
+        :param min_samples: Integer samples needed before hedging a host
+        :param max_workers: Integer number of threads sending requests while
+        hedging in the threaded server
+        """
+        self.tracker = tracker
+        self.enabled = enabled
+        self.percentile = percentile
+        self.budget = retry.RetryBudget(ratio=max_ratio, reserve=reserve)
+        self.min_samples = min_samples
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._threads = offload.ForkSafeExecutor(max_workers)
+        self._counters = {}
+        self._reset_counters()
+
+    def _reset_counters(self):
+        """
+        Resets the statistics counters, the caller must hold the lock
+        """
+        self._counters = {"requests": 0, "hedged": 0, "hedgeWins": 0}
+
+    def _count(self, name):
+        """
+        Increments a statistics counter
+        :param name: String name of the counter
+        """
+        with self._lock:
+            self._counters[name] += 1
+
+    def shutdown(self):
+        """
+        Waits for the requests still in flight, hedges that lost included,
+        and stops the sending threads. They are started again when needed.
+        """
+        self._threads.shutdown()
+
+    def hedge_delay(self, url):
+        """
+        Gets how long a request may go unanswered before it is hedged
+        :param url: String URL being requested
+        :return: Number of seconds or None when the request is not hedged
+        """
+        if not self.enabled or self.tracker.count(url) < self.min_samples:
+            return None
+        return self.tracker.percentile(url, self.percentile)
+
+    def _start(self, url):
+        """
+        Counts a request and gets its hedge delay
+        :param url: String URL being requested
+        :return: Number of seconds or None when the request is not hedged
+        """
+        self._count("requests")
+        self.budget.deposit()
+        return self.hedge_delay(url)
+
+    def _hedge(self):
+        """
+        Spends a hedge from the budget
+        :return: Boolean whether a hedge may be sent
+        """
+        if not self.budget.withdraw():
+            return False
+        self._count("hedged")
+        return True
+
+    def get(self, url, send):
+        """
+        Sends a request, sending an identical hedge when it has not been
+        answered within the latency percentile of the host. Whichever
+        succeeds first wins.
+        :param url: String URL being requested
+        :param send: Callable taking no arguments that sends the request
+        :return: The response of the winning request
+        """
+        delay = self._start(url)
+        if delay is None:
+            return send()
+        executor = self._threads.get()
+        first = executor.submit(send)
+        done, _ = wait([first], timeout=delay)
+        if done or not self._hedge():
+            return first.result()
+        pending = {first, executor.submit(send)}
+        while True:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            winner = _pick_winner(done, pending)
+            if winner is not None:
+                break
+        if winner is not first:
+            self._count("hedgeWins")
+        # The loser cannot be interrupted, it finishes in the background and
+        # its response is closed so a streamed body is never left unread
+        for future in pending | done:
+            if future is not winner:
+                future.add_done_callback(_close_response)
+        return winner.result()
+
+    async def async_get(self, url, send):
+        """
+        Sends a request without blocking the event loop, sending an
+        identical hedge when it has not been answered within the latency
+        percentile of the host. Whichever succeeds first wins.
+        :param url: String URL being requested
+        :param send: Callable taking no arguments returning a coroutine that
+        sends the request
+        :return: The response of the winning request
+        """
+        delay = self._start(url)
+        if delay is None:
+            return await send()
+        first = asyncio.ensure_future(send())
+        done, _ = await asyncio.wait([first], timeout=delay)
+        if done or not self._hedge():
+            return await first
+        pending = {first, asyncio.ensure_future(send())}
+        try:
+            while True:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                winner = _pick_winner(done, pending)
+                if winner is not None:
+                    break
+        finally:
+            for task in pending:
+                task.cancel()
+        if winner is not first:
+            self._count("hedgeWins")
+        # A loser still running was cancelled, one that finished along with
+        # the winner is closed so a streamed body is never left unread
+        for task in done:
+            if task is not winner:
+                await _aclose_response(task)
+        return winner.result()
+
+    def stats(self):
+        """
+        Reports how many requests were hedged and how often the hedge won
+        :return: Dict of the hedging statistics
+        """
+        with self._lock:
+            result = dict(self._counters)
+        result["budget"] = round(self.budget.tokens(), 3)
+        return result
+
+    def reset(self):
+        """
+        Fills the hedge budget back up and resets the statistics counters
+        """
+        self.budget.reset()
+        with self._lock:
+            self._reset_counters()
+
+
+def _close_response(future):
+    """
+    Closes the response of a request that lost the race
+    :param future: Finished Future of the losing request
+    """
+    if future.exception() is None and hasattr(future.result(), "close"):
+        future.result().close()
+
+
+async def _aclose_response(future):
+    """
+    Closes the response of a request that lost the race without blocking
+    the event loop
+    :param future: Finished Future of the losing request
+    """
+    if future.exception() is None and hasattr(future.result(), "aclose"):
+        await future.result().aclose()
+
+
+def _pick_winner(done, pending):
+    """
+    Picks the winning request out of those that finished, failed requests
+    only win once every request has finished
+    :param done: Set of finished futures
+    :param pending: Set of futures still running
+    :return: The winning future or None to keep waiting
+    """
+    for future in done:
+        if future.exception() is None:
+            return future
+    if pending:
+        return None
+    return next(iter(done))
+
+
+# The process wide hedger of Pokeapi.co requests
+hedger = Hedger(
+    timeouts.latency,
+    enabled=Hedger.ENABLED,
+    percentile=Hedger.PERCENTILE,
+    max_ratio=Hedger.MAX_RATIO,
+    reserve=Hedger.RESERVE,
+    min_samples=Hedger.MIN_SAMPLES,
+    max_workers=Hedger.MAX_WORKERS,
+)
+metrics.registry.register_source("hedging", hedger.stats)
@@ -0,0 +1,313 @@
+import gc
+import os
+import atexit
+import time
+import threading
+
+from http import HTTPStatus
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from modules import (
+    batch,
+    funtranslations,
+    hedging,
+    jsoncodec,
+    metrics,
+    pokeapi,
+    refresh,
+    speciesindex,
+)
+
+# Kinds of hot key, each replayed through the wrappers on warm-up
+SPECIES = "species"
+TRANSLATED = "translated"
+
+
+class HotKeyTracker:
+    # Path of the JSON file the hottest keys are persisted to, unset keeps
+    # them in memory only
+    PATH = os.environ.get("HOT_KEYS_PATH", None)
+    # Most keys of each kind kept in the persisted hot set
+    MAX_KEYS = int(os.environ.get("HOT_KEYS_MAX_KEYS", 512))
+    # Lookups recorded by a worker before they are merged into the file
+    SAVE_EVERY = int(os.environ.get("HOT_KEYS_SAVE_EVERY", 100))
+    # Share of the persisted counts kept on every merge, so keys that have
+    # cooled down drop out of the hot set
+    DECAY = float(os.environ.get("HOT_KEYS_DECAY", 0.98))
+
+    def __init__(self, path=None, max_keys=512, save_every=100, decay=0.98):
+        """
+        Initialise the tracker
+        :param path: String path of the JSON file backing the hot set
+        :param max_keys: Integer most keys of each kind kept
+        :param save_every: Integer lookups recorded between merges
+        :param decay: Number share of the persisted counts kept per merge
+        """
+        self._path = path
+        self.max_keys = max(max_keys, 1)
+        self.save_every = max(save_every, 1)
+        self.decay = decay
+        self._lock = threading.Lock()
+        self._pending = {SPECIES: Counter(), TRANSLATED: Counter()}
+        self._recorded = 0
+        self._counters = {}
+        self._reset_counters()
+
+    def _reset_counters(self):
+        """
+        Resets the statistics counters, the caller must hold the lock
+        """
+        self._counters = {"recorded": 0, "saved": 0, "warmed": 0}
+
+    @property
+    def blocking(self):
+        """
+        Gets whether recording a lookup may block merging into the file
+        :return: Boolean
+        """
+        return self._path is not None
+
+    def record(self, kind, name):
+        """
+        Records a successful lookup, merging the recorded lookups into the
+        persisted hot set every so often
+        :param kind: String kind of lookup, SPECIES or TRANSLATED
+        :param name: String name of the Pokemon looked up
+        """
+        name = speciesindex.normalise_name(name)
+        with self._lock:
+            pending = self._pending[kind]
+            pending[name] += 1
+            if len(pending) > self.max_keys * 2:
+                # Bounds memory between merges, the coldest keys are dropped
+                self._pending[kind] = Counter(
+                    dict(pending.most_common(self.max_keys))
+                )
+            self._counters["recorded"] += 1
+            self._recorded += 1
+            if self._recorded < self.save_every:
+                return
+            self._recorded = 0
+            self._save()
+
+    def record_found(self, kind, names, results):
+        """
+        Records every Pokemon of a batch lookup that was found
+        :param kind: String kind of lookup, SPECIES or TRANSLATED
+        :param names: List of String names of the Pokemon looked up
+        :param results: List of (Dict, Integer HTTP Status Code) Tuples in
+        the same order as names
+        """
+        for name, (_, status_code) in zip(names, results):
+            if status_code == HTTPStatus.OK:
+                self.record(kind, name)
+
+    def _read_file(self):
+        """
+        Reads the persisted hot set, ignoring a missing or corrupt file
+        :return: Dict of kind to Counter of name to Number count
+        """
+        result = {SPECIES: Counter(), TRANSLATED: Counter()}
+        try:
+            with open(self._path, "rb") as hot_file:
+                data = jsoncodec.loads(hot_file.read())
+            for kind in result:
+                result[kind].update(
+                    {str(k): float(v) for k, v in data.get(kind, {}).items()}
+                )
+        except (OSError, ValueError, AttributeError, TypeError):
+            pass
+        return result
+
+    def _save(self):
+        """
+        Merges the recorded lookups into the persisted hot set, the caller
+        must hold the lock
+        """
+        if self._path is None or not any(self._pending.values()):
+            return
+        merged = self._read_file()
+        data = {}
+        for kind, counts in merged.items():
+            for name in counts:
+                counts[name] *= self.decay
+            counts.update(self._pending[kind])
+            data[kind] = {
+                name: round(count, 3)
+                for name, count in counts.most_common(self.max_keys)
+            }
+            self._pending[kind] = Counter()
+        temp_path = f"{self._path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, "wb") as hot_file:
+                hot_file.write(jsoncodec.dumps(data))
+            os.replace(temp_path, self._path)
+            self._counters["saved"] += 1
+        except OSError:
+            # Persisting is best effort, serving never depends on it
+            pass
+
+    def save(self):
+        """
+        Merges every recorded lookup into the persisted hot set now
+        """
+        with self._lock:
+            self._recorded = 0
+            self._save()
+
+    def hot_keys(self, limit=None):
+        """
+        Gets the hottest keys, persisted and recorded, hottest first
+        :param limit: Integer most keys of each kind, None returns them all
+        :return: Dict of kind to List of String names
+        """
+        with self._lock:
+            merged = self._read_file() if self._path else {}
+            result = {}
+            for kind, pending in self._pending.items():
+                counts = merged.get(kind, Counter())
+                counts.update(pending)
+                result[kind] = [name for name, _ in counts.most_common(limit)]
+        return result
+
+    def count_warmed(self, warmed):
+        """
+        Records how many keys a warm-up loaded
+        :param warmed: Integer number of keys loaded
+        """
+        with self._lock:
+            self._counters["warmed"] += warmed
+
+    def stats(self):
+        """
+        Reports how many lookups were recorded, saved and warmed
+        :return: Dict of the hot key statistics
+        """
+        with self._lock:
+            result = dict(self._counters)
+            result["pending"] = sum(len(c) for c in self._pending.values())
+        return result
+
+    def reset(self):
+        """
+        Forgets every recorded lookup without touching the persisted file
+        """
+        with self._lock:
+            self._pending = {SPECIES: Counter(), TRANSLATED: Counter()}
+            self._recorded = 0
+            self._reset_counters()
+
+
+def warm_species(pokemon_name):
+    """
+    Loads a species into the caches through the PokeAPI wrapper
+    :param pokemon_name: String name of the Pokemon
+    :return: Boolean whether it was loaded
+    """
+    poke = pokeapi.PokeAPIWrapper()
+    _, status_code = poke.get_pokemon_species_by_name(pokemon_name)
+    return status_code == HTTPStatus.OK
+
+
+def warm_translated(pokemon_name, deadline=None):
+    """
+    Loads a species and the translation of its description into the caches
+    through the PokeAPI and funtranslations wrappers
+    :param pokemon_name: String name of the Pokemon
+    :param deadline: Number time.monotonic() time the translation must be
+    done by
+    :return: Boolean whether both were loaded
+    """
+    poke = pokeapi.PokeAPIWrapper()
+    result, status_code = poke.get_pokemon_species_by_name(pokemon_name)
+    if status_code != HTTPStatus.OK:
+        return False
+    language = funtranslations.species_translation_language(result)
+    translate = funtranslations.FunTranslationsAPIWrapper(deadline=deadline)
+    if language == funtranslations.TranslationLanguage.YODA:
+        _, status_code = translate.translate_yoda(result["description"])
+    else:
+        _, status_code = translate.translate_shakespeare(result["description"])
+    return status_code == HTTPStatus.OK
+
+
+def warm(tracker, limit=256, seconds=30.0, concurrency=8):
+    """
+    Preloads the caches with the hottest keys. Run in the gunicorn master
+    before it forks, every worker then starts with the same warm caches
+    sharing their memory copy-on-write.
+    :param tracker: HotKeyTracker holding the hot set
+    :param limit: Integer most keys of each kind loaded
+    :param seconds: Number of seconds the warm-up may take
+    :param concurrency: Integer number of keys loaded at the same time
+    :return: Dict of the number of keys loaded of each kind
+    """
+    deadline = time.monotonic() + seconds
+    keys = tracker.hot_keys(limit)
+
+    def load(item):
+        kind, name = item
+        if time.monotonic() >= deadline:
+            return kind, False
+        if kind == SPECIES:
+            return kind, warm_species(name)
+        return kind, warm_translated(name, deadline)
+
+    items = [(kind, name) for kind, names in keys.items() for name in names]
+    result = {SPECIES: 0, TRANSLATED: 0}
+    # The threads are all joined before returning so none is left running
+    # when gunicorn forks
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as executor:
+        for kind, loaded in executor.map(load, items):
+            result[kind] += int(loaded)
+    # So are the threads the wrappers started along the way, such as the
+    # refreshes of stale entries and hedged requests still in flight.
+    # Forked workers start their own when they need them.
+    refresh.refresher.shutdown()
+    hedging.hedger.shutdown()
+    batch.executor.shutdown()
+    tracker.count_warmed(sum(result.values()))
+    return result
+
+
+# Preload the caches with the persisted hot set when the app is loaded, use
+# gunicorn --preload so this runs once in the master before it forks
+WARM_ON_START = os.environ.get("HOT_KEYS_WARM", "0") == "1"
+# Most keys of each kind preloaded
+WARM_LIMIT = int(os.environ.get("HOT_KEYS_WARM_LIMIT", 256))
+# Number of seconds the warm-up may take before the app starts serving
+WARM_SECONDS = float(os.environ.get("HOT_KEYS_WARM_SECONDS", 30))
+# Number of keys preloaded at the same time
+WARM_CONCURRENCY = int(os.environ.get("HOT_KEYS_WARM_CONCURRENCY", 8))
+
+# The process wide hot key tracker
+tracker = HotKeyTracker(
+    HotKeyTracker.PATH,
+    max_keys=HotKeyTracker.MAX_KEYS,
+    save_every=HotKeyTracker.SAVE_EVERY,
+    decay=HotKeyTracker.DECAY,
+)
+metrics.registry.register_source("hotKeys", tracker.stats)
+# Lookups recorded since the last merge are kept when a worker shuts down
+atexit.register(tracker.save)
+
+
+def warm_on_start():
+    """
+    Preloads the caches with the hot set when warm-up on start is enabled
+    :return: Dict of the number of keys loaded of each kind or None
+    """
+    if not WARM_ON_START:
+        return None
+    result = warm(
+        tracker,
+        limit=WARM_LIMIT,
+        seconds=WARM_SECONDS,
+        concurrency=WARM_CONCURRENCY,
+    )
+    # Keeps the garbage collector of every forked worker from touching, and
+    # so copying, the preloaded objects. Only Python 3.7 and newer have it.
+    if hasattr(gc, "freeze"):
+        gc.freeze()
+    return result
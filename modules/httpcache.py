@@ -0,0 +1,110 @@
+import os
+
+from http import HTTPStatus
+
+# Seconds browsers and CDNs may reuse a /pokemon/<name> response, 0 makes
+# them revalidate every time
+POKEMON_MAX_AGE = int(os.environ.get("POKEMON_CACHE_MAX_AGE", 3600))
+# Seconds past the max age a /pokemon/<name> response may still be served
+# while it is revalidated in the background
+POKEMON_STALE_WHILE_REVALIDATE = int(
+    os.environ.get("POKEMON_CACHE_STALE_WHILE_REVALIDATE", 86400)
+)
+# Seconds browsers and CDNs may reuse a /pokemon/translated/<name> response,
+# 0 makes them revalidate every time
+TRANSLATED_MAX_AGE = int(os.environ.get("TRANSLATED_CACHE_MAX_AGE", 3600))
+# Seconds past the max age a /pokemon/translated/<name> response may still
+# be served while it is revalidated in the background
+TRANSLATED_STALE_WHILE_REVALIDATE = int(
+    os.environ.get("TRANSLATED_CACHE_STALE_WHILE_REVALIDATE", 86400)
+)
+
+# Header of a response that must be revalidated before every reuse
+NO_CACHE = "no-cache"
+
+
+def cache_control(max_age, stale_while_revalidate=0):
+    """
+    Builds the Cache-Control header of a route
+    :param max_age: Integer seconds a response may be reused
+    :param stale_while_revalidate: Integer seconds past the max age a
+    response may be served while it is revalidated
+    :return: String Cache-Control header value
+    """
+    if max_age <= 0:
+        return NO_CACHE
+    value = f"public, max-age={max_age}"
+    if stale_while_revalidate > 0:
+        value += f", stale-while-revalidate={stale_while_revalidate}"
+    return value
+
+
+# Cache-Control headers of the /pokemon/<name> and
+# /pokemon/translated/<name> routes
+POKEMON_CACHE_CONTROL = cache_control(
+    POKEMON_MAX_AGE, POKEMON_STALE_WHILE_REVALIDATE
+)
+TRANSLATED_CACHE_CONTROL = cache_control(
+    TRANSLATED_MAX_AGE, TRANSLATED_STALE_WHILE_REVALIDATE
+)
+
+
+def etag_matches(if_none_match, etag):
+    """
+    Checks an If-None-Match header against the ETag of a response, using the
+    weak comparison the header calls for
+    :param if_none_match: String If-None-Match header value or None
+    :param etag: String quoted ETag of the response
+    :return: Boolean whether the client already holds the response
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class PreparedResponse:
+    __slots__ = ("status", "headers", "body")
+
+    def __init__(self, status, headers, body):
+        """
+        Initialise the response
+        :param status: Integer HTTP Status Code
+        :param headers: List of (String, String) header Tuples
+        :param body: Bytes of the body
+        """
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+
+def prepare(encoded, if_none_match, route_cache_control):
+    """
+    Prepares an encoded response with its validator and caching headers,
+    without a body when the client already holds it
+    :param encoded: EncodedResponse being served
+    :param if_none_match: String If-None-Match header value or None
+    :param route_cache_control: String Cache-Control header of the route
+    :return: PreparedResponse
+    """
+    # Responses not tied to cached entries, such as fallback translations,
+    # are revalidated so the edge never keeps them for long
+    headers = [
+        ("ETag", encoded.etag),
+        (
+            "Cache-Control",
+            NO_CACHE if encoded.sources is None else route_cache_control,
+        ),
+    ]
+    if etag_matches(if_none_match, encoded.etag):
+        return PreparedResponse(HTTPStatus.NOT_MODIFIED, headers, b"")
+    headers.append(("Content-Type", "application/json"))
+    headers.append(("Content-Length", str(encoded.content_length)))
+    return PreparedResponse(HTTPStatus.OK, headers, encoded.body)
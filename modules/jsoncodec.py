@@ -0,0 +1,139 @@
+import os
+import json
+import timeit
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - the stdlib codec is used instead
+    orjson = None
+
+
+class StdlibCodec:
+    name = "json"
+
+    def loads(self, data):
+        """
+        Decodes a JSON document
+        :param data: Bytes or String JSON document
+        :return: The decoded Python object
+        """
+        return json.loads(data)
+
+    def dumps(self, value):
+        """
+        Encodes a Python object as compact UTF-8 JSON
+        :param value: The Python object to encode
+        :return: Bytes JSON document
+        """
+        return json.dumps(
+            value, ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+
+
+class OrjsonCodec:
+    name = "orjson"
+
+    def loads(self, data):
+        """
+        Decodes a JSON document with the C accelerated orjson codec
+        :param data: Bytes or String JSON document
+        :return: The decoded Python object
+        """
+        return orjson.loads(data)
+
+    def dumps(self, value):
+        """
+        Encodes a Python object as compact UTF-8 JSON with the C accelerated
+        orjson codec
+        :param value: The Python object to encode
+        :return: Bytes JSON document
+        """
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+
+
+def build_codec(name="auto"):
+    """
+    Builds the JSON codec to use
+    :param name: String codec name, "auto" picks the fastest one installed
+    :return: StdlibCodec or OrjsonCodec
+    """
+    if name == "auto":
+        name = "orjson" if orjson is not None else "json"
+    if name == "orjson":
+        if orjson is None:
+            raise RuntimeError("The orjson JSON codec requires orjson")
+        return OrjsonCodec()
+    if name == "json":
+        return StdlibCodec()
+    raise RuntimeError(f"Unknown JSON codec '{name}'")
+
+
+# JSON codec used for upstream and response bodies, "auto" uses orjson when
+# it is installed and the standard library otherwise
+JSON_CODEC = os.environ.get("JSON_CODEC", "auto")
+
+# The process wide codec
+codec = build_codec(JSON_CODEC)
+
+
+def loads(data):
+    """
+    Decodes a JSON document with the configured codec
+    :param data: Bytes or String JSON document
+    :return: The decoded Python object
+    """
+    return codec.loads(data)
+
+
+def dumps(value):
+    """
+    Encodes a Python object with the configured codec
+    :param value: The Python object to encode
+    :return: Bytes JSON document
+    """
+    return codec.dumps(value)
+
+
+def benchmark(document, number=200):
+    """
+    Times decoding and encoding a document with every installed codec
+    :param document: Bytes JSON document
+    :param number: Integer number of times each operation is repeated
+    :return: Dict of codec name to Dict of the average milliseconds taken
+    """
+    names = ["json"] + (["orjson"] if orjson is not None else [])
+    result = {}
+    for name in names:
+        candidate = build_codec(name)
+        value = candidate.loads(document)
+        decode = timeit.timeit(
+            lambda: candidate.loads(document), number=number
+        )
+        encode = timeit.timeit(lambda: candidate.dumps(value), number=number)
+        result[name] = {
+            "decodeMs": round(decode * 1000 / number, 3),
+            "encodeMs": round(encode * 1000 / number, 3),
+        }
+    return result
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "rb") as document_file:
+            sample = document_file.read()
+    else:
+        from tests import mock_data
+
+        sample = json.dumps(mock_data.get_mewtwo).encode("utf-8")
+    timings = benchmark(sample)
+    baseline = timings["json"]
+    print(f"Document of {len(sample)} bytes")
+    for codec_name, timing in timings.items():
+        print(
+            f"{codec_name:>8}: decode {timing['decodeMs']:.3f}ms "
+            f"({baseline['decodeMs'] / timing['decodeMs']:.1f}x), "
+            f"encode {timing['encodeMs']:.3f}ms "
+            f"({baseline['encodeMs'] / timing['encodeMs']:.1f}x)"
+        )
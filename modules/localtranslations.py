@@ -0,0 +1,190 @@
+import re
+
+# Words and phrases swapped for their Shakespearean equivalent, phrases are
+# matched before the words they contain
+SHAKESPEARE_TABLE = {
+    "you are": "thou art",
+    "are you": "art thou",
+    "you have": "thou hast",
+    "have you": "hast thou",
+    "you will": "thou wilt",
+    "will you": "wilt thou",
+    "you can": "thou canst",
+    "can you": "canst thou",
+    "good morning": "good morrow",
+    "it is": "'tis",
+    "it was": "'twas",
+    "hello": "good morrow",
+    "hi": "hail",
+    "goodbye": "farewell",
+    "you": "thee",
+    "your": "thy",
+    "yours": "thine",
+    "yourself": "thyself",
+    "are": "art",
+    "yes": "aye",
+    "no": "nay",
+    "before": "ere",
+    "often": "oft",
+    "over": "o'er",
+    "ever": "e'er",
+    "never": "ne'er",
+    "even": "e'en",
+    "does": "doth",
+    "has": "hath",
+    "says": "saith",
+    "why": "wherefore",
+    "maybe": "perchance",
+    "perhaps": "mayhap",
+    "very": "most",
+    "really": "verily",
+    "enemy": "foe",
+    "enemies": "foes",
+    "friend": "sirrah",
+    "strong": "mighty",
+    "kill": "slay",
+    "kills": "slays",
+    "killed": "slain",
+    "anything": "aught",
+    "nothing": "naught",
+    "soon": "anon",
+    "quickly": "apace",
+    "until": "till",
+    "between": "betwixt",
+    "among": "amongst",
+    "sometimes": "oftentimes",
+    "people": "folk",
+    "someone": "some one",
+}
+
+# Verbs a Yoda clause is rotated around, everything after the verb is moved
+# to the front of the sentence
+YODA_VERBS = (
+    "is",
+    "are",
+    "was",
+    "were",
+    "can",
+    "could",
+    "will",
+    "would",
+    "shall",
+    "should",
+    "may",
+    "might",
+    "must",
+    "has",
+    "have",
+    "had",
+)
+
+# Words that only start the subject because they started the sentence
+YODA_LOWERCASE_WORDS = {
+    "a",
+    "an",
+    "it",
+    "its",
+    "the",
+    "this",
+    "that",
+    "these",
+    "those",
+    "they",
+    "their",
+    "he",
+    "she",
+    "his",
+    "her",
+    "we",
+    "you",
+    "when",
+    "if",
+}
+
+_SHAKESPEARE_PATTERN = re.compile(
+    r"\b("
+    + "|".join(
+        re.escape(key).replace(r"\ ", r"\s+")
+        for key in sorted(SHAKESPEARE_TABLE, key=len, reverse=True)
+    )
+    + r")\b",
+    re.IGNORECASE,
+)
+_SENTENCE_PATTERN = re.compile(r"[^.!?]+[.!?]*")
+_YODA_PATTERN = re.compile(
+    r"^(?P<subject>(?:[^\s,;:]+\s+){0,3}?[^\s,;:]+)\s+(?P<verb>"
+    + "|".join(YODA_VERBS)
+    + r")\s+(?P<rest>.+?)(?P<end>[.!?]*)$",
+    re.IGNORECASE,
+)
+
+
+def _match_case(source, replacement):
+    """
+    Gives a replacement the same capitalisation as the text it replaces
+    :param source: String text being replaced
+    :param replacement: String replacement text
+    :return: String replacement in the case of the source
+    """
+    if source.isupper() and len(source) > 1:
+        return replacement.upper()
+    if source[0].isupper():
+        # Skip leading apostrophes, 'tis becomes 'Tis
+        index = len(replacement) - len(replacement.lstrip("'"))
+        return replacement[:index] + replacement[index:].capitalize()
+    return replacement
+
+
+def _shakespeare_word(match):
+    """
+    Swaps a matched word or phrase for its Shakespearean equivalent
+    :param match: re.Match of the word or phrase
+    :return: String replacement text
+    """
+    source = match.group(0)
+    key = " ".join(source.lower().split())
+    return _match_case(source, SHAKESPEARE_TABLE[key])
+
+
+def _yoda_sentence(sentence):
+    """
+    Reorders a sentence Yoda style, moving everything after its first verb
+    to the front
+    :param sentence: String sentence without surrounding whitespace
+    :return: String reordered sentence
+    """
+    match = _YODA_PATTERN.match(sentence)
+    if match is None:
+        return sentence
+    subject = match.group("subject")
+    first_word = subject.split()[0]
+    if first_word.lower() in YODA_LOWERCASE_WORDS and first_word.istitle():
+        subject = subject[0].lower() + subject[1:]
+    rest = match.group("rest")
+    rest = rest[0].upper() + rest[1:]
+    end = match.group("end") or "."
+    return f"{rest}, {subject} {match.group('verb').lower()}{end}"
+
+
+def translate_shakespeare(text):
+    """
+    Translates a string to the Shakespeare equivalent without any network
+    access
+    :param text: String text to translate
+    :return: String translated text
+    """
+    return _SHAKESPEARE_PATTERN.sub(_shakespeare_word, text)
+
+
+def translate_yoda(text):
+    """
+    Translates a string to the Yoda equivalent without any network access
+    :param text: String text to translate
+    :return: String translated text
+    """
+    sentences = [
+        _yoda_sentence(sentence.strip())
+        for sentence in _SENTENCE_PATTERN.findall(text)
+        if sentence.strip()
+    ]
+    return " ".join(sentences)
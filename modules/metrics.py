@@ -0,0 +1,61 @@
+import threading
+
+
+class MetricsRegistry:
+    def __init__(self):
+        """
+        Initialise the registry
+        """
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._sources = {}
+
+    def increment(self, name, value=1):
+        """
+        Increments a named counter
+        :param name: String name of the counter
+        :param value: Integer amount to add to the counter
+        """
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def get(self, name):
+        """
+        Gets the current value of a named counter
+        :param name: String name of the counter
+        :return: Integer value of the counter
+        """
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def register_source(self, name, source):
+        """
+        Registers a callable whose result is included in every snapshot
+        :param name: String key the source is reported under
+        :param source: Callable taking no arguments and returning a Dict
+        """
+        with self._lock:
+            self._sources[name] = source
+
+    def snapshot(self):
+        """
+        Builds a point in time view of every counter and registered source
+        :return: Dict of the metrics data
+        """
+        with self._lock:
+            result = {"counters": dict(self._counters)}
+            sources = list(self._sources.items())
+        for name, source in sources:
+            result[name] = source()
+        return result
+
+    def reset(self):
+        """
+        Resets every counter back to zero
+        """
+        with self._lock:
+            self._counters.clear()
+
+
+# The process wide registry shared by every module
+registry = MetricsRegistry()
@@ -0,0 +1,112 @@
+import os
+import asyncio
+import functools
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+from modules import metrics
+
+
+class ForkSafeExecutor:
+    def __init__(self, max_workers, on_start=None):
+        """
+        Initialise the executor, its threads are only started on first use
+        :param max_workers: Integer number of threads
+        :param on_start: Callable taking no arguments run whenever new
+        threads are started, such as in a forked worker, None runs nothing
+        """
+        self.max_workers = max_workers
+        self.on_start = on_start
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._executor = None
+
+    def get(self):
+        """
+        Gets the executor of this process, threads never survive a fork so a
+        forked worker builds its own
+        :return: ThreadPoolExecutor
+        """
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers
+                )
+                self._pid = os.getpid()
+                if self.on_start is not None:
+                    self.on_start()
+            return self._executor
+
+    def shutdown(self):
+        """
+        Waits for every call submitted and stops the threads, the next call
+        starts new ones
+        """
+        with self._lock:
+            executor = self._executor
+            self._executor = None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+class Offloader:
+    # Threads per worker running the blocking parts of async requests
+    MAX_WORKERS = int(os.environ.get("OFFLOAD_MAX_WORKERS", 16))
+
+    def __init__(self, max_workers=16):
+        """
+        Initialise the offloader
+        :param max_workers: Integer number of threads running blocking calls
+        """
+        self.max_workers = max(max_workers, 1)
+        self._lock = threading.Lock()
+        self._threads = ForkSafeExecutor(self.max_workers)
+        self._counters = {}
+        self._reset_counters()
+
+    def _reset_counters(self):
+        """
+        Resets the statistics counters, the caller must hold the lock
+        """
+        self._counters = {"offloaded": 0, "inline": 0}
+
+    async def run(self, blocking, fn, *args):
+        """
+        Calls fn without blocking the event loop. Calls that only touch
+        memory run inline, a thread hop costs more than they do.
+        :param blocking: Boolean whether fn may block on disk or a file lock
+        :param fn: Callable to run
+        :param args: Positional arguments of fn
+        :return: The result of fn
+        """
+        if not blocking:
+            with self._lock:
+                self._counters["inline"] += 1
+            return fn(*args)
+        executor = self._threads.get()
+        with self._lock:
+            self._counters["offloaded"] += 1
+        return await asyncio.get_event_loop().run_in_executor(
+            executor, functools.partial(fn, *args)
+        )
+
+    def stats(self):
+        """
+        Reports how many blocking calls were moved off the event loop
+        :return: Dict of the offload statistics
+        """
+        with self._lock:
+            return dict(self._counters)
+
+    def reset(self):
+        """
+        Resets the statistics counters
+        """
+        with self._lock:
+            self._reset_counters()
+
+
+# The process wide offloader used by the async serving mode
+offloader = Offloader(Offloader.MAX_WORKERS)
+metrics.registry.register_source("offload", offloader.stats)
@@ -0,0 +1,148 @@
+import re
+import json
+
+# Every byte except those changing the nesting depth or string state
+_STRUCTURAL = b'{}[]"'
+_IGNORED_BYTES = bytes(byte for byte in range(256) if byte not in _STRUCTURAL)
+_COLON_PATTERN = re.compile(rb"\s*:\s*")
+_WHITESPACE = b" \t\r\n"
+# A number is only whole once a byte that cannot be part of it follows
+_NUMBER_START = "-0123456789"
+_NUMBER_DELIMITERS = ",}] \t\r\n"
+
+
+class TopLevelScanner:
+    def __init__(self, key):
+        """
+        Initialise the scanner
+        :param key: String top level key of the JSON object to find
+        """
+        self.key = key
+        self.found = False
+        self.value = None
+        self._needle = json.dumps(key).encode("utf-8")
+        self._decoder = json.JSONDecoder()
+        self._buffer = b""
+        self._depth = 0
+        self._in_string = False
+        self._ended = False
+
+    def _advance(self, data):
+        """
+        Moves the nesting depth and string state past a run of bytes that
+        does not end part way through an escape sequence. Only the
+        structural bytes are looked at, so no Python level loop runs per
+        byte or per value.
+        :param data: Bytes of the document being skipped
+        """
+        if b"\\" in data:
+            # Escaped backslashes and quotes never change the state
+            data = data.replace(b"\\\\", b"").replace(b'\\"', b"")
+        data = data.translate(None, _IGNORED_BYTES)
+        if self._in_string:
+            data = b'"' + data
+        # Strings without brackets inside them cancel out
+        data = data.replace(b'""', b"")
+        self._in_string = False
+        if b'"' in data:
+            parts = data.split(b'"')
+            self._in_string = len(parts) % 2 == 0
+            data = b"".join(parts[0::2])
+        self._depth += (
+            data.count(b"{")
+            + data.count(b"[")
+            - data.count(b"}")
+            - data.count(b"]")
+        )
+
+    @staticmethod
+    def _safe_end(data, end):
+        """
+        Moves an end position back so it never splits an escape sequence
+        :param data: Bytes of the buffered document
+        :param end: Integer position to end at
+        :return: Integer position to end at
+        """
+        while end > 0 and data.endswith(b"\\", 0, end):
+            end -= 1
+        return end
+
+    def _read_value(self):
+        """
+        Decodes the value of the key at the start of the buffer once the
+        whole of it has arrived
+        :return: Boolean whether the key was found, None when more data is
+        needed to tell
+        """
+        after_key = len(self._needle)
+        colon = _COLON_PATTERN.match(self._buffer, after_key)
+        if colon is None:
+            if self._buffer[after_key:].strip(_WHITESPACE):
+                # A string value that only looks like the key
+                return False
+            return None
+        value_start = colon.end()
+        text = self._buffer[value_start:].decode("utf-8", "ignore")
+        try:
+            value, end = self._decoder.raw_decode(text)
+        except ValueError:
+            return None
+        if (
+            text[0] in _NUMBER_START
+            and not self._ended
+            and (end == len(text) or text[end] not in _NUMBER_DELIMITERS)
+        ):
+            # The rest of the number may still be in the next chunk
+            return None
+        self.value = value
+        self.found = True
+        self._buffer = b""
+        return True
+
+    def close(self):
+        """
+        Tells the scanner the document has ended, so a number running up to
+        the end of it is whole
+        :return: Boolean whether the value of the key has been found
+        """
+        self._ended = True
+        return self.feed(b"")
+
+    def feed(self, chunk):
+        """
+        Scans the next chunk of a streamed JSON object, keeping only the
+        bytes that could still be part of the key or its value
+        :param chunk: Bytes of the next part of the document
+        :return: Boolean whether the value of the key has been found
+        """
+        if self.found:
+            return True
+        self._buffer += chunk
+        while True:
+            index = self._buffer.find(self._needle)
+            if index == -1:
+                end = self._safe_end(
+                    self._buffer, len(self._buffer) - len(self._needle) + 1
+                )
+                if end > 0:
+                    self._advance(self._buffer[:end])
+                    self._buffer = self._buffer[end:]
+                return False
+            end = self._safe_end(self._buffer, index)
+            if end != index and (index - end) % 2:
+                # An escaped quote inside a string
+                end = index + 1
+                self._advance(self._buffer[:end])
+                self._buffer = self._buffer[end:]
+                continue
+            self._advance(self._buffer[:index])
+            self._buffer = self._buffer[index:]
+            if not self._in_string and self._depth == 1:
+                found = self._read_value()
+                if found is None:
+                    return False
+                if found:
+                    return True
+            end = len(self._needle)
+            self._advance(self._buffer[:end])
+            self._buffer = self._buffer[end:]
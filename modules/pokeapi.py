@@ -1,20 +1,75 @@
 import os
+import time
+import asyncio
 import requests
 
 from http import HTTPStatus
+from concurrent.futures import ThreadPoolExecutor
 
+from modules import (
+    cache,
+    circuitbreaker,
+    hedging,
+    jsoncodec,
+    metrics,
+    offload,
+    partialjson,
+    refresh,
+    retry,
+    sessions,
+    singleflight,
+    snapshot,
+    species,
+    speciesindex,
+    timeouts,
+)
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - only needed by the async mode
+    httpx = None
+
+
+class PokeAPIBase:
+    """
+    The parsing and caching shared by the blocking and non-blocking
+    Pokeapi.co wrappers, it never sends a request itself
+    """
 
-class PokeAPIWrapper:
     # The URL of the Pokeapi, including the inital API path
     POKEAPI_URL = os.environ.get("POKEAPI_URL", None)
-    # Set the maximum timeout time of every request
-    REQUEST_TIMEOUT_TIME = 10
+    # Maximum number of parsed species records held in memory
+    SPECIES_CACHE_MAX_ENTRIES = int(
+        os.environ.get("SPECIES_CACHE_MAX_ENTRIES", 4096)
+    )
+    # Number of seconds a cached species record stays fresh
+    SPECIES_CACHE_TTL = int(os.environ.get("SPECIES_CACHE_TTL", 86400))
+    # Number of seconds an expired species record is still served while it
+    # is refreshed in the background, or while PokeAPI is failing
+    SPECIES_CACHE_STALE_TTL = int(
+        os.environ.get("SPECIES_CACHE_STALE_TTL", 7 * 86400)
+    )
+    # Memory ceiling in bytes of every cached species record
+    SPECIES_CACHE_MAX_BYTES = int(
+        os.environ.get("SPECIES_CACHE_MAX_BYTES", 16 * 1024 * 1024)
+    )
+    # Maximum number of unknown Pokemon names remembered
+    NOT_FOUND_CACHE_MAX_ENTRIES = int(
+        os.environ.get("NOT_FOUND_CACHE_MAX_ENTRIES", 8192)
+    )
+    # Number of seconds an unknown Pokemon name is remembered
+    NOT_FOUND_CACHE_TTL = int(os.environ.get("NOT_FOUND_CACHE_TTL", 300))
+    # Number of bytes read at a time when only part of a response is needed
+    STREAM_CHUNK_SIZE = int(os.environ.get("POKEAPI_STREAM_CHUNK_SIZE", 16384))
+    # Species crawled from Pokeapi.co at the same time while seeding the
+    # species index
+    SEED_CONCURRENCY = int(os.environ.get("SPECIES_INDEX_SEED_CONCURRENCY", 8))
 
     def __init__(self):
         """
         Initialise the wrapper
         """
-        if PokeAPIWrapper.POKEAPI_URL is None:
+        if PokeAPIBase.POKEAPI_URL is None and snapshot.store is None:
             raise RuntimeError(
                 "Missing required environment variable 'POKEAPI_URL'"
             )
@@ -26,30 +81,328 @@ class PokeAPIWrapper:
         :return: String full URL to target
         """
         if path.startswith("/"):
-            return f"{PokeAPIWrapper.POKEAPI_URL}{path}"
-        return f"{PokeAPIWrapper.POKEAPI_URL}/{path}"
+            return f"{PokeAPIBase.POKEAPI_URL}{path}"
+        return f"{PokeAPIBase.POKEAPI_URL}/{path}"
+
+    def _circuit_open(self):
+        """
+        Builds the response given while the circuit breaker of Pokeapi.co is
+        open, without sending a request
+        :return: A Tuple containing:
+        - Dict of the response data
+        - Integer HTTP Status Code
+        """
+        return {
+            "message": "Error: Pokeapi.co is unavailable, please try again "
+            "later"
+        }, HTTPStatus.SERVICE_UNAVAILABLE
+
+    def _read_pokeapi_document(self, response):
+        """
+        Reads the whole document out of a Pokeapi.co response
+        :param response: The requests or httpx Response received, its body
+        already read
+        :return: A Tuple containing:
+        - Dict of the response data
+        - Integer HTTP Status Code
+        """
+        if response.status_code != HTTPStatus.OK:
+            return {"message": f"Error: {response.text}"}, response.status_code
+        return jsoncodec.loads(response.content), response.status_code
+
+    def _scanned_result(self, scanner):
+        """
+        Builds the response data holding only the key that was streamed for
+        :param scanner: partialjson.TopLevelScanner fed the whole response
+        :return: Dict of the response data
+        """
+        if not scanner.found and not scanner.close():
+            raise ValueError(f"Response has no {scanner.key!r} key")
+        return {scanner.key: scanner.value}
+
+    def _snapshot_species(self, species):
+        """
+        Builds the response of a species looked up in the snapshot
+        :param species: Dict of the species data or None when the snapshot
+        does not have it
+        :return: A Tuple containing:
+        - Dict of the response data
+        - Integer HTTP Status Code
+        """
+        if species is None:
+            return {"message": "Error: Not Found"}, HTTPStatus.NOT_FOUND
+        return species, HTTPStatus.OK
+
+    def _get_cached_species(self, cache_key, refresh_fn):
+        """
+        Gets a species from the cache, scheduling a background refresh when
+        it is stale
+        :param cache_key: Tuple key of the species in the cache
+        :param refresh_fn: Callable run in the background to refresh it
+        :return: Dict copy of the species data or None
+        """
+        entry = species_cache.get_entry(cache_key)
+        if entry is None:
+            return None
+        cached, fresh = entry
+        if not fresh:
+            refresh.refresher.submit(cache_key, refresh_fn)
+        return species.to_dict(cached)
+
+    def _store_species(self, species_id, result):
+        """
+        Parses a /pokemon-species/ response and caches the species details
+        :param species_id: Integer ID of the species
+        :param result: Dict of the /pokemon-species/ response data
+        :return: A Tuple containing:
+        - Dict of the response data
+        - Integer HTTP Status Code
+        """
+        try:
+            record = species.SpeciesRecord(
+                result["name"],
+                result["habitat"]["name"],
+                result["is_legendary"],
+                result["flavor_text_entries"][0]["flavor_text"]
+                .replace("\n", " ")
+                .replace("\r", " ")
+                .replace("\f", " "),
+            )
+        except Exception:
+            return {
+                "message": "Error: Failed to parse data"
+            }, HTTPStatus.INTERNAL_SERVER_ERROR
+
+        species_cache.set(("id", species_id), record)
+        return record.to_dict(), HTTPStatus.OK
+
+    def _crawled_species(self, species_id, result, status_code):
+        """
+        Caches the species of a /pokemon-species/ response along with the
+        names of its varieties, the Pokemon names Pokeapi.co serves it under
+        :param species_id: Integer ID of the species
+        :param result: Dict of the /pokemon-species/ response data
+        :param status_code: Integer HTTP Status Code of the response
+        :return: A Tuple containing:
+        - Dict of the response data, the species data under the species key
+        and the normalised variety names under the varieties key
+        - Integer HTTP Status Code
+        """
+        if status_code != HTTPStatus.OK:
+            return result, status_code
+        try:
+            varieties = [
+                speciesindex.normalise_name(variety["pokemon"]["name"])
+                for variety in result["varieties"]
+            ]
+        except Exception:
+            return {
+                "message": "Error: Failed to parse data"
+            }, HTTPStatus.INTERNAL_SERVER_ERROR
+        result, status_code = self._store_species(species_id, result)
+        if status_code != HTTPStatus.OK:
+            return result, status_code
+        return {"species": result, "varieties": varieties}, HTTPStatus.OK
+
+    def _get_cached_species_by_name(self, pokemon_name):
+        """
+        Gets a species, or the knowledge that it does not exist, from the
+        cache by Pokemon name
+        :param pokemon_name: String normalised name of the Pokemon
+        :return: A Tuple of the response data and HTTP Status Code, or None
+        """
+        cached = self._get_cached_species(
+            ("name", pokemon_name),
+            lambda: PokeAPIWrapper()._refresh_species_name(pokemon_name),
+        )
+        if cached is not None:
+            return cached, HTTPStatus.OK
+        not_found = not_found_cache.get(pokemon_name)
+        if not_found is not None:
+            return dict(not_found), HTTPStatus.NOT_FOUND
+        return None
 
-    def _send_pokeapi_get(self, path):
+    def _index_pokemon(self, pokemon_name, result, status_code):
+        """
+        Records the species ID of a /pokemon/ response in the species index,
+        remembering names Pokeapi.co does not know
+        :param pokemon_name: String normalised name of the Pokemon
+        :param result: Dict of the /pokemon/ response data
+        :param status_code: Integer HTTP Status Code of the response
+        :return: A Tuple containing:
+        - Integer species ID, or None when it could not be found
+        - Dict of the error response data
+        - Integer HTTP Status Code
+        """
+        if status_code == HTTPStatus.NOT_FOUND:
+            not_found_cache.set(pokemon_name, dict(result))
+        if status_code != HTTPStatus.OK:
+            return None, result, status_code
+
+        try:
+            species_url = result["species"]["url"]
+            species_id = int(species_url.split("/")[-2])
+        except Exception:
+            return (
+                None,
+                {"message": "Error: Failed to parse data"},
+                HTTPStatus.INTERNAL_SERVER_ERROR,
+            )
+        speciesindex.index.add(pokemon_name, species_id)
+        return species_id, None, HTTPStatus.OK
+
+    def _cache_species_name(self, pokemon_name, result, status_code):
+        """
+        Caches a species found through a Pokemon name under that name
+        :param pokemon_name: String normalised name of the Pokemon
+        :param result: Dict of the species data
+        :param status_code: Integer HTTP Status Code of the lookup
         """
-        A generic method to send GET requests to Pokeapi.co
+        if status_code == HTTPStatus.OK:
+            species_cache.set(
+                ("name", pokemon_name), species.SpeciesRecord.from_dict(result)
+            )
+
+    def _parse_species_list(self, result, status_code):
+        """
+        Parses a /pokemon-species/ list response
+        :param result: Dict of the /pokemon-species/ response data
+        :param status_code: Integer HTTP Status Code of the response
+        :return: A Tuple containing:
+        - Dict of the response data, mapping each species name to its ID
+        under the species key
+        - Integer HTTP Status Code
+        """
+        if status_code != HTTPStatus.OK:
+            return result, status_code
+
+        try:
+            mapping = {
+                species["name"]: int(species["url"].split("/")[-2])
+                for species in result["results"]
+            }
+        except Exception:
+            return {
+                "message": "Error: Failed to parse data"
+            }, HTTPStatus.INTERNAL_SERVER_ERROR
+        return {"species": mapping}, HTTPStatus.OK
+
+    def _seed_from_crawls(self, species_ids, crawls):
+        """
+        Seeds the species index with the variety names of crawled species
+        :param species_ids: List of Integer species IDs crawled
+        :param crawls: List of the crawl_species result Tuples, in the same
+        order
+        :return: A Tuple containing:
+        - Dict of the response data
+        - Integer HTTP Status Code
+        """
+        mapping = {}
+        failed = []
+        for species_id, (result, status_code) in zip(species_ids, crawls):
+            if status_code != HTTPStatus.OK:
+                failed.append(species_id)
+                continue
+            mapping.update((name, species_id) for name in result["varieties"])
+        speciesindex.index.seed(mapping)
+        if failed:
+            return {
+                "message": f"Error: Failed to fetch {len(failed)} species, "
+                "run the seeding again to retry them",
+                "seeded": len(mapping),
+                "failed": failed,
+            }, HTTPStatus.SERVICE_UNAVAILABLE
+        return {"seeded": len(mapping)}, HTTPStatus.OK
+
+
+class PokeAPIWrapper(PokeAPIBase):
+    """
+    Gets Pokemon species from Pokeapi.co, blocking until each request is
+    answered
+    """
+
+    def _send_pokeapi_get(self, path, only_key=None):
+        """
+        A generic method to send GET requests to Pokeapi.co, concurrent
+        requests for the same path share a single upstream request
         :param path: String target path to hit on the API
+        :param only_key: String top level key to stream the response for,
+        the rest of the document is never parsed. None reads all of it.
         :return: A Tuple containing:
         - Dict of the response data
         - Integer HTTP Status Code
         """
-        result = {}
         url = self._build_pokeapi_url(path)
+        params = {"only": only_key} if only_key is not None else None
+        return singleflight.group.do(
+            singleflight.request_key(url, params),
+            lambda: self._fetch_pokeapi(url, only_key),
+        )
+
+    def _fetch_pokeapi(self, url, only_key=None):
+        """
+        Sends a GET request to Pokeapi.co, retrying transient failures with a
+        jittered backoff while the retry budget allows
+        :param url: String full URL to target
+        :param only_key: String top level key to stream the response for
+        :return: A Tuple containing:
+        - Dict of the response data
+        - Integer HTTP Status Code
+        """
+        retry.budget.deposit()
+        attempt = 0
+        while True:
+            result, status_code, retryable = self._attempt_pokeapi(
+                url, attempt, only_key
+            )
+            delay = None
+            if retryable:
+                delay = retry.policy.next_delay("pokeapi", attempt)
+            if delay is None:
+                return result, status_code
+            time.sleep(delay)
+            attempt += 1
+
+    def _attempt_pokeapi(self, url, attempt, only_key=None):
+        """
+        Sends a single attempt of a GET request to Pokeapi.co, hedged when
+        it is slower than usual
+        :param url: String full URL to target
+        :param attempt: Integer index of the attempt, starting at 0
+        :param only_key: String top level key to stream the response for
+        :return: A Tuple containing:
+        - Dict of the response data
+        - Integer HTTP Status Code
+        - Boolean whether the attempt may be retried
+        """
+        if not circuitbreaker.pokeapi.allow():
+            result, status_code = self._circuit_open()
+            return result, status_code, False
+        result = {}
+        healthy = False
+        retryable = False
+        start = time.monotonic()
+        timeout = timeouts.policy.timeout(url)
+        stream = only_key is not None
         try:
-            response = requests.get(
+            response = hedging.hedger.get(
                 url,
-                timeout=PokeAPIWrapper.REQUEST_TIMEOUT_TIME,
+                lambda: sessions.pool.get(url, timeout=timeout, stream=stream),
             )
-            if response.status_code != HTTPStatus.OK:
-                result["message"] = f"Error: {response.text}"
-                return result, response.status_code
-
-            result = response.json()
-            return result, response.status_code
+            healthy = response.status_code < HTTPStatus.INTERNAL_SERVER_ERROR
+            retryable = response.status_code in retry.RETRYABLE_STATUS_CODES
+            result, status_code = self._read_pokeapi_response(
+                response, only_key
+            )
+            return result, status_code, retryable
+        except (
+            requests.exceptions.ConnectionError,
+            requests.exceptions.Timeout,
+        ):
+            retryable = True
+            result[
+                "message"
+            ] = "Error: Failed to retrieve data, please try again later"
         except requests.exceptions.RequestException:
             result[
                 "message"
@@ -58,59 +411,482 @@ class PokeAPIWrapper:
             result[
                 "message"
             ] = "Error: Bad response received from remote server"
-        return result, HTTPStatus.INTERNAL_SERVER_ERROR
+        finally:
+            elapsed = time.monotonic() - start
+            circuitbreaker.pokeapi.record(healthy, elapsed)
+            retry.policy.record_attempt("pokeapi", attempt, elapsed)
+        return result, HTTPStatus.INTERNAL_SERVER_ERROR, retryable
+
+    def _read_pokeapi_response(self, response, only_key=None):
+        """
+        Reads the data out of a Pokeapi.co response
+        :param response: The requests or httpx Response received
+        :param only_key: String top level key to stream the response for
+        :return: A Tuple containing:
+        - Dict of the response data
+        - Integer HTTP Status Code
+        """
+        if response.status_code != HTTPStatus.OK or only_key is None:
+            return self._read_pokeapi_document(response)
+        scanner = partialjson.TopLevelScanner(only_key)
+        chunks = response.iter_content(PokeAPIBase.STREAM_CHUNK_SIZE)
+        for chunk in chunks:
+            if scanner.feed(chunk):
+                break
+        # Read the rest without keeping it so the connection can be reused
+        for _ in chunks:
+            pass
+        return self._scanned_result(scanner), response.status_code
 
     def get_pokemon_species_by_id(self, species_id):
         """
-        Given a Pokemon Species ID, gets the details about that Pokemon species
+        Given a Pokemon Species ID, gets the details about that Pokemon
+        species. Stale cached species are returned straight away and
+        refreshed in the background.
+        :param species_id: Integer ID of the species
+        :return: A Tuple containing:
+        - Dict of the response data
+        - Integer HTTP Status Code
+        """
+        if snapshot.store is not None:
+            return self._snapshot_species(snapshot.store.get_by_id(species_id))
+        cached = self._get_cached_species(
+            ("id", species_id), lambda: self._fetch_species(species_id)
+        )
+        if cached is not None:
+            return cached, HTTPStatus.OK
+        return self._fetch_species(species_id)
+
+    def _fetch_species(self, species_id):
+        """
+        Fetches the details about a Pokemon species from Pokeapi.co and
+        caches them
         :param species_id: Integer ID of the species
         :return: A Tuple containing:
         - Dict of the response data
         - Integer HTTP Status Code
         """
-        pokemon_species_data = {}
         result, status_code = self._send_pokeapi_get(
             f"/pokemon-species/{species_id}/"
         )
         if status_code != HTTPStatus.OK:
             return result, status_code
+        return self._store_species(species_id, result)
 
-        try:
-            pokemon_species_data["name"] = result["name"]
-            pokemon_species_data["habitat"] = result["habitat"]["name"]
-            pokemon_species_data["isLegendary"] = result["is_legendary"]
-            pokemon_species_data["description"] = (
-                result["flavor_text_entries"][0]["flavor_text"]
-                .replace("\n", " ")
-                .replace("\r", " ")
-                .replace("\f", " ")
-            )
-        except Exception:
-            return {
-                "message": "Error: Failed to parse data"
-            }, HTTPStatus.INTERNAL_SERVER_ERROR
-
-        return pokemon_species_data, HTTPStatus.OK
+    def crawl_species(self, species_id):
+        """
+        Fetches a Pokemon species from Pokeapi.co with the names of the
+        Pokemon it is served under
+        :param species_id: Integer ID of the species
+        :return: A Tuple containing:
+        - Dict of the response data, the species data under the species key
+        and the normalised variety names under the varieties key
+        - Integer HTTP Status Code
+        """
+        result, status_code = self._send_pokeapi_get(
+            f"/pokemon-species/{species_id}/"
+        )
+        return self._crawled_species(species_id, result, status_code)
 
     def get_pokemon_species_by_name(self, pokemon_name):
         """
-        Given a Pokemon name, gets the details about that Pokemon species
+        Given a Pokemon name, gets the details about that Pokemon species.
+        Names already in the species index skip the /pokemon/ lookup.
         :param pokemon_name: String name of the Pokemon
         :return: A Tuple containing:
         - Dict of the response data
         - Integer HTTP Status Code
         """
+        if snapshot.store is not None:
+            return self._snapshot_species(
+                snapshot.store.get_by_name(pokemon_name)
+            )
+        pokemon_name = speciesindex.normalise_name(pokemon_name)
+        cached = self._get_cached_species_by_name(pokemon_name)
+        if cached is not None:
+            return cached
+
+        species_id = speciesindex.index.get(pokemon_name)
+        if species_id is not None:
+            return self._get_indexed_species(pokemon_name, species_id)
+
         result, status_code = self._send_pokeapi_get(
-            f"/pokemon/{pokemon_name}"
+            f"/pokemon/{pokemon_name}", only_key="species"
+        )
+        species_id, result, status_code = self._index_pokemon(
+            pokemon_name, result, status_code
         )
+        if species_id is None:
+            return result, status_code
+        return self._get_indexed_species(pokemon_name, species_id)
+
+    def _get_indexed_species(self, pokemon_name, species_id):
+        """
+        Gets the details of a species and caches them under the Pokemon name
+        :param pokemon_name: String normalised name of the Pokemon
+        :param species_id: Integer ID of the species
+        :return: A Tuple containing:
+        - Dict of the response data
+        - Integer HTTP Status Code
+        """
+        result, status_code = self.get_pokemon_species_by_id(species_id)
+        self._cache_species_name(pokemon_name, result, status_code)
+        return result, status_code
+
+    def _refresh_species_name(self, pokemon_name):
+        """
+        Refetches the species cached under a Pokemon name
+        :param pokemon_name: String normalised name of the Pokemon
+        """
+        species_id = speciesindex.index.get(pokemon_name)
+        if species_id is None:
+            return
+        result, status_code = self._fetch_species(species_id)
+        self._cache_species_name(pokemon_name, result, status_code)
+
+    def seed_species_index(self):
+        """
+        Bulk seeds the species index with the name of every Pokemon, the
+        varieties of every species. Species names are not Pokemon names
+        unless a variety shares them.
+        :return: A Tuple containing:
+        - Dict of the response data
+        - Integer HTTP Status Code
+        """
+        result, status_code = self.list_species()
         if status_code != HTTPStatus.OK:
             return result, status_code
+        species_ids = sorted(set(result["species"].values()))
+        with ThreadPoolExecutor(
+            max_workers=max(PokeAPIBase.SEED_CONCURRENCY, 1)
+        ) as pool:
+            crawls = list(pool.map(self.crawl_species, species_ids))
+        return self._seed_from_crawls(species_ids, crawls)
 
+    def list_species(self):
+        """
+        Lists the name and ID of every Pokemon species
+        :return: A Tuple containing:
+        - Dict of the response data, mapping each species name to its ID
+        under the species key
+        - Integer HTTP Status Code
+        """
+        result, status_code = self._send_pokeapi_get(
+            "/pokemon-species/?limit=100000"
+        )
+        return self._parse_species_list(result, status_code)
+
+
+class AsyncPokeAPIWrapper(PokeAPIBase):
+    """
+    A non-blocking variant of PokeAPIWrapper for the async serving mode, it
+    shares the caches and species index of the blocking wrapper. Caches
+    and files that may block are read and written on the offload threads.
+    """
+
+    async def _send_pokeapi_get(self, path, only_key=None):
+        """
+        A generic method to send GET requests to Pokeapi.co, concurrent
+        requests for the same path share a single upstream request
+        :param path: String target path to hit on the API
+        :param only_key: String top level key to stream the response for,
+        the rest of the document is never parsed. None reads all of it.
+        :return: A Tuple containing:
+        - Dict of the response data
+        - Integer HTTP Status Code
+        """
+        url = self._build_pokeapi_url(path)
+        params = {"only": only_key} if only_key is not None else None
+        return await singleflight.async_group.do(
+            singleflight.request_key(url, params),
+            lambda: self._fetch_pokeapi(url, only_key),
+        )
+
+    async def _fetch_pokeapi(self, url, only_key=None):
+        """
+        Sends a GET request to Pokeapi.co without blocking the event loop,
+        retrying transient failures with a jittered backoff while the retry
+        budget allows
+        :param url: String full URL to target
+        :param only_key: String top level key to stream the response for
+        :return: A Tuple containing:
+        - Dict of the response data
+        - Integer HTTP Status Code
+        """
+        retry.budget.deposit()
+        attempt = 0
+        while True:
+            result, status_code, retryable = await self._attempt_pokeapi(
+                url, attempt, only_key
+            )
+            delay = None
+            if retryable:
+                delay = retry.policy.next_delay("pokeapi", attempt)
+            if delay is None:
+                return result, status_code
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _attempt_pokeapi(self, url, attempt, only_key=None):
+        """
+        Sends a single attempt of a GET request to Pokeapi.co, hedged when
+        it is slower than usual
+        :param url: String full URL to target
+        :param attempt: Integer index of the attempt, starting at 0
+        :param only_key: String top level key to stream the response for
+        :return: A Tuple containing:
+        - Dict of the response data
+        - Integer HTTP Status Code
+        - Boolean whether the attempt may be retried
+        """
+        if not circuitbreaker.pokeapi.allow():
+            result, status_code = self._circuit_open()
+            return result, status_code, False
+        result = {}
+        healthy = False
+        retryable = False
+        start = time.monotonic()
+        timeout = timeouts.policy.timeout(url)
+        stream = only_key is not None
         try:
-            species_url = result["species"]["url"]
-            species_id = int(species_url.split("/")[-2])
-            return self.get_pokemon_species_by_id(species_id)
+            response = await hedging.hedger.async_get(
+                url,
+                lambda: sessions.async_pool.get(
+                    url, timeout=timeout, stream=stream
+                ),
+            )
+            healthy = response.status_code < HTTPStatus.INTERNAL_SERVER_ERROR
+            retryable = response.status_code in retry.RETRYABLE_STATUS_CODES
+            if stream:
+                result, status_code = await self._read_streamed_response(
+                    response, only_key
+                )
+            else:
+                result, status_code = self._read_pokeapi_document(response)
+            return result, status_code, retryable
+        except httpx.TransportError:
+            retryable = True
+            result[
+                "message"
+            ] = "Error: Failed to retrieve data, please try again later"
+        except httpx.HTTPError:
+            result[
+                "message"
+            ] = "Error: Failed to retrieve data, please try again later"
         except Exception:
-            return {
-                "message": "Error: Failed to parse data"
-            }, HTTPStatus.INTERNAL_SERVER_ERROR
+            result[
+                "message"
+            ] = "Error: Bad response received from remote server"
+        finally:
+            elapsed = time.monotonic() - start
+            circuitbreaker.pokeapi.record(healthy, elapsed)
+            retry.policy.record_attempt("pokeapi", attempt, elapsed)
+        return result, HTTPStatus.INTERNAL_SERVER_ERROR, retryable
+
+    async def _read_streamed_response(self, response, only_key):
+        """
+        Reads the value of a single top level key out of a streamed
+        Pokeapi.co response without blocking the event loop
+        :param response: The streamed httpx Response received
+        :param only_key: String top level key to stream the response for
+        :return: A Tuple containing:
+        - Dict of the response data
+        - Integer HTTP Status Code
+        """
+        try:
+            if response.status_code != HTTPStatus.OK:
+                await response.aread()
+                return self._read_pokeapi_document(response)
+            scanner = partialjson.TopLevelScanner(only_key)
+            chunks = response.aiter_bytes()
+            async for chunk in chunks:
+                if scanner.feed(chunk):
+                    break
+            # Read the rest without keeping it so the connection can be
+            # reused
+            async for _ in chunks:
+                pass
+            return self._scanned_result(scanner), response.status_code
+        finally:
+            await response.aclose()
+
+    async def get_pokemon_species_by_id(self, species_id):
+        """
+        Given a Pokemon Species ID, gets the details about that Pokemon
+        species. Stale cached species are returned straight away and
+        refreshed in the background.
+        :param species_id: Integer ID of the species
+        :return: A Tuple containing:
+        - Dict of the response data
+        - Integer HTTP Status Code
+        """
+        if snapshot.store is not None:
+            return self._snapshot_species(snapshot.store.get_by_id(species_id))
+        cached = await offload.offloader.run(
+            species_cache.blocking,
+            self._get_cached_species,
+            ("id", species_id),
+            lambda: PokeAPIWrapper()._fetch_species(species_id),
+        )
+        if cached is not None:
+            return cached, HTTPStatus.OK
+        return await self._fetch_species(species_id)
+
+    async def _fetch_species(self, species_id):
+        """
+        Fetches the details about a Pokemon species from Pokeapi.co and
+        caches them
+        :param species_id: Integer ID of the species
+        :return: A Tuple containing:
+        - Dict of the response data
+        - Integer HTTP Status Code
+        """
+        result, status_code = await self._send_pokeapi_get(
+            f"/pokemon-species/{species_id}/"
+        )
+        if status_code != HTTPStatus.OK:
+            return result, status_code
+        return await offload.offloader.run(
+            species_cache.blocking, self._store_species, species_id, result
+        )
+
+    async def crawl_species(self, species_id):
+        """
+        Fetches a Pokemon species from Pokeapi.co with the names of the
+        Pokemon it is served under
+        :param species_id: Integer ID of the species
+        :return: A Tuple containing:
+        - Dict of the response data, the species data under the species key
+        and the normalised variety names under the varieties key
+        - Integer HTTP Status Code
+        """
+        result, status_code = await self._send_pokeapi_get(
+            f"/pokemon-species/{species_id}/"
+        )
+        return await offload.offloader.run(
+            species_cache.blocking,
+            self._crawled_species,
+            species_id,
+            result,
+            status_code,
+        )
+
+    async def get_pokemon_species_by_name(self, pokemon_name):
+        """
+        Given a Pokemon name, gets the details about that Pokemon species.
+        Names already in the species index skip the /pokemon/ lookup.
+        :param pokemon_name: String name of the Pokemon
+        :return: A Tuple containing:
+        - Dict of the response data
+        - Integer HTTP Status Code
+        """
+        if snapshot.store is not None:
+            return self._snapshot_species(
+                snapshot.store.get_by_name(pokemon_name)
+            )
+        pokemon_name = speciesindex.normalise_name(pokemon_name)
+        cached = await offload.offloader.run(
+            species_cache.blocking or not_found_cache.blocking,
+            self._get_cached_species_by_name,
+            pokemon_name,
+        )
+        if cached is not None:
+            return cached
+
+        species_id = await offload.offloader.run(
+            speciesindex.index.blocking, speciesindex.index.get, pokemon_name
+        )
+        if species_id is None:
+            result, status_code = await self._send_pokeapi_get(
+                f"/pokemon/{pokemon_name}", only_key="species"
+            )
+            species_id, result, status_code = await offload.offloader.run(
+                not_found_cache.blocking or speciesindex.index.blocking,
+                self._index_pokemon,
+                pokemon_name,
+                result,
+                status_code,
+            )
+            if species_id is None:
+                return result, status_code
+        return await self._get_indexed_species(pokemon_name, species_id)
+
+    async def _get_indexed_species(self, pokemon_name, species_id):
+        """
+        Gets the details of a species and caches them under the Pokemon name
+        :param pokemon_name: String normalised name of the Pokemon
+        :param species_id: Integer ID of the species
+        :return: A Tuple containing:
+        - Dict of the response data
+        - Integer HTTP Status Code
+        """
+        result, status_code = await self.get_pokemon_species_by_id(species_id)
+        await offload.offloader.run(
+            species_cache.blocking,
+            self._cache_species_name,
+            pokemon_name,
+            result,
+            status_code,
+        )
+        return result, status_code
+
+    async def seed_species_index(self):
+        """
+        Bulk seeds the species index with the name of every Pokemon, the
+        varieties of every species. Species names are not Pokemon names
+        unless a variety shares them.
+        :return: A Tuple containing:
+        - Dict of the response data
+        - Integer HTTP Status Code
+        """
+        result, status_code = await self.list_species()
+        if status_code != HTTPStatus.OK:
+            return result, status_code
+        species_ids = sorted(set(result["species"].values()))
+        slots = asyncio.Semaphore(max(PokeAPIBase.SEED_CONCURRENCY, 1))
+
+        async def crawl(species_id):
+            async with slots:
+                return await self.crawl_species(species_id)
+
+        crawls = await asyncio.gather(*(crawl(sid) for sid in species_ids))
+        return await offload.offloader.run(
+            speciesindex.index.blocking,
+            self._seed_from_crawls,
+            species_ids,
+            crawls,
+        )
+
+    async def list_species(self):
+        """
+        Lists the name and ID of every Pokemon species
+        :return: A Tuple containing:
+        - Dict of the response data, mapping each species name to its ID
+        under the species key
+        - Integer HTTP Status Code
+        """
+        result, status_code = await self._send_pokeapi_get(
+            "/pokemon-species/?limit=100000"
+        )
+        return self._parse_species_list(result, status_code)
+
+
+# Parsed species records shared by every PokeAPIWrapper, keyed by both the
+# species ID and the normalised Pokemon name
+species_cache = cache.build_cache(
+    "species",
+    max_entries=PokeAPIBase.SPECIES_CACHE_MAX_ENTRIES,
+    ttl=PokeAPIBase.SPECIES_CACHE_TTL,
+    max_bytes=PokeAPIBase.SPECIES_CACHE_MAX_BYTES,
+    stale_ttl=PokeAPIBase.SPECIES_CACHE_STALE_TTL,
+)
+metrics.registry.register_source("speciesCache", species_cache.stats)
+
+# Unknown Pokemon names shared by every PokeAPIWrapper, kept apart from the
+# species cache so bogus names can never evict real species
+not_found_cache = cache.build_cache(
+    "not_found",
+    max_entries=PokeAPIBase.NOT_FOUND_CACHE_MAX_ENTRIES,
+    ttl=PokeAPIBase.NOT_FOUND_CACHE_TTL,
+)
+metrics.registry.register_source("notFoundCache", not_found_cache.stats)
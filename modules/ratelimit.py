@@ -0,0 +1,196 @@
+import os
+import json
+import math
+import time
+import asyncio
+import threading
+
+from modules import offload
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+
+class TokenBucket:
+    def __init__(
+        self,
+        rate,
+        burst,
+        max_waiting=0,
+        path=None,
+        clock=time.time,
+        sleep=time.sleep,
+    ):
+        """
+        Initialise the bucket
+        :param rate: Number of tokens added per second, 0 or less disables
+        the limit
+        :param burst: Integer number of tokens the bucket can hold
+        :param max_waiting: Integer number of callers that may queue for a
+        token that has not been added yet
+        :param path: String path of a file holding the bucket so every worker
+        on the host shares it, None shares it within this process only
+        :param clock: Callable returning the current wall clock time
+        :param sleep: Callable sleeping for a number of seconds
+        """
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.max_waiting = max(max_waiting, 0)
+        self.path = path if fcntl is not None else None
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._state = {"tokens": float(self.burst), "updated": clock()}
+        self._counters = {}
+        self._reset_counters()
+
+    def _reset_counters(self):
+        """
+        Resets the statistics counters, the caller must hold the lock
+        """
+        self._counters = {"granted": 0, "queued": 0, "rejected": 0}
+
+    def _refill(self, state, now):
+        """
+        Adds the tokens earned since the bucket was last updated
+        :param state: Dict of the bucket tokens and last update time
+        :param now: Number of the current wall clock time
+        :return: Dict of the refilled bucket state
+        """
+        elapsed = max(now - state["updated"], 0)
+        tokens = min(state["tokens"] + elapsed * self.rate, self.burst)
+        return {"tokens": tokens, "updated": now}
+
+    def _take(self, state, timeout):
+        """
+        Reserves a token, the bucket may go negative by the number of queued
+        callers which each wait their turn for a future token
+        :param state: Dict of the refilled bucket state
+        :param timeout: Number of seconds the caller is willing to wait
+        :return: Number of seconds to wait for the token or None when it
+        cannot be reserved
+        """
+        tokens = state["tokens"] - 1
+        delay = max(-tokens / self.rate, 0)
+        if tokens < 0 and math.ceil(-tokens) > self.max_waiting:
+            return None
+        if delay > timeout:
+            return None
+        state["tokens"] = tokens
+        return delay
+
+    def reserve(self, timeout=0):
+        """
+        Reserves a token without waiting for it
+        :param timeout: Number of seconds the caller is willing to wait
+        :return: Number of seconds to wait before using the token or None
+        when the bucket is empty and the queue is full or too slow
+        """
+        if self.rate <= 0:
+            return 0
+        with self._lock:
+            if self.path is None:
+                state = self._refill(self._state, self._clock())
+                delay = self._take(state, timeout)
+                self._state = state
+            else:
+                delay = self._reserve_shared(timeout)
+            if delay is None:
+                self._counters["rejected"] += 1
+            elif delay > 0:
+                self._counters["queued"] += 1
+            else:
+                self._counters["granted"] += 1
+        return delay
+
+    def _reserve_shared(self, timeout):
+        """
+        Reserves a token from the bucket file under a host wide lock, falling
+        back to the bucket of this process if the file cannot be used. The
+        caller must hold the lock.
+        :param timeout: Number of seconds the caller is willing to wait
+        :return: Number of seconds to wait for the token or None
+        """
+        try:
+            with open(self.path, "a+") as bucket_file:
+                fcntl.flock(bucket_file, fcntl.LOCK_EX)
+                try:
+                    bucket_file.seek(0)
+                    try:
+                        state = json.loads(bucket_file.read())
+                    except ValueError:
+                        state = {"tokens": float(self.burst), "updated": 0}
+                    state = self._refill(state, self._clock())
+                    delay = self._take(state, timeout)
+                    bucket_file.seek(0)
+                    bucket_file.truncate()
+                    bucket_file.write(json.dumps(state))
+                    bucket_file.flush()
+                    return delay
+                finally:
+                    fcntl.flock(bucket_file, fcntl.LOCK_UN)
+        except OSError:
+            state = self._refill(self._state, self._clock())
+            delay = self._take(state, timeout)
+            self._state = state
+            return delay
+
+    def acquire(self, timeout=0):
+        """
+        Takes a token, waiting in the queue for up to timeout seconds
+        :param timeout: Number of seconds the caller is willing to wait
+        :return: Boolean whether a token was taken
+        """
+        delay = self.reserve(timeout)
+        if delay is None:
+            return False
+        if delay > 0:
+            self._sleep(delay)
+        return True
+
+    async def async_acquire(self, timeout=0):
+        """
+        Takes a token without blocking the event loop, waiting in the queue
+        for up to timeout seconds
+        :param timeout: Number of seconds the caller is willing to wait
+        :return: Boolean whether a token was taken
+        """
+        # A shared bucket is reserved under a file lock, off the event loop
+        delay = await offload.offloader.run(
+            self.path is not None, self.reserve, timeout
+        )
+        if delay is None:
+            return False
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return True
+
+    def stats(self):
+        """
+        Reports how many tokens were granted, queued for or rejected
+        :return: Dict of the rate limit statistics
+        """
+        with self._lock:
+            result = dict(self._counters)
+            if self.path is None:
+                state = self._refill(self._state, self._clock())
+                result["tokens"] = round(state["tokens"], 3)
+        return result
+
+    def reset(self):
+        """
+        Refills the bucket and resets the statistics counters
+        """
+        with self._lock:
+            self._state = {
+                "tokens": float(self.burst),
+                "updated": self._clock(),
+            }
+            self._reset_counters()
+            if self.path is not None:
+                try:
+                    os.remove(self.path)
+                except OSError:
+                    pass
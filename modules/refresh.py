@@ -0,0 +1,112 @@
+import os
+import threading
+
+from concurrent.futures import wait
+
+from modules import metrics, offload
+
+
+class BackgroundRefresher:
+    # Number of threads refreshing stale cache entries in the background
+    MAX_WORKERS = int(os.environ.get("REFRESH_MAX_WORKERS", 2))
+
+    def __init__(self, max_workers=2):
+        """
+        Initialise the refresher
+        :param max_workers: Integer number of background refresh threads
+        """
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        # Refreshes pending in the parent never finish in a forked worker
+        self._threads = offload.ForkSafeExecutor(
+            max_workers, on_start=self._forget_pending
+        )
+        self._pending = {}
+        self._counters = {}
+        self._reset_counters()
+
+    def _reset_counters(self):
+        """
+        Resets the statistics counters, the caller must hold the lock
+        """
+        self._counters = {"scheduled": 0, "deduplicated": 0, "failed": 0}
+
+    def _forget_pending(self):
+        """
+        Forgets the pending refreshes when new threads are started, the
+        caller must hold the lock
+        """
+        self._pending = {}
+
+    def submit(self, key, fn):
+        """
+        Runs fn in the background unless a refresh of the same key is already
+        pending
+        :param key: Hashable key identifying what is being refreshed
+        :param fn: Callable taking no arguments that refreshes the entry
+        :return: Boolean whether a new refresh was scheduled
+        """
+        with self._lock:
+            # Getting the executor first forgets the refreshes pending in
+            # the parent of a forked worker
+            executor = self._threads.get()
+            if key in self._pending:
+                self._counters["deduplicated"] += 1
+                return False
+            future = executor.submit(self._run, key, fn)
+            self._pending[key] = future
+            self._counters["scheduled"] += 1
+            return True
+
+    def _run(self, key, fn):
+        """
+        Runs a refresh, recording failures instead of raising them
+        :param key: Hashable key identifying what is being refreshed
+        :param fn: Callable taking no arguments that refreshes the entry
+        """
+        try:
+            fn()
+        except Exception:
+            with self._lock:
+                self._counters["failed"] += 1
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def wait(self, timeout=None):
+        """
+        Waits for every pending refresh to finish
+        :param timeout: Number of seconds to wait, None waits forever
+        """
+        with self._lock:
+            futures = list(self._pending.values())
+        wait(futures, timeout=timeout)
+
+    def shutdown(self):
+        """
+        Waits for every pending refresh and stops the refresh threads, the
+        next refresh starts new ones
+        """
+        self._threads.shutdown()
+
+    def stats(self):
+        """
+        Reports how many refreshes were scheduled
+        :return: Dict of the refresh statistics
+        """
+        with self._lock:
+            result = dict(self._counters)
+            result["pending"] = len(self._pending)
+        return result
+
+    def reset(self):
+        """
+        Resets the statistics counters
+        """
+        with self._lock:
+            self._reset_counters()
+
+
+# The process wide refresher shared by every API wrapper
+refresher = BackgroundRefresher(BackgroundRefresher.MAX_WORKERS)
+metrics.registry.register_source("backgroundRefresh", refresher.stats)
@@ -0,0 +1,256 @@
+import os
+import hashlib
+import threading
+
+from modules import (
+    cache,
+    funtranslations,
+    jsoncodec,
+    metrics,
+    pokeapi,
+    snapshot,
+    species,
+    speciesindex,
+)
+
+
+class EncodedResponse:
+    __slots__ = ("body", "etag", "content_length", "sources")
+
+    def __init__(self, body, sources=()):
+        """
+        Initialise the response, its ETag and length are worked out once
+        :param body: Bytes of the encoded JSON body
+        :param sources: Tuple of the (cache, key) entries the body was built
+        from, None when it is not tied to any
+        """
+        self.body = body
+        self.etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        self.content_length = len(body)
+        self.sources = sources
+
+    @classmethod
+    def from_result(cls, result, sources=()):
+        """
+        Encodes response data in the same format as the JSON representation
+        :param result: Dict of the response data
+        :param sources: Tuple of the (cache, key) entries the data was built
+        from, None when it is not tied to any
+        :return: EncodedResponse
+        """
+        return cls(jsoncodec.dumps(result) + b"\n", sources)
+
+
+def pokemon_key(pokemon_name):
+    """
+    Builds the cache key of a /pokemon/ response
+    :param pokemon_name: String name of the Pokemon
+    :return: Tuple cache key
+    """
+    return ("pokemon", speciesindex.normalise_name(pokemon_name))
+
+
+def translated_key(pokemon_name, mode):
+    """
+    Builds the cache key of a /pokemon/translated/ response
+    :param pokemon_name: String name of the Pokemon
+    :param mode: TranslationMode the description was translated with
+    :return: Tuple cache key
+    """
+    return (
+        "translated",
+        speciesindex.normalise_name(pokemon_name),
+        mode.value,
+    )
+
+
+def species_sources(pokemon_name, result):
+    """
+    Finds the species cache entry a species response was built from
+    :param pokemon_name: String name of the Pokemon
+    :param result: Dict of the species data being served
+    :return: Tuple of the (cache, key) entries, or None when the response
+    cannot be tied to a cache entry and must not be cached
+    """
+    if snapshot.store is not None:
+        # The snapshot never changes while it is being served
+        return ()
+    key = ("name", speciesindex.normalise_name(pokemon_name))
+    entry = pokeapi.species_cache.get_entry(key)
+    if entry is None or not entry[1] or species.to_dict(entry[0]) != result:
+        return None
+    return ((pokeapi.species_cache, key),)
+
+
+def translation_sources(language, description, translation, mode):
+    """
+    Finds the translation cache entry a translated description came from
+    :param language: TranslationLanguage the description was translated to
+    :param description: String untranslated description
+    :param translation: String translated description being served
+    :param mode: TranslationMode the description was translated with
+    :return: Tuple of the (cache, key) entries, or None when the translation
+    must not be cached
+    """
+    if mode == funtranslations.TranslationMode.LOCAL:
+        # Local translations always give the same text
+        return ()
+    key = funtranslations.translation_cache_key(description, language)
+    entry = funtranslations.translation_cache.get_entry(key)
+    # A local fallback translation is not in the cache, it is never kept
+    # so the real translation is served once funtranslations is back
+    if entry is None or not entry[1] or entry[0] != translation:
+        return None
+    return ((funtranslations.translation_cache, key),)
+
+
+def translated_sources(pokemon_name, result, language, translation, mode):
+    """
+    Finds the species and translation cache entries a translated response
+    was built from
+    :param pokemon_name: String name of the Pokemon
+    :param result: Dict of the species data, before it is translated
+    :param language: TranslationLanguage the description was translated to
+    :param translation: String translated description being served
+    :param mode: TranslationMode the description was translated with
+    :return: Tuple of the (cache, key) entries, or None when the response
+    must not be cached
+    """
+    species_entries = species_sources(pokemon_name, result)
+    if species_entries is None:
+        return None
+    translation_entries = translation_sources(
+        language, result["description"], translation, mode
+    )
+    if translation_entries is None:
+        return None
+    return species_entries + translation_entries
+
+
+class ResponseCache:
+    # Maximum number of encoded responses held in memory
+    MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", 1024))
+    # Memory ceiling of the encoded responses in bytes
+    MAX_BYTES = int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", 4 * 1024**2))
+
+    def __init__(self, max_entries=1024, max_bytes=None):
+        """
+        Initialise the cache
+        :param max_entries: Integer maximum number of responses held
+        :param max_bytes: Integer memory ceiling of all responses, None is
+        unbounded
+        """
+        # Always in process, the bodies are bytes ready to be written out
+        self._cache = cache.LRUCache(
+            max_entries=max_entries, max_bytes=max_bytes
+        )
+        self._lock = threading.Lock()
+        # (source cache, key) of every entry responses were built from, to
+        # the keys of those responses
+        self._dependents = {}
+        self._subscribed = set()
+        self._counters = {}
+        self._reset_counters()
+
+    def _reset_counters(self):
+        """
+        Resets the statistics counters, the caller must hold the lock
+        """
+        self._counters = {"invalidations": 0}
+
+    def _source_changed(self, source_cache, source_key):
+        """
+        Drops the responses built from an entry this process stored or
+        removed
+        :param source_cache: Cache holding the entry
+        :param source_key: The key of the entry, None when every entry of the
+        cache was removed
+        """
+        with self._lock:
+            if source_key is None:
+                sources = [s for s in self._dependents if s[0] is source_cache]
+            else:
+                sources = [(source_cache, source_key)]
+            keys = set()
+            for source in sources:
+                keys.update(self._dependents.pop(source, ()))
+            self._counters["invalidations"] += len(keys)
+        for key in keys:
+            self._cache.delete(key)
+
+    def _depend(self, key, source_cache, source_key):
+        """
+        Records a response was built from a cache entry, so it is dropped
+        as soon as the entry changes
+        :param key: Tuple cache key of the response
+        :param source_cache: Cache holding the entry
+        :param source_key: The key of the entry
+        """
+        with self._lock:
+            if source_cache not in self._subscribed:
+                self._subscribed.add(source_cache)
+                source_cache.subscribe(
+                    lambda changed: self._source_changed(source_cache, changed)
+                )
+            self._dependents.setdefault((source_cache, source_key), set()).add(
+                key
+            )
+
+    def get(self, key):
+        """
+        Gets an encoded response, they are dropped when an entry they were
+        built from changes or goes stale so a hit never reads those entries
+        :param key: Tuple cache key of the response
+        :return: EncodedResponse or None
+        """
+        return self._cache.get(key)
+
+    def store(self, key, result, sources):
+        """
+        Encodes response data, keeping it while the cache entries it is tied
+        to stay fresh and unchanged
+        :param key: Tuple cache key of the response
+        :param result: Dict of the response data
+        :param sources: Tuple of the (cache, key) entries the data was built
+        from, None encodes without keeping the response
+        :return: EncodedResponse
+        """
+        encoded = EncodedResponse.from_result(result, sources)
+        if sources is None:
+            return encoded
+        ttl = None
+        for source_cache, source_key in sources:
+            self._depend(key, source_cache, source_key)
+            left = source_cache.time_left(source_key)
+            if left is not None:
+                ttl = left if ttl is None else min(ttl, left)
+        if ttl is None or ttl > 0:
+            self._cache.set(key, encoded, ttl=ttl)
+        return encoded
+
+    def stats(self):
+        """
+        Reports the size, hit/miss counters and invalidations of the cache
+        :return: Dict of the response cache statistics
+        """
+        result = self._cache.stats()
+        with self._lock:
+            result.update(self._counters)
+        return result
+
+    def clear(self):
+        """
+        Removes every response and resets the statistics
+        """
+        self._cache.clear()
+        with self._lock:
+            self._dependents.clear()
+            self._reset_counters()
+
+
+# Encoded /pokemon/ and /pokemon/translated/ responses of this worker
+responses = ResponseCache(
+    max_entries=ResponseCache.MAX_ENTRIES,
+    max_bytes=ResponseCache.MAX_BYTES,
+)
+metrics.registry.register_source("responseCache", responses.stats)
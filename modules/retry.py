@@ -0,0 +1,208 @@
+import os
+import random
+import threading
+
+from http import HTTPStatus
+
+from modules import metrics
+
+# Upstream statuses worth retrying, the request never reached a healthy
+# server so sending it again is safe for idempotent GET requests
+RETRYABLE_STATUS_CODES = (
+    HTTPStatus.BAD_GATEWAY,
+    HTTPStatus.SERVICE_UNAVAILABLE,
+    HTTPStatus.GATEWAY_TIMEOUT,
+)
+
+
+class RetryBudget:
+    # Retries earned by every request, 0.1 allows at most 10% extra load
+    RATIO = float(os.environ.get("RETRY_BUDGET_RATIO", 0.1))
+    # Most retries that can be banked while the upstreams are healthy
+    RESERVE = float(os.environ.get("RETRY_BUDGET_RESERVE", 10))
+
+    def __init__(self, ratio=0.1, reserve=10.0):
+        """
+        Initialise the budget
+        :param ratio: Number of retries earned by every request
+        :param reserve: Number of retries that can be banked, the budget
+        starts full
+        """
+        self.ratio = ratio
+        self.reserve = max(reserve, 0)
+        self._lock = threading.Lock()
+        self._tokens = float(self.reserve)
+
+    def deposit(self):
+        """
+        Earns the share of a retry given for every request sent
+        """
+        with self._lock:
+            # Rounded so ten deposits of 0.1 add up to a whole retry
+            tokens = round(self._tokens + self.ratio, 9)
+            self._tokens = min(tokens, self.reserve)
+
+    def withdraw(self):
+        """
+        Spends a retry from the budget
+        :return: Boolean whether a retry was left to spend
+        """
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    def tokens(self):
+        """
+        Gets the number of retries left in the budget
+        :return: Number of retries
+        """
+        with self._lock:
+            return self._tokens
+
+    def reset(self):
+        """
+        Fills the budget back up
+        """
+        with self._lock:
+            self._tokens = float(self.reserve)
+
+
+class RetryPolicy:
+    # Most attempts made for a single idempotent GET request
+    MAX_ATTEMPTS = int(os.environ.get("RETRY_MAX_ATTEMPTS", 3))
+    # Seconds the backoff before the first retry is drawn from
+    BASE_DELAY = float(os.environ.get("RETRY_BASE_DELAY", 0.05))
+    # Most seconds the backoff before any retry is drawn from
+    MAX_DELAY = float(os.environ.get("RETRY_MAX_DELAY", 1))
+
+    def __init__(
+        self,
+        budget,
+        max_attempts=3,
+        base_delay=0.05,
+        max_delay=1.0,
+        random=random.random,
+    ):
+        """
+        Initialise the policy
+        :param budget: RetryBudget every retry is spent from
+        :param max_attempts: Integer most attempts made for a request
+        :param base_delay: Number of seconds the first backoff is drawn from
+        :param max_delay: Number most seconds any backoff is drawn from
+        :param random: Callable returning a Number between 0 and 1
+        """
+        self.budget = budget
+        self.max_attempts = max(max_attempts, 1)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._random = random
+        self._lock = threading.Lock()
+        self._upstreams = {}
+
+    def _upstream(self, upstream):
+        """
+        Gets the statistics of an upstream, the caller must hold the lock
+        :param upstream: String name of the upstream API
+        :return: Dict of the upstream retry statistics
+        """
+        stats = self._upstreams.get(upstream)
+        if stats is None:
+            stats = {"retries": 0, "budgetExhausted": 0, "attempts": {}}
+            self._upstreams[upstream] = stats
+        return stats
+
+    def backoff(self, attempt):
+        """
+        Draws the full jitter backoff before retrying an attempt
+        :param attempt: Integer index of the failed attempt, starting at 0
+        :return: Number of seconds to wait
+        """
+        ceiling = min(self.max_delay, self.base_delay * 2**attempt)
+        return self._random() * ceiling
+
+    def next_delay(self, upstream, attempt, time_left=float("inf")):
+        """
+        Decides whether a failed attempt is retried, spending a retry from
+        the budget when it is
+        :param upstream: String name of the upstream API
+        :param attempt: Integer index of the failed attempt, starting at 0
+        :param time_left: Number of seconds the caller has left
+        :return: Number of seconds to wait before retrying or None when the
+        attempt must not be retried
+        """
+        if attempt + 1 >= self.max_attempts:
+            return None
+        delay = self.backoff(attempt)
+        if delay >= time_left:
+            return None
+        allowed = self.budget.withdraw()
+        with self._lock:
+            stats = self._upstream(upstream)
+            if not allowed:
+                stats["budgetExhausted"] += 1
+                return None
+            stats["retries"] += 1
+        return delay
+
+    def record_attempt(self, upstream, attempt, seconds):
+        """
+        Records how long an attempt took
+        :param upstream: String name of the upstream API
+        :param attempt: Integer index of the attempt, starting at 0
+        :param seconds: Number of seconds the attempt took
+        """
+        with self._lock:
+            attempts = self._upstream(upstream)["attempts"]
+            timing = attempts.get(attempt)
+            if timing is None:
+                timing = {"count": 0, "totalSeconds": 0.0, "maxSeconds": 0.0}
+                attempts[attempt] = timing
+            timing["count"] += 1
+            timing["totalSeconds"] += seconds
+            timing["maxSeconds"] = max(timing["maxSeconds"], seconds)
+
+    def stats(self):
+        """
+        Reports the retries made and the timings of every attempt per
+        upstream
+        :return: Dict of the retry statistics
+        """
+        result = {"budget": round(self.budget.tokens(), 3)}
+        with self._lock:
+            for upstream, stats in self._upstreams.items():
+                attempts = {}
+                for attempt, timing in sorted(stats["attempts"].items()):
+                    attempts[str(attempt + 1)] = {
+                        "count": timing["count"],
+                        "avgSeconds": round(
+                            timing["totalSeconds"] / timing["count"], 4
+                        ),
+                        "maxSeconds": round(timing["maxSeconds"], 4),
+                    }
+                result[upstream] = {
+                    "retries": stats["retries"],
+                    "budgetExhausted": stats["budgetExhausted"],
+                    "attempts": attempts,
+                }
+        return result
+
+    def reset(self):
+        """
+        Fills the budget back up and forgets every statistic
+        """
+        self.budget.reset()
+        with self._lock:
+            self._upstreams = {}
+
+
+# The process wide retry budget and policy shared by every API wrapper
+budget = RetryBudget(ratio=RetryBudget.RATIO, reserve=RetryBudget.RESERVE)
+policy = RetryPolicy(
+    budget,
+    max_attempts=RetryPolicy.MAX_ATTEMPTS,
+    base_delay=RetryPolicy.BASE_DELAY,
+    max_delay=RetryPolicy.MAX_DELAY,
+)
+metrics.registry.register_source("retries", policy.stats)
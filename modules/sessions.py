@@ -0,0 +1,238 @@
+import os
+import time
+import socket
+import asyncio
+import threading
+import requests
+
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+
+from modules import metrics, timeouts
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - only needed by the async mode
+    httpx = None
+
+
+class KeepAliveAdapter(HTTPAdapter):
+    def __init__(self, socket_options=None, **kwargs):
+        """
+        Initialise the adapter
+        :param socket_options: List of socket option tuples applied to every
+        new pooled connection
+        """
+        # Must be set before the parent builds the pool manager
+        self._socket_options = socket_options
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        """
+        Builds the urllib3 pool manager with our socket options applied
+        """
+        if self._socket_options is not None:
+            kwargs["socket_options"] = self._socket_options
+        super().init_poolmanager(*args, **kwargs)
+
+
+class SessionPool:
+    # Number of connections kept alive per upstream host, this should match
+    # the gunicorn gthread --threads setting so each thread owns a connection
+    POOL_MAXSIZE = int(os.environ.get("HTTP_POOL_MAXSIZE", 4))
+    # Block until a pooled connection is free instead of opening a throwaway
+    # connection when every pooled one is busy
+    POOL_BLOCK = os.environ.get("HTTP_POOL_BLOCK", "0") == "1"
+    # Send TCP keep-alive probes on idle pooled connections
+    TCP_KEEPALIVE = os.environ.get("HTTP_TCP_KEEPALIVE", "1") == "1"
+    # Seconds a pooled connection may sit idle before probes are sent
+    TCP_KEEPALIVE_IDLE = int(os.environ.get("HTTP_TCP_KEEPALIVE_IDLE", 60))
+
+    def __init__(self):
+        """
+        Initialise the pool
+        """
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._sessions = {}
+
+    def _socket_options(self):
+        """
+        Builds the socket options used for every new pooled connection
+        :return: List of socket option tuples
+        """
+        options = list(HTTPConnection.default_socket_options)
+        if not SessionPool.TCP_KEEPALIVE:
+            return options
+        options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+        if hasattr(socket, "TCP_KEEPIDLE"):
+            options.append(
+                (
+                    socket.IPPROTO_TCP,
+                    socket.TCP_KEEPIDLE,
+                    SessionPool.TCP_KEEPALIVE_IDLE,
+                )
+            )
+        return options
+
+    def _build_session(self):
+        """
+        Builds a new session backed by a single host connection pool
+        :return: requests.Session
+        """
+        session = requests.Session()
+        adapter = KeepAliveAdapter(
+            socket_options=self._socket_options(),
+            pool_connections=1,
+            pool_maxsize=SessionPool.POOL_MAXSIZE,
+            pool_block=SessionPool.POOL_BLOCK,
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def get_session(self, url):
+        """
+        Gets the shared session for the host of a URL, creating it if needed.
+        Sessions inherited from a parent process are discarded so forked
+        gunicorn workers never share sockets with the master.
+        :param url: String URL that will be requested
+        :return: requests.Session
+        """
+        parts = urlsplit(url)
+        host = f"{parts.scheme}://{parts.netloc}"
+        with self._lock:
+            if self._pid != os.getpid():
+                # The sockets belong to the parent, drop them without closing
+                self._sessions = {}
+                self._pid = os.getpid()
+            session = self._sessions.get(host)
+            if session is None:
+                session = self._build_session()
+                self._sessions[host] = session
+            return session
+
+    def get(self, url, **kwargs):
+        """
+        Sends a GET request through the pooled session for the URL's host,
+        recording how long it took
+        :param url: String URL to request
+        :return: requests.Response
+        """
+        start = time.monotonic()
+        try:
+            return self.get_session(url).get(url, **kwargs)
+        finally:
+            timeouts.latency.observe(url, time.monotonic() - start)
+
+    def stats(self):
+        """
+        Reports how often pooled connections have been reused per host
+        :return: Dict of host to Dict of connection reuse statistics
+        """
+        with self._lock:
+            sessions = list(self._sessions.items())
+        result = {}
+        for host, session in sessions:
+            pools = session.get_adapter(host).poolmanager.pools
+            requests_sent = 0
+            connections = 0
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                requests_sent += pool.num_requests
+                connections += pool.num_connections
+            reused = max(requests_sent - connections, 0)
+            result[host] = {
+                "requests": requests_sent,
+                "connections": connections,
+                "reused": reused,
+                "reuseRatio": (
+                    round(reused / requests_sent, 4) if requests_sent else 0.0
+                ),
+            }
+        return result
+
+
+class AsyncSessionPool:
+    # Maximum number of concurrent connections per upstream host in the
+    # async serving mode
+    MAX_CONNECTIONS = int(os.environ.get("ASYNC_POOL_MAX_CONNECTIONS", 200))
+    # Number of idle keep-alive connections kept per upstream host in the
+    # async serving mode
+    MAX_KEEPALIVE = int(os.environ.get("ASYNC_POOL_MAX_KEEPALIVE", 50))
+
+    def __init__(self):
+        """
+        Initialise the pool
+        """
+        self._loop = None
+        self._clients = {}
+
+    def get_client(self, url):
+        """
+        Gets the shared non-blocking client for the host of a URL, creating it
+        if needed. Clients belong to the running event loop.
+        :param url: String URL that will be requested
+        :return: httpx.AsyncClient
+        """
+        if httpx is None:
+            raise RuntimeError("The async serving mode requires httpx")
+        loop = asyncio.get_event_loop()
+        if self._loop is not loop:
+            # Clients cannot be shared between event loops
+            self._loop = loop
+            self._clients = {}
+        parts = urlsplit(url)
+        host = f"{parts.scheme}://{parts.netloc}"
+        client = self._clients.get(host)
+        if client is None:
+            client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=AsyncSessionPool.MAX_CONNECTIONS,
+                    max_keepalive_connections=AsyncSessionPool.MAX_KEEPALIVE,
+                )
+            )
+            self._clients[host] = client
+        return client
+
+    async def get(self, url, stream=False, **kwargs):
+        """
+        Sends a GET request through the pooled client for the URL's host,
+        recording how long it took
+        :param url: String URL to request
+        :param stream: Boolean whether to return once the headers arrived,
+        the caller must then read and close the response
+        :return: httpx.Response
+        """
+        timeout = kwargs.get("timeout")
+        if isinstance(timeout, tuple):
+            # requests style (connect, read) timeouts
+            connect, read = timeout
+            kwargs["timeout"] = httpx.Timeout(read, connect=connect)
+        client = self.get_client(url)
+        start = time.monotonic()
+        try:
+            if stream:
+                request = client.build_request("GET", url, **kwargs)
+                return await client.send(request, stream=True)
+            return await client.get(url, **kwargs)
+        finally:
+            timeouts.latency.observe(url, time.monotonic() - start)
+
+    async def close(self):
+        """
+        Closes every pooled client and its connections
+        """
+        clients = list(self._clients.values())
+        self._clients = {}
+        for client in clients:
+            await client.aclose()
+
+
+# The process wide pools shared by every API wrapper
+pool = SessionPool()
+async_pool = AsyncSessionPool()
+metrics.registry.register_source("connections", pool.stats)
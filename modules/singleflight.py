@@ -0,0 +1,381 @@
+import os
+import json
+import asyncio
+import time
+import hashlib
+import threading
+
+from http import HTTPStatus
+from urllib.parse import urlencode
+
+from modules import metrics
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+# Status codes of the results written for other workers to reuse
+SHAREABLE_STATUS_CODES = (HTTPStatus.OK, HTTPStatus.NOT_FOUND)
+
+
+def request_key(url, params=None):
+    """
+    Builds the coalescing key of a GET request
+    :param url: String URL being requested
+    :param params: Dict of GET parameters sent with the request
+    :return: String key identifying the request
+    """
+    if not params:
+        return url
+    return f"{url}?{urlencode(sorted(params.items()))}"
+
+
+def shareable(result):
+    """
+    Checks whether a result may be reused by other workers, only successful
+    and definitive not found responses are shared so a transient failure is
+    never replayed
+    :param result: Tuple of the response data and HTTP Status Code
+    :return: Boolean
+    """
+    try:
+        return result[1] in SHAREABLE_STATUS_CODES
+    except (IndexError, TypeError):
+        return False
+
+
+class _Call:
+    def __init__(self):
+        """
+        Initialise the in flight call
+        """
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    # Directory of the lock and result files used to coalesce requests
+    # across every gunicorn worker on the host, unset coalesces requests
+    # within this process only
+    LOCK_DIR = os.environ.get("SINGLEFLIGHT_LOCK_DIR", None)
+    # Seconds a result written by another worker may be reused
+    RESULT_TTL = float(os.environ.get("SINGLEFLIGHT_RESULT_TTL", 1))
+    # Seconds a caller waits for the host wide lock held by another worker
+    # before sending its own request instead
+    LOCK_TIMEOUT = float(os.environ.get("SINGLEFLIGHT_LOCK_TIMEOUT", 2))
+    # Number of shared calls between each sweep of old lock and result files
+    SWEEP_INTERVAL = 512
+    # Seconds between attempts to take the host wide lock of a caller with
+    # a deadline
+    LOCK_POLL_INTERVAL = 0.01
+
+    def __init__(self, lock_dir=None, result_ttl=1.0, lock_timeout=2.0):
+        """
+        Initialise the group
+        :param lock_dir: String directory shared by every worker on the host,
+        None coalesces within this process only
+        :param result_ttl: Number of seconds a shared result may be reused
+        :param lock_timeout: Number of seconds a caller waits for the host
+        wide lock before sending its own request
+        """
+        self.lock_dir = lock_dir if fcntl is not None else None
+        self.result_ttl = result_ttl
+        self.lock_timeout = lock_timeout
+        if self.lock_dir is not None:
+            os.makedirs(self.lock_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._shared_calls = 0
+        self._calls = {}
+        self._counters = {}
+        self._reset_counters()
+
+    def _reset_counters(self):
+        """
+        Resets the statistics counters, the caller must hold the lock
+        """
+        self._counters = {
+            "leaders": 0,
+            "coalesced": 0,
+            "shared": 0,
+            "timedOut": 0,
+            "lockTimeouts": 0,
+        }
+
+    def _timed_out(self, on_timeout):
+        """
+        Gives the result of a caller that ran out of time waiting
+        :param on_timeout: Callable taking no arguments giving the result,
+        None raises TimeoutError
+        :return: The result of on_timeout
+        """
+        with self._lock:
+            self._counters["timedOut"] += 1
+        if on_timeout is None:
+            raise TimeoutError("Timed out waiting for a coalesced request")
+        return on_timeout()
+
+    def do(self, key, fn, timeout=None, on_timeout=None):
+        """
+        Runs fn once for every concurrent caller using the same key, callers
+        arriving while it runs wait for and share its result. Shared results
+        must be treated as read only.
+        :param key: String key identifying the request
+        :param fn: Callable taking no arguments that performs the request
+        :param timeout: Number of seconds the caller may wait for a request
+        already in flight, None waits until it is done
+        :param on_timeout: Callable taking no arguments giving the result
+        when the wait times out, None raises TimeoutError
+        :return: The result of fn
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self._counters["leaders"] += 1
+            else:
+                self._counters["coalesced"] += 1
+
+        if not leader:
+            if not call.done.wait(timeout):
+                return self._timed_out(on_timeout)
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            if self.lock_dir is None:
+                call.result = fn()
+            else:
+                call.result = self._do_shared(key, fn, timeout, on_timeout)
+        except Exception as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def _acquire(self, lock_file, timeout):
+        """
+        Takes the host wide lock of a request
+        :param lock_file: File object of the lock file
+        :param timeout: Number of seconds to wait for the lock
+        :return: Boolean whether the lock was taken
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return True
+            except BlockingIOError:
+                time_left = deadline - time.monotonic()
+                if time_left <= 0:
+                    return False
+                time.sleep(min(SingleFlight.LOCK_POLL_INTERVAL, time_left))
+
+    def _do_shared(self, key, fn, timeout=None, on_timeout=None):
+        """
+        Runs fn under a host wide file lock, reusing the result of another
+        worker that ran it moments ago
+        :param key: String key identifying the request
+        :param fn: Callable returning a JSON serialisable Tuple
+        :param timeout: Number of seconds the caller may wait for the lock,
+        None waits until it is free
+        :param on_timeout: Callable taking no arguments giving the result
+        when the wait times out, None raises TimeoutError
+        :return: The result of fn
+        """
+        with self._lock:
+            self._shared_calls += 1
+            sweep = self._shared_calls % SingleFlight.SWEEP_INTERVAL == 0
+        if sweep:
+            self.sweep()
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        base_path = os.path.join(self.lock_dir, digest)
+        try:
+            lock_file = open(f"{base_path}.lock", "a")
+        except OSError:
+            return fn()
+        with lock_file:
+            wait = self.lock_timeout
+            if timeout is not None:
+                wait = min(wait, timeout)
+            if not self._acquire(lock_file, wait):
+                if timeout is not None and timeout <= wait:
+                    return self._timed_out(on_timeout)
+                with self._lock:
+                    self._counters["lockTimeouts"] += 1
+                # Another worker has held the lock too long, the request is
+                # sent without it rather than queueing behind a slow one
+                return fn()
+            try:
+                result = self._read_shared(f"{base_path}.json")
+                if result is not None:
+                    with self._lock:
+                        self._counters["shared"] += 1
+                    return result
+                result = fn()
+                if shareable(result):
+                    self._write_shared(f"{base_path}.json", result)
+                return result
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_shared(self, path):
+        """
+        Reads a result written by another worker if it is recent enough
+        :param path: String path of the result file
+        :return: Tuple result or None
+        """
+        try:
+            if time.time() - os.path.getmtime(path) > self.result_ttl:
+                return None
+            with open(path, "r") as result_file:
+                return tuple(json.load(result_file))
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def _write_shared(self, path, result):
+        """
+        Writes a result for other workers to reuse
+        :param path: String path of the result file
+        :param result: JSON serialisable Tuple result
+        """
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, "w") as result_file:
+                json.dump(list(result), result_file)
+            os.replace(temp_path, path)
+        except (OSError, TypeError, ValueError):
+            # Sharing is best effort, the result is still returned locally
+            pass
+
+    def sweep(self):
+        """
+        Removes lock and result files that have not been used recently so
+        the shared directory does not grow without bound
+        """
+        cutoff = time.time() - max(self.result_ttl, 1) * 60
+        try:
+            names = os.listdir(self.lock_dir)
+        except OSError:
+            return
+        for name in names:
+            path = os.path.join(self.lock_dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self):
+        """
+        Reports how many requests were coalesced
+        :return: Dict of the coalescing statistics
+        """
+        with self._lock:
+            result = dict(self._counters)
+            result["inFlight"] = len(self._calls)
+        return result
+
+    def reset(self):
+        """
+        Resets the statistics counters
+        """
+        with self._lock:
+            self._reset_counters()
+
+
+class AsyncSingleFlight:
+    def __init__(self):
+        """
+        Initialise the group
+        """
+        self._calls = {}
+        self._counters = {}
+        self._reset_counters()
+
+    def _reset_counters(self):
+        """
+        Resets the statistics counters
+        """
+        self._counters = {"leaders": 0, "coalesced": 0, "timedOut": 0}
+
+    async def do(self, key, fn, timeout=None, on_timeout=None):
+        """
+        Awaits fn once for every concurrent coroutine using the same key,
+        coroutines arriving while it runs wait for and share its result.
+        Shared results must be treated as read only.
+        :param key: String key identifying the request
+        :param fn: Callable taking no arguments that returns an awaitable
+        :param timeout: Number of seconds the caller may wait for a request
+        already in flight, None waits until it is done
+        :param on_timeout: Callable taking no arguments giving the result
+        when the wait times out, None raises TimeoutError
+        :return: The result of fn
+        """
+        future = self._calls.get(key)
+        if future is not None:
+            self._counters["coalesced"] += 1
+            waiter = asyncio.shield(future)
+            if timeout is None:
+                return await waiter
+            try:
+                return await asyncio.wait_for(waiter, max(timeout, 0))
+            except asyncio.TimeoutError:
+                self._counters["timedOut"] += 1
+                if on_timeout is None:
+                    raise TimeoutError(
+                        "Timed out waiting for a coalesced request"
+                    )
+                return on_timeout()
+
+        future = asyncio.get_event_loop().create_future()
+        self._calls[key] = future
+        self._counters["leaders"] += 1
+        try:
+            result = await fn()
+        except Exception as error:
+            future.set_exception(error)
+            # Mark the error as retrieved when nobody else is waiting
+            future.exception()
+            raise
+        except BaseException:
+            future.cancel()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+
+    def stats(self):
+        """
+        Reports how many requests were coalesced
+        :return: Dict of the coalescing statistics
+        """
+        result = dict(self._counters)
+        result["inFlight"] = len(self._calls)
+        return result
+
+    def reset(self):
+        """
+        Resets the statistics counters
+        """
+        self._reset_counters()
+
+
+# The process wide groups shared by every API wrapper
+group = SingleFlight(
+    SingleFlight.LOCK_DIR,
+    SingleFlight.RESULT_TTL,
+    SingleFlight.LOCK_TIMEOUT,
+)
+async_group = AsyncSingleFlight()
+metrics.registry.register_source("singleFlight", group.stats)
+metrics.registry.register_source("asyncSingleFlight", async_group.stats)
@@ -0,0 +1,352 @@
+import os
+import mmap
+import struct
+import threading
+
+from http import HTTPStatus
+from concurrent.futures import ThreadPoolExecutor
+
+from modules import jsoncodec, metrics, speciesindex
+
+# Identifies a snapshot file, followed by its format version
+MAGIC = b"PKDXSNAP"
+VERSION = 1
+
+# Magic, version, number of species records and number of names
+_HEADER = struct.Struct("<8sHII")
+# Species ID, offset and length of its record, sorted by species ID
+_ID_ENTRY = struct.Struct("<III")
+# Offset of the name, slot of its species in the ID table and name length,
+# sorted by name
+_NAME_ENTRY = struct.Struct("<IIH")
+
+
+def write_snapshot(path, records, names):
+    """
+    Writes a snapshot file, replacing any existing one at once
+    :param path: String path of the snapshot file
+    :param records: Dict of Integer species ID to Dict of species data
+    :param names: Dict of String normalised name to Integer species ID,
+    names of species without a record are left out
+    """
+    species_ids = sorted(records)
+    slots = {species_id: slot for slot, species_id in enumerate(species_ids)}
+    encoded_names = sorted(
+        (name.encode("utf-8"), slots[species_id])
+        for name, species_id in names.items()
+        if species_id in slots
+    )
+    data_offset = (
+        _HEADER.size
+        + _ID_ENTRY.size * len(species_ids)
+        + _NAME_ENTRY.size * len(encoded_names)
+    )
+    id_table = []
+    name_table = []
+    data = []
+    for species_id in species_ids:
+        record = jsoncodec.dumps(records[species_id])
+        id_table.append(_ID_ENTRY.pack(species_id, data_offset, len(record)))
+        data.append(record)
+        data_offset += len(record)
+    for name, slot in encoded_names:
+        name_table.append(_NAME_ENTRY.pack(data_offset, slot, len(name)))
+        data.append(name)
+        data_offset += len(name)
+
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as snapshot_file:
+        snapshot_file.write(
+            _HEADER.pack(MAGIC, VERSION, len(species_ids), len(name_table))
+        )
+        snapshot_file.write(b"".join(id_table))
+        snapshot_file.write(b"".join(name_table))
+        snapshot_file.write(b"".join(data))
+    os.replace(temp_path, path)
+
+
+class Snapshot:
+    def __init__(self, path):
+        """
+        Memory maps a snapshot file, its pages are shared by every process
+        serving from it
+        :param path: String path of the snapshot file
+        """
+        self.path = path
+        with open(path, "rb") as snapshot_file:
+            self._map = mmap.mmap(
+                snapshot_file.fileno(), 0, access=mmap.ACCESS_READ
+            )
+        if len(self._map) < _HEADER.size:
+            raise ValueError(f"'{path}' is not a Pokedex snapshot")
+        magic, version, records, names = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"'{path}' is not a Pokedex snapshot")
+        if version != VERSION:
+            raise ValueError(
+                f"Unsupported Pokedex snapshot version {version} in '{path}'"
+            )
+        self.version = version
+        self.records = records
+        self.names = names
+        self._names_start = _HEADER.size + _ID_ENTRY.size * records
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._reset_counters()
+
+    def _reset_counters(self):
+        """
+        Resets the statistics counters, the caller must hold the lock
+        """
+        self._counters = {"hits": 0, "misses": 0}
+
+    def _count(self, found):
+        """
+        Records the outcome of a lookup
+        :param found: Boolean whether the species was in the snapshot
+        """
+        with self._lock:
+            self._counters["hits" if found else "misses"] += 1
+
+    def _id_entry(self, slot):
+        """
+        Reads an entry of the species ID table
+        :param slot: Integer position in the table
+        :return: Tuple of the species ID, record offset and record length
+        """
+        offset = _HEADER.size + _ID_ENTRY.size * slot
+        return _ID_ENTRY.unpack_from(self._map, offset)
+
+    def _record(self, slot):
+        """
+        Decodes the species record of a slot in the species ID table
+        :param slot: Integer position in the table
+        :return: Dict of the species data
+        """
+        _, offset, length = self._id_entry(slot)
+        end = offset + length
+        return jsoncodec.loads(self._map[offset:end])
+
+    def get_by_id(self, species_id):
+        """
+        Gets a species by its ID with a binary search of the ID table
+        :param species_id: Integer ID of the species
+        :return: Dict of the species data or None when it is not in the
+        snapshot
+        """
+        low, high = 0, self.records
+        while low < high:
+            middle = (low + high) // 2
+            middle_id = self._id_entry(middle)[0]
+            if middle_id == species_id:
+                self._count(True)
+                return self._record(middle)
+            if middle_id < species_id:
+                low = middle + 1
+            else:
+                high = middle
+        self._count(False)
+        return None
+
+    def get_by_name(self, name):
+        """
+        Gets a species by Pokemon name with a binary search of the name table
+        :param name: String name of the Pokemon
+        :return: Dict of the species data or None when it is not in the
+        snapshot
+        """
+        key = speciesindex.normalise_name(name).encode("utf-8")
+        low, high = 0, self.names
+        while low < high:
+            middle = (low + high) // 2
+            offset, slot, length = _NAME_ENTRY.unpack_from(
+                self._map, self._names_start + _NAME_ENTRY.size * middle
+            )
+            end = offset + length
+            middle_name = self._map[offset:end]
+            if middle_name == key:
+                self._count(True)
+                return self._record(slot)
+            if middle_name < key:
+                low = middle + 1
+            else:
+                high = middle
+        self._count(False)
+        return None
+
+    def stats(self):
+        """
+        Reports the size of the snapshot and how often it answered lookups
+        :return: Dict of the snapshot statistics
+        """
+        with self._lock:
+            result = dict(self._counters)
+        result["version"] = self.version
+        result["records"] = self.records
+        result["names"] = self.names
+        return result
+
+    def close(self):
+        """
+        Unmaps the snapshot file
+        """
+        self._map.close()
+
+
+class SnapshotBuilder:
+    # Species fetched from Pokeapi.co at the same time while building
+    CONCURRENCY = int(os.environ.get("SNAPSHOT_BUILD_CONCURRENCY", 8))
+
+    def __init__(self, path, fetch, concurrency=8, checkpoint_path=None):
+        """
+        Initialise the builder
+        :param path: String path of the snapshot file to write
+        :param fetch: Callable taking an Integer species ID and returning a
+        Tuple of the crawled species, its data under the species key and its
+        variety names under the varieties key, and HTTP Status Code
+        :param concurrency: Integer number of species fetched at the same
+        time
+        :param checkpoint_path: String path of the file fetched species are
+        recorded in so an interrupted build resumes, defaults to the
+        snapshot path with a .checkpoint suffix
+        """
+        self.path = path
+        self.fetch = fetch
+        self.concurrency = max(concurrency, 1)
+        self.checkpoint_path = checkpoint_path or f"{path}.checkpoint"
+
+    def _read_checkpoint(self):
+        """
+        Reads the species fetched by an earlier build, ignoring a partly
+        written last line and entries without variety names
+        :return: Dict of Integer species ID to Dict of the crawled species
+        """
+        records = {}
+        try:
+            with open(self.checkpoint_path, "rb") as checkpoint_file:
+                for line in checkpoint_file:
+                    try:
+                        entry = jsoncodec.loads(line)
+                        record = entry["record"]
+                        # Older builds recorded the species data alone
+                        if "varieties" not in record:
+                            continue
+                        records[int(entry["id"])] = record
+                    except (ValueError, KeyError, TypeError):
+                        continue
+        except OSError:
+            pass
+        return records
+
+    def build(self, species, aliases=None):
+        """
+        Fetches every species not already checkpointed and writes the
+        snapshot once all of them have been fetched
+        :param species: Dict of String species name to Integer species ID,
+        species are served under the names of their varieties
+        :param aliases: Dict of String Pokemon name to Integer species ID
+        also served from the snapshot
+        :return: A Tuple containing:
+        - Dict of the response data
+        - Integer HTTP Status Code
+        """
+        records = self._read_checkpoint()
+        resumed = len(records)
+        pending = sorted(set(species.values()) - set(records))
+        failed = []
+        with open(self.checkpoint_path, "ab") as checkpoint_file:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                fetched = pool.map(self.fetch, pending)
+                for species_id, (result, status_code) in zip(pending, fetched):
+                    if status_code != HTTPStatus.OK:
+                        failed.append(species_id)
+                        continue
+                    records[species_id] = result
+                    checkpoint_file.write(
+                        jsoncodec.dumps({"id": species_id, "record": result})
+                        + b"\n"
+                    )
+                    checkpoint_file.flush()
+        if failed:
+            return {
+                "message": f"Error: Failed to fetch {len(failed)} species, "
+                "run the build again to resume",
+                "failed": failed,
+            }, HTTPStatus.SERVICE_UNAVAILABLE
+
+        # Only variety names are Pokemon names, a species name such as
+        # deoxys is not one unless a variety shares it
+        names = dict(aliases or {})
+        for species_id, record in records.items():
+            names.update((name, species_id) for name in record["varieties"])
+        write_snapshot(
+            self.path,
+            {
+                species_id: record["species"]
+                for species_id, record in records.items()
+            },
+            names,
+        )
+        os.remove(self.checkpoint_path)
+        return {
+            "records": len(records),
+            "resumed": resumed,
+            "names": len(names),
+        }, HTTPStatus.OK
+
+
+def open_snapshot(path):
+    """
+    Opens the snapshot to serve species from
+    :param path: String path of the snapshot file, None serves species from
+    Pokeapi.co
+    :return: Snapshot or None
+    """
+    if path is None:
+        return None
+    try:
+        return Snapshot(path)
+    except (OSError, ValueError) as error:
+        raise RuntimeError(f"Unable to serve the Pokedex snapshot: {error}")
+
+
+# Path of the snapshot file every species is served from, without any
+# upstream request. Unset serves species from Pokeapi.co.
+SNAPSHOT_PATH = os.environ.get("POKEDEX_SNAPSHOT", None)
+
+# The process wide snapshot, every worker maps the same file
+store = open_snapshot(SNAPSHOT_PATH)
+if store is not None:
+    metrics.registry.register_source("snapshot", store.stats)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from modules.pokeapi import PokeAPIWrapper
+
+    parser = argparse.ArgumentParser(
+        description="Builds an offline snapshot of every Pokemon species"
+    )
+    parser.add_argument("path", help="path of the snapshot file to write")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=SnapshotBuilder.CONCURRENCY,
+        help="species fetched at the same time",
+    )
+    arguments = parser.parse_args()
+
+    poke = PokeAPIWrapper()
+    result, status_code = poke.list_species()
+    if status_code == HTTPStatus.OK:
+        builder = SnapshotBuilder(
+            arguments.path,
+            poke.crawl_species,
+            concurrency=arguments.concurrency,
+        )
+        result, status_code = builder.build(
+            result["species"], aliases=dict(speciesindex.index.items())
+        )
+    print(result)
+    raise SystemExit(0 if status_code == HTTPStatus.OK else 1)
@@ -0,0 +1,128 @@
+import sys
+import tracemalloc
+
+from modules import jsoncodec
+
+# Bits of SpeciesRecord flags
+LEGENDARY = 1
+
+
+class SpeciesRecord:
+    __slots__ = ("name", "habitat", "description", "flags")
+
+    def __init__(self, name, habitat, is_legendary, description):
+        """
+        Initialise the record, the name and habitat are interned so every
+        record shares a single copy of them
+        :param name: String name of the species
+        :param habitat: String name of the species habitat
+        :param is_legendary: Boolean whether the species is legendary
+        :param description: String description of the species
+        """
+        set_slot = object.__setattr__
+        set_slot(self, "name", sys.intern(name))
+        set_slot(self, "habitat", sys.intern(habitat))
+        set_slot(self, "description", description)
+        set_slot(self, "flags", LEGENDARY if is_legendary else 0)
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Builds a record from the species data returned by the API wrappers
+        :param data: Dict of the species data
+        :return: SpeciesRecord
+        """
+        return cls(
+            data["name"],
+            data["habitat"],
+            data["isLegendary"],
+            data["description"],
+        )
+
+    @property
+    def is_legendary(self):
+        """
+        Gets whether the species is legendary
+        :return: Boolean
+        """
+        return bool(self.flags & LEGENDARY)
+
+    def to_dict(self):
+        """
+        Builds the species data returned by the API wrappers, a fresh Dict
+        the caller may change
+        :return: Dict of the species data
+        """
+        return {
+            "name": self.name,
+            "habitat": self.habitat,
+            "isLegendary": bool(self.flags & LEGENDARY),
+            "description": self.description,
+        }
+
+    def __setattr__(self, name, value):
+        raise AttributeError("SpeciesRecord is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("SpeciesRecord is immutable")
+
+    def __eq__(self, other):
+        if not isinstance(other, SpeciesRecord):
+            return NotImplemented
+        return (
+            self.name == other.name
+            and self.habitat == other.habitat
+            and self.flags == other.flags
+            and self.description == other.description
+        )
+
+    def __hash__(self):
+        return hash((self.name, self.habitat, self.flags, self.description))
+
+    def __repr__(self):
+        return f"SpeciesRecord({self.name!r})"
+
+
+def to_dict(value):
+    """
+    Builds the species data of a cached value, which is a SpeciesRecord in
+    memory or a plain Dict when it was read back from a shared cache
+    :param value: SpeciesRecord or Dict of the species data
+    :return: Dict of the species data
+    """
+    if isinstance(value, SpeciesRecord):
+        return value.to_dict()
+    return dict(value)
+
+
+def measure(records):
+    """
+    Measures the memory kept per species when each one is parsed from its
+    own JSON document and cached as a plain Dict or as a record
+    :param records: List of Dicts of species data
+    :return: Dict of the average bytes per species of each representation
+    """
+    documents = [jsoncodec.dumps(data) for data in records]
+    builders = (("dict", dict), ("record", SpeciesRecord.from_dict))
+    result = {}
+    for name, build in builders:
+        tracemalloc.start()
+        built = [build(jsoncodec.loads(document)) for document in documents]
+        used = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        result[name] = round(used / len(built)) if built else 0
+    return result
+
+
+if __name__ == "__main__":
+    habitats = ["cave", "forest", "grassland", "mountain", "rare", "sea"]
+    sample = [
+        {
+            "name": f"pokemon-{number}",
+            "habitat": habitats[number % len(habitats)],
+            "isLegendary": number % 50 == 0,
+            "description": f"Description of Pokemon number {number}.",
+        }
+        for number in range(1025)
+    ]
+    print(measure(sample))
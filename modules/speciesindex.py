@@ -0,0 +1,174 @@
+import os
+import json
+import atexit
+import threading
+
+
+def normalise_name(name):
+    """
+    Normalises a Pokemon name so aliases share a single index entry
+    :param name: String name of the Pokemon
+    :return: String normalised name
+    """
+    return str(name).strip().lower()
+
+
+class SpeciesIndex:
+    # Path of the JSON file the index is persisted to, unset keeps the index
+    # in memory only
+    INDEX_PATH = os.environ.get("SPECIES_INDEX_PATH", None)
+    # Names learned by a worker before they are merged into the file
+    SAVE_EVERY = int(os.environ.get("SPECIES_INDEX_SAVE_EVERY", 50))
+
+    def __init__(self, path=None, save_every=50):
+        """
+        Initialise the index
+        :param path: String path of the JSON file backing the index
+        :param save_every: Integer names learned between merges
+        """
+        self._path = path
+        self.save_every = max(save_every, 1)
+        self._lock = threading.Lock()
+        self._ids = {}
+        self._unsaved = 0
+        self._loaded = path is None
+
+    @property
+    def blocking(self):
+        """
+        Gets whether using the index may block reading or writing its file
+        :return: Boolean
+        """
+        return self._path is not None
+
+    def _read_file(self):
+        """
+        Reads the persisted index, ignoring a missing or corrupt file
+        :return: Dict of normalised name to Integer species ID
+        """
+        try:
+            with open(self._path, "r") as index_file:
+                data = json.load(index_file)
+            return {str(name): int(sid) for name, sid in data.items()}
+        except (OSError, ValueError, AttributeError):
+            return {}
+
+    def _ensure_loaded(self):
+        """
+        Lazily loads the persisted index the first time it is needed, the
+        caller must hold the lock
+        """
+        if not self._loaded:
+            self._ids.update(self._read_file())
+            self._loaded = True
+
+    def _save(self):
+        """
+        Merges the index into the persisted file, the caller must hold the
+        lock
+        """
+        self._unsaved = 0
+        if self._path is None:
+            return
+        merged = self._read_file()
+        merged.update(self._ids)
+        temp_path = f"{self._path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, "w") as index_file:
+                json.dump(merged, index_file, separators=(",", ":"))
+            os.replace(temp_path, self._path)
+        except OSError:
+            # Persisting is best effort, the in memory index still works
+            pass
+
+    def get(self, name):
+        """
+        Gets the species ID of a Pokemon name or alias
+        :param name: String name of the Pokemon
+        :return: Integer species ID or None when the name is unknown
+        """
+        with self._lock:
+            self._ensure_loaded()
+            return self._ids.get(normalise_name(name))
+
+    def add(self, name, species_id):
+        """
+        Records the species ID of a Pokemon name or alias learned by a
+        lookup, merging the learned names into the persisted file every so
+        often rather than on every lookup
+        :param name: String name of the Pokemon
+        :param species_id: Integer ID of the species
+        """
+        name = normalise_name(name)
+        species_id = int(species_id)
+        with self._lock:
+            self._ensure_loaded()
+            if self._ids.get(name) == species_id:
+                return
+            self._ids[name] = species_id
+            self._unsaved += 1
+            if self._unsaved >= self.save_every:
+                self._save()
+
+    def seed(self, mapping):
+        """
+        Bulk records the species IDs of many Pokemon names or aliases,
+        persisting them at once
+        :param mapping: Dict of String name to Integer species ID
+        """
+        entries = {
+            normalise_name(name): int(sid) for name, sid in mapping.items()
+        }
+        with self._lock:
+            self._ensure_loaded()
+            changed = any(self._ids.get(k) != v for k, v in entries.items())
+            if not changed:
+                return
+            self._ids.update(entries)
+            self._save()
+
+    def save(self):
+        """
+        Merges every learned name into the persisted file now
+        """
+        with self._lock:
+            if self._unsaved:
+                self._save()
+
+    def items(self):
+        """
+        Gets every name or alias in the index
+        :return: List of Tuples of the normalised name and species ID
+        """
+        with self._lock:
+            self._ensure_loaded()
+            return list(self._ids.items())
+
+    def clear(self):
+        """
+        Empties the in memory index without touching the persisted file
+        """
+        with self._lock:
+            self._ids = {}
+            self._unsaved = 0
+            self._loaded = True
+
+    def __len__(self):
+        with self._lock:
+            self._ensure_loaded()
+            return len(self._ids)
+
+
+# The process wide index shared by every PokeAPIWrapper
+index = SpeciesIndex(SpeciesIndex.INDEX_PATH, SpeciesIndex.SAVE_EVERY)
+# Names learned since the last merge are kept when a worker exits
+atexit.register(index.save)
+
+
+if __name__ == "__main__":
+    from http import HTTPStatus
+    from modules.pokeapi import PokeAPIWrapper
+
+    result, status_code = PokeAPIWrapper().seed_species_index()
+    print(result)
+    raise SystemExit(0 if status_code == HTTPStatus.OK else 1)
@@ -0,0 +1,220 @@
+import os
+import threading
+
+from collections import deque
+from urllib.parse import urlsplit
+
+from modules import metrics
+
+
+def host_key(url):
+    """
+    Gets the scheme and host of a URL, upstream latency is tracked per host
+    :param url: String URL being requested
+    :return: String scheme and host of the URL
+    """
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+class LatencyTracker:
+    # Number of recent upstream requests per host percentiles are taken from
+    WINDOW = int(os.environ.get("UPSTREAM_LATENCY_WINDOW", 512))
+    # Number of new samples between each recalculation of the percentiles
+    REFRESH_INTERVAL = 16
+
+    def __init__(self, window=512):
+        """
+        Initialise the tracker
+        :param window: Integer number of recent samples kept per host
+        """
+        self.window = max(window, 1)
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._observed = {}
+        self._sorted = {}
+
+    def observe(self, url, seconds):
+        """
+        Records how long a request to an upstream host took
+        :param url: String URL that was requested
+        :param seconds: Number of seconds the request took
+        """
+        host = host_key(url)
+        with self._lock:
+            samples = self._samples.get(host)
+            if samples is None:
+                samples = deque(maxlen=self.window)
+                self._samples[host] = samples
+            samples.append(seconds)
+            self._observed[host] = self._observed.get(host, 0) + 1
+
+    def _sorted_samples(self, host):
+        """
+        Gets the recent samples of a host in order, only sorting them again
+        once enough new samples arrived. The caller must hold the lock.
+        :param host: String scheme and host
+        :return: List of sorted Numbers of seconds
+        """
+        samples = self._samples.get(host)
+        if not samples:
+            return []
+        observed = self._observed[host]
+        cached = self._sorted.get(host)
+        if (
+            cached is None
+            or observed - cached[0] >= LatencyTracker.REFRESH_INTERVAL
+        ):
+            cached = (observed, sorted(samples))
+            self._sorted[host] = cached
+        return cached[1]
+
+    def percentile(self, url, percentile):
+        """
+        Gets a percentile of the recent latency of an upstream host
+        :param url: String URL of the host
+        :param percentile: Number percentile between 0 and 100
+        :return: Number of seconds or None when nothing has been recorded
+        """
+        with self._lock:
+            ordered = self._sorted_samples(host_key(url))
+        if not ordered:
+            return None
+        index = min(int(len(ordered) * percentile / 100), len(ordered) - 1)
+        return ordered[index]
+
+    def count(self, url):
+        """
+        Gets how many recent samples are held for an upstream host
+        :param url: String URL of the host
+        :return: Integer number of samples
+        """
+        with self._lock:
+            return len(self._samples.get(host_key(url), ()))
+
+    def hosts(self):
+        """
+        Gets every upstream host latency has been recorded for
+        :return: List of String scheme and hosts
+        """
+        with self._lock:
+            return list(self._samples)
+
+    def reset(self):
+        """
+        Forgets every recorded sample
+        """
+        with self._lock:
+            self._samples = {}
+            self._observed = {}
+            self._sorted = {}
+
+
+class TimeoutPolicy:
+    # Seconds allowed to establish a connection to an upstream host
+    CONNECT_TIMEOUT = float(os.environ.get("UPSTREAM_CONNECT_TIMEOUT", 3.05))
+    # Seconds allowed between bytes of an upstream response
+    READ_TIMEOUT = float(os.environ.get("UPSTREAM_READ_TIMEOUT", 10))
+    # Derive the read timeout of each host from its recent p99 latency
+    ADAPTIVE = os.environ.get("ADAPTIVE_TIMEOUTS", "0") == "1"
+    # Lowest read timeout the adaptive mode may pick
+    ADAPTIVE_FLOOR = float(os.environ.get("ADAPTIVE_TIMEOUT_FLOOR", 1))
+    # Highest read timeout the adaptive mode may pick
+    ADAPTIVE_CEILING = float(os.environ.get("ADAPTIVE_TIMEOUT_CEILING", 10))
+    # Headroom given on top of the p99 latency
+    ADAPTIVE_MULTIPLIER = float(
+        os.environ.get("ADAPTIVE_TIMEOUT_MULTIPLIER", 2)
+    )
+    # Samples needed before a host's p99 is trusted
+    ADAPTIVE_MIN_SAMPLES = int(
+        os.environ.get("ADAPTIVE_TIMEOUT_MIN_SAMPLES", 50)
+    )
+
+    def __init__(
+        self,
+        tracker,
+        connect=3.05,
+        read=10.0,
+        adaptive=False,
+        floor=1.0,
+        ceiling=10.0,
+        multiplier=2.0,
+        min_samples=50,
+    ):
+        """
+        Initialise the policy
+        :param tracker: LatencyTracker recording upstream latency
+        :param connect: Number of seconds allowed to connect
+        :param read: Number of seconds allowed between response bytes
+        :param adaptive: Boolean whether to derive the read timeout from the
+        recent p99 latency of each host
+        :param floor: Number lowest adaptive read timeout in seconds
+        :param ceiling: Number highest adaptive read timeout in seconds
+        :param multiplier: Number the p99 latency is multiplied by
+        :param min_samples: Integer samples needed before adapting
+        """
+        self.tracker = tracker
+        self.connect = connect
+        self.read = read
+        self.adaptive = adaptive
+        self.floor = floor
+        self.ceiling = max(ceiling, floor)
+        self.multiplier = multiplier
+        self.min_samples = min_samples
+
+    def read_timeout(self, url):
+        """
+        Gets the read timeout of an upstream host
+        :param url: String URL being requested
+        :return: Number of seconds
+        """
+        if not self.adaptive or self.tracker.count(url) < self.min_samples:
+            return self.read
+        p99 = self.tracker.percentile(url, 99)
+        return min(max(p99 * self.multiplier, self.floor), self.ceiling)
+
+    def timeout(self, url, limit=None):
+        """
+        Gets the connect and read timeouts of a request
+        :param url: String URL being requested
+        :param limit: Number of seconds neither timeout may exceed, None for
+        no limit
+        :return: Tuple of the Number connect and read timeouts in seconds
+        """
+        connect = self.connect
+        read = self.read_timeout(url)
+        if limit is not None:
+            connect = min(connect, limit)
+            read = min(read, limit)
+        return connect, read
+
+    def stats(self):
+        """
+        Reports the recent latency and current read timeout of each host
+        :return: Dict of host to Dict of latency statistics
+        """
+        result = {}
+        for host in self.tracker.hosts():
+            result[host] = {
+                "samples": self.tracker.count(host),
+                "p50": self.tracker.percentile(host, 50),
+                "p95": self.tracker.percentile(host, 95),
+                "p99": self.tracker.percentile(host, 99),
+                "readTimeout": self.read_timeout(host),
+            }
+        return result
+
+
+# The process wide latency tracker and timeout policy shared by every pool
+latency = LatencyTracker(LatencyTracker.WINDOW)
+policy = TimeoutPolicy(
+    latency,
+    connect=TimeoutPolicy.CONNECT_TIMEOUT,
+    read=TimeoutPolicy.READ_TIMEOUT,
+    adaptive=TimeoutPolicy.ADAPTIVE,
+    floor=TimeoutPolicy.ADAPTIVE_FLOOR,
+    ceiling=TimeoutPolicy.ADAPTIVE_CEILING,
+    multiplier=TimeoutPolicy.ADAPTIVE_MULTIPLIER,
+    min_samples=TimeoutPolicy.ADAPTIVE_MIN_SAMPLES,
+)
+metrics.registry.register_source("upstreamLatency", policy.stats)
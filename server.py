@@ -1,14 +1,79 @@
+import time
+
 from http import HTTPStatus
-from flask import Flask
+from flask import Flask, make_response, request
 from flask_restful import Api, Resource
 
-from modules import pokeapi, funtranslations
-
+from modules import (
+    batch,
+    pokeapi,
+    funtranslations,
+    hotkeys,
+    httpcache,
+    jsoncodec,
+    metrics,
+    responsecache,
+)
 
 app = Flask(__name__)
 api = Api(app)
 
 
+@api.representation("application/json")
+def output_json(data, code, headers=None):
+    """
+    Encodes a JSON response with the configured JSON codec
+    :param data: Dict of the response data
+    :param code: Integer HTTP Status Code
+    :param headers: Dict of extra response headers
+    :return: Flask Response
+    """
+    response = make_response(jsoncodec.dumps(data) + b"\n", code)
+    response.headers["Content-Type"] = "application/json"
+    response.headers.extend(headers or {})
+    return response
+
+
+def output_encoded(encoded, route_cache_control):
+    """
+    Writes a response encoded ahead of time straight to the client, without
+    a body when the client's If-None-Match shows it already holds it
+    :param encoded: EncodedResponse to send
+    :param route_cache_control: String Cache-Control header of the route
+    :return: Flask Response
+    """
+    prepared = httpcache.prepare(
+        encoded, request.headers.get("If-None-Match"), route_cache_control
+    )
+    response = app.response_class(
+        prepared.body, status=prepared.status, headers=prepared.headers
+    )
+    if prepared.status == HTTPStatus.NOT_MODIFIED:
+        # A 304 has no body, so no type either, not Flask's text/html
+        del response.headers["Content-Type"]
+    return response
+
+
+def translate_description(item, mode, deadline=None):
+    """
+    Translates a Pokemon description
+    :param item: Tuple of the TranslationLanguage and String description
+    :param mode: TranslationMode to translate with
+    :param deadline: Number time.monotonic() time the translation must be
+    done by, None waits up to the request timeout
+    :return: A Tuple containing:
+    - Dict of the response data
+    - Integer HTTP Status Code
+    """
+    language, description = item
+    translate = funtranslations.FunTranslationsAPIWrapper(deadline=deadline)
+    if mode == funtranslations.TranslationMode.LOCAL:
+        return translate.translate_local(description, language)
+    if language == funtranslations.TranslationLanguage.YODA:
+        return translate.translate_yoda(description)
+    return translate.translate_shakespeare(description)
+
+
 class Pokemon(Resource):
     def get(self, pokemon_name):
         """
@@ -16,43 +81,169 @@ class Pokemon(Resource):
         :param pokemon_name: String name of the Pokemon to get
         :return: JSON response of Pokemon data
         """
+        key = responsecache.pokemon_key(pokemon_name)
+        encoded = responsecache.responses.get(key)
+        if encoded is not None:
+            hotkeys.tracker.record(hotkeys.SPECIES, pokemon_name)
+            return output_encoded(encoded, httpcache.POKEMON_CACHE_CONTROL)
         poke = pokeapi.PokeAPIWrapper()
         result, status_code = poke.get_pokemon_species_by_name(pokemon_name)
-        return result, status_code
+        if status_code != HTTPStatus.OK:
+            return result, status_code
+        hotkeys.tracker.record(hotkeys.SPECIES, pokemon_name)
+        return output_encoded(
+            responsecache.responses.store(
+                key,
+                result,
+                responsecache.species_sources(pokemon_name, result),
+            ),
+            httpcache.POKEMON_CACHE_CONTROL,
+        )
+
+
+class PokemonBatch(Resource):
+    def get(self):
+        """
+        Gets the details about several Pokemon at once, given as a comma
+        separated list in the names parameter, each one looked up as by
+        GET /pokemon/<name>
+        :return: JSON response of the per Pokemon data and status codes
+        """
+        result, status_code = batch.parse_names(request.args.get("names"))
+        if status_code != HTTPStatus.OK:
+            return result, status_code
+        names = result["names"]
+        poke = pokeapi.PokeAPIWrapper()
+        results = batch.executor.map(poke.get_pokemon_species_by_name, names)
+        hotkeys.tracker.record_found(hotkeys.SPECIES, names, results)
+        return batch.build_results(names, results), HTTPStatus.OK
 
 
 class PokemonTranslated(Resource):
     def get(self, pokemon_name):
         """
-        Gets the translated Pokemon description and basic information
+        Gets the translated Pokemon description and basic information, the
+        mode parameter set to local translates without any network access.
+        The untranslated description is returned, marked as skipped, when
+        the latency budget runs out.
         """
+        m_result, m_status_code = funtranslations.parse_translation_mode(
+            request.args.get("mode")
+        )
+        if m_status_code != HTTPStatus.OK:
+            return m_result, m_status_code
+        b_result, b_status_code = funtranslations.parse_latency_budget(
+            request.headers.get(funtranslations.LATENCY_BUDGET_HEADER)
+        )
+        if b_status_code != HTTPStatus.OK:
+            return b_result, b_status_code
+        key = responsecache.translated_key(pokemon_name, m_result["mode"])
+        encoded = responsecache.responses.get(key)
+        if encoded is not None:
+            hotkeys.tracker.record(hotkeys.TRANSLATED, pokemon_name)
+            return output_encoded(encoded, httpcache.TRANSLATED_CACHE_CONTROL)
+        deadline = time.monotonic() + b_result["budget"]
         poke = pokeapi.PokeAPIWrapper()
         p_result, p_status_code = poke.get_pokemon_species_by_name(
             pokemon_name
         )
         # Attempt to translate description if possible
         if p_status_code == HTTPStatus.OK:
-            translate = funtranslations.FunTranslationsAPIWrapper()
-            if (
-                p_result["habitat"].lower() == "cave"
-                or p_result["isLegendary"]
-            ):
-                t_result, t_status_code = translate.translate_yoda(
-                    p_result["description"]
-                )
-            else:
-                t_result, t_status_code = translate.translate_shakespeare(
-                    p_result["description"]
-                )
+            hotkeys.tracker.record(hotkeys.TRANSLATED, pokemon_name)
+            language = funtranslations.species_translation_language(p_result)
+            t_result, t_status_code = translate_description(
+                (language, p_result["description"]),
+                m_result["mode"],
+                deadline,
+            )
             if t_status_code == HTTPStatus.OK:
+                sources = responsecache.translated_sources(
+                    pokemon_name,
+                    p_result,
+                    language,
+                    t_result["translation"],
+                    m_result["mode"],
+                )
                 p_result["description"] = t_result["translation"]
+                return output_encoded(
+                    responsecache.responses.store(key, p_result, sources),
+                    httpcache.TRANSLATED_CACHE_CONTROL,
+                )
+            if time.monotonic() >= deadline:
+                p_result["translationSkipped"] = True
+            # The untranslated fallback is never kept and is revalidated
+            # before every reuse
+            return output_encoded(
+                responsecache.EncodedResponse.from_result(p_result, None),
+                httpcache.TRANSLATED_CACHE_CONTROL,
+            )
         return p_result, p_status_code
 
 
+class PokemonTranslatedBatch(Resource):
+    def get(self):
+        """
+        Gets the translated descriptions and basic information of several
+        Pokemon at once, given as a comma separated list in the names
+        parameter, each one looked up as by GET /pokemon/translated/<name>.
+        The mode parameter set to local translates without any network
+        access.
+        :return: JSON response of the per Pokemon data and status codes
+        """
+        m_result, m_status_code = funtranslations.parse_translation_mode(
+            request.args.get("mode")
+        )
+        if m_status_code != HTTPStatus.OK:
+            return m_result, m_status_code
+        b_result, b_status_code = funtranslations.parse_latency_budget(
+            request.headers.get(funtranslations.LATENCY_BUDGET_HEADER)
+        )
+        if b_status_code != HTTPStatus.OK:
+            return b_result, b_status_code
+        deadline = time.monotonic() + b_result["budget"]
+        result, status_code = batch.parse_names(request.args.get("names"))
+        if status_code != HTTPStatus.OK:
+            return result, status_code
+        names = result["names"]
+        poke = pokeapi.PokeAPIWrapper()
+        species = batch.executor.map(poke.get_pokemon_species_by_name, names)
+        hotkeys.tracker.record_found(hotkeys.TRANSLATED, names, species)
+        # Translate each distinct description once, whatever the batch size
+        items = batch.translation_items(species)
+        wanted = batch.group_translations(items)
+        translated = batch.executor.map(
+            lambda item: translate_description(
+                item, m_result["mode"], deadline
+            ),
+            wanted,
+        )
+        results = batch.apply_translations(
+            species,
+            items,
+            dict(zip(wanted, translated)),
+        )
+        return batch.build_results(names, results), HTTPStatus.OK
+
+
+class Metrics(Resource):
+    def get(self):
+        """
+        Gets the runtime metrics of this worker process
+        :return: JSON response of metrics data
+        """
+        return metrics.registry.snapshot(), HTTPStatus.OK
+
+
 api.add_resource(Pokemon, "/pokemon/<string:pokemon_name>")
+api.add_resource(PokemonBatch, "/pokemon")
 api.add_resource(
     PokemonTranslated, "/pokemon/translated/<string:pokemon_name>"
 )
+api.add_resource(PokemonTranslatedBatch, "/pokemon/translated")
+api.add_resource(Metrics, "/metrics")
+
+# Preload the caches with the hottest keys before gunicorn forks the workers
+hotkeys.warm_on_start()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,312 @@
+import json
+import asyncio
+import unittest
+
+from unittest.mock import patch
+
+from asgi import app, NOT_FOUND_MESSAGE
+from modules import hotkeys, responsecache
+from modules.funtranslations import FunTranslationsBase
+
+
+class AsgiTests(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        # Keep the hot set in memory, whatever the environment, such as the
+        # Docker image, configures
+        patcher = patch.object(hotkeys.tracker, "_path", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        hotkeys.tracker.reset()
+        responsecache.responses.clear()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def request(self, path, method="GET", query_string=b"", headers=()):
+        """
+        Sends a request through the ASGI app
+        :param path: String path to request
+        :param method: String HTTP method to use
+        :param query_string: Bytes query string of the request
+        :param headers: List of (Bytes, Bytes) request header Tuples
+        :return: A Tuple containing:
+        - Integer HTTP Status Code
+        - Dict of the response headers
+        - Dict of the decoded JSON body
+        """
+        scope = {
+            "type": "http",
+            "method": method,
+            "path": path,
+            "query_string": query_string,
+            "headers": list(headers),
+        }
+        messages = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            messages.append(message)
+
+        self.loop.run_until_complete(app(scope, receive, send))
+        start, body = messages
+        headers = dict(start["headers"])
+        return start["status"], headers, json.loads(body["body"])
+
+    def test_pokemon_get(self):
+        """
+        Tests the GET Pokemon route returns the same result as the
+        get_pokemon_species_by_name method
+        """
+        result = {
+            "name": "mewtwo",
+            "habitat": "rare",
+            "isLegendary": True,
+            "description": "Some description",
+        }
+        names = []
+
+        async def fake_get_species(wrapper, pokemon_name):
+            names.append(pokemon_name)
+            return result, 200
+
+        with patch(
+            "modules.pokeapi.AsyncPokeAPIWrapper.get_pokemon_species_by_name",
+            new=fake_get_species,
+        ):
+            status, headers, body = self.request("/pokemon/mewtwo")
+        self.assertEqual(status, 200)
+        self.assertEqual(headers[b"content-type"], b"application/json")
+        self.assertEqual(body, result)
+        self.assertEqual(names, ["mewtwo"])
+        self.assertTrue(headers[b"etag"].startswith(b'"'))
+        self.assertEqual(
+            headers[b"content-length"],
+            str(len(json.dumps(result, separators=(",", ":"))) + 1).encode(),
+        )
+
+    def test_pokemon_get_not_modified(self):
+        """
+        Tests the GET Pokemon route answers a matching If-None-Match with a
+        304 without a body
+        """
+        result = {
+            "name": "mewtwo",
+            "habitat": "rare",
+            "isLegendary": True,
+            "description": "Some description",
+        }
+
+        async def fake_get_species(wrapper, pokemon_name):
+            return result, 200
+
+        with patch(
+            "modules.pokeapi.AsyncPokeAPIWrapper.get_pokemon_species_by_name",
+            new=fake_get_species,
+        ):
+            _, headers, _ = self.request("/pokemon/mewtwo")
+            scope = {
+                "type": "http",
+                "method": "GET",
+                "path": "/pokemon/mewtwo",
+                "query_string": b"",
+                "headers": [(b"if-none-match", headers[b"etag"])],
+            }
+            messages = []
+
+            async def receive():
+                return {"type": "http.request", "body": b""}
+
+            async def send(message):
+                messages.append(message)
+
+            self.loop.run_until_complete(app(scope, receive, send))
+        start, body = messages
+        self.assertEqual(start["status"], 304)
+        self.assertEqual(body["body"], b"")
+        self.assertEqual(dict(start["headers"])[b"etag"], headers[b"etag"])
+        self.assertIn(b"cache-control", headers)
+
+    def test_pokemon_translated_get(self):
+        """
+        Tests the GET translated Pokemon route picks the right translator and
+        replaces the description
+        """
+        species = {
+            "name": "mewtwo",
+            "habitat": "rare",
+            "isLegendary": True,
+            "description": "hello, world",
+        }
+        translated = []
+
+        async def fake_get_species(wrapper, pokemon_name):
+            return dict(species), 200
+
+        async def fake_yoda(wrapper, text):
+            translated.append(text)
+            return {"translation": "world, hello"}, 200
+
+        with patch(
+            "modules.pokeapi.AsyncPokeAPIWrapper.get_pokemon_species_by_name",
+            new=fake_get_species,
+        ), patch(
+            "modules.funtranslations.AsyncFunTranslationsAPIWrapper"
+            ".translate_yoda",
+            new=fake_yoda,
+        ):
+            status, _, body = self.request("/pokemon/translated/mewtwo")
+        self.assertEqual(status, 200)
+        self.assertEqual(body["description"], "world, hello")
+        self.assertEqual(translated, ["hello, world"])
+
+    def test_pokemon_translated_get_ft_failure(self):
+        """
+        Tests the original description is kept when translating fails
+        """
+        species = {
+            "name": "pikachu",
+            "habitat": "forest",
+            "isLegendary": False,
+            "description": "hello, world",
+        }
+
+        async def fake_get_species(wrapper, pokemon_name):
+            return dict(species), 200
+
+        async def fake_shakespeare(wrapper, text):
+            return {"message": "Error: Too Many Requests"}, 429
+
+        with patch(
+            "modules.pokeapi.AsyncPokeAPIWrapper.get_pokemon_species_by_name",
+            new=fake_get_species,
+        ), patch(
+            "modules.funtranslations.AsyncFunTranslationsAPIWrapper"
+            ".translate_shakespeare",
+            new=fake_shakespeare,
+        ):
+            status, _, body = self.request("/pokemon/translated/pikachu")
+        self.assertEqual(status, 200)
+        self.assertEqual(body, species)
+
+    def test_metrics_get(self):
+        """
+        Tests the GET metrics route returns the metrics snapshot
+        """
+        status, _, body = self.request("/metrics")
+        self.assertEqual(status, 200)
+        self.assertIn("counters", body)
+
+    def test_unknown_route(self):
+        """
+        Tests unknown routes and methods get the same errors as the Flask app
+        """
+        status, _, body = self.request("/unknown")
+        self.assertEqual(status, 404)
+        self.assertEqual(body, {"message": NOT_FOUND_MESSAGE})
+        status, _, _ = self.request("/pokemon/mewtwo", method="POST")
+        self.assertEqual(status, 405)
+
+    def test_pokemon_batch_get(self):
+        """
+        Tests the batch route returns every Pokemon's result and status code,
+        recording those found as hot keys
+        """
+
+        async def fake_get_species(wrapper, pokemon):
+            if pokemon == "missingno":
+                return {"message": "Error: Not Found"}, 404
+            return {"name": pokemon}, 200
+
+        with patch(
+            "modules.pokeapi.AsyncPokeAPIWrapper.get_pokemon_species_by_name",
+            new=fake_get_species,
+        ):
+            status, _, body = self.request(
+                "/pokemon", query_string=b"names=mewtwo,missingno"
+            )
+        self.assertEqual(status, 200)
+        self.assertEqual(
+            [(item["name"], item["status"]) for item in body["results"]],
+            [("mewtwo", 200), ("missingno", 404)],
+        )
+        self.assertEqual(
+            hotkeys.tracker.hot_keys(),
+            {hotkeys.SPECIES: ["mewtwo"], hotkeys.TRANSLATED: []},
+        )
+        status, _, body = self.request("/pokemon")
+        self.assertEqual(status, 400)
+
+    def test_pokemon_translated_batch_get(self):
+        """
+        Tests the translated batch route translates each distinct description
+        once
+        """
+        translated = []
+
+        async def fake_get_species(wrapper, pokemon):
+            return {
+                "name": pokemon,
+                "habitat": "cave",
+                "isLegendary": False,
+                "description": "hello",
+            }, 200
+
+        async def fake_yoda(wrapper, text):
+            translated.append(text)
+            return {"translation": "hello, yoda"}, 200
+
+        with patch(
+            "modules.pokeapi.AsyncPokeAPIWrapper.get_pokemon_species_by_name",
+            new=fake_get_species,
+        ), patch(
+            "modules.funtranslations.AsyncFunTranslationsAPIWrapper"
+            ".translate_yoda",
+            new=fake_yoda,
+        ):
+            status, _, body = self.request(
+                "/pokemon/translated", query_string=b"names=zubat,golbat"
+            )
+        self.assertEqual(status, 200)
+        self.assertEqual(
+            [item["result"]["description"] for item in body["results"]],
+            ["hello, yoda", "hello, yoda"],
+        )
+        self.assertEqual(translated, ["hello"])
+
+    def test_pokemon_translated_get_budget_exhausted(self):
+        """
+        Tests the untranslated description is returned, marked as skipped,
+        when the latency budget runs out before translating
+        """
+        species = {
+            "name": "pikachu",
+            "habitat": "forest",
+            "isLegendary": False,
+            "description": "An async budget test description.",
+        }
+
+        async def fake_get_species(wrapper, pokemon_name):
+            return dict(species), 200
+
+        async def fake_get(pool, url, **kwargs):
+            raise AssertionError("The budget should have been exhausted")
+
+        with patch(
+            "modules.pokeapi.AsyncPokeAPIWrapper.get_pokemon_species_by_name",
+            new=fake_get_species,
+        ), patch(
+            "modules.sessions.AsyncSessionPool.get", new=fake_get
+        ), patch.object(
+            FunTranslationsBase, "LOCAL_FALLBACK", True
+        ):
+            status, headers, body = self.request(
+                "/pokemon/translated/pikachu",
+                headers=[(b"X-Latency-Budget", b"0")],
+            )
+        self.assertEqual(status, 200)
+        self.assertEqual(body, dict(species, translationSkipped=True))
+        self.assertEqual(headers[b"cache-control"], b"no-cache")
+        self.assertTrue(headers[b"etag"].startswith(b'"'))
@@ -0,0 +1,258 @@
+import time
+import asyncio
+import threading
+import unittest
+
+from http import HTTPStatus
+from unittest.mock import patch
+
+from modules.funtranslations import TranslationLanguage
+from modules.batch import (
+    BatchExecutor,
+    apply_translations,
+    build_results,
+    group_translations,
+    parse_names,
+    translation_items,
+)
+
+
+class TestBatchExecutor(unittest.TestCase):
+    def setUp(self):
+        self.executor = BatchExecutor(max_workers=8, max_fan_out=2)
+
+    def test_map_keeps_order(self):
+        """
+        Tests results are returned in the order the items were given
+        """
+        results = self.executor.map(lambda item: item * 2, [3, 1, 2])
+        self.assertEqual(results, [6, 2, 4])
+
+    def test_map_deduplicated(self):
+        """
+        Tests repeated items are only run once
+        """
+        calls = []
+
+        def fn(item):
+            calls.append(item)
+            return item.upper()
+
+        results = self.executor.map(fn, ["a", "b", "a", "a"])
+        self.assertEqual(results, ["A", "B", "A", "A"])
+        self.assertEqual(sorted(calls), ["a", "b"])
+        stats = self.executor.stats()
+        self.assertEqual(stats["batches"], 1)
+        self.assertEqual(stats["items"], 4)
+        self.assertEqual(stats["deduplicated"], 2)
+
+    def test_map_bounded_fan_out(self):
+        """
+        Tests no more than max_fan_out items of a batch run at the same time
+        """
+        lock = threading.Lock()
+        running = [0]
+        peak = [0]
+
+        def fn(item):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.01)
+            with lock:
+                running[0] -= 1
+            return item
+
+        results = self.executor.map(fn, list(range(6)))
+        self.assertEqual(results, list(range(6)))
+        self.assertEqual(peak[0], 2)
+
+    def test_map_fan_out_capped_at_pool_size(self):
+        """
+        Tests a threaded batch never runs more items at once than there are
+        pooled upstream connections
+        """
+        executor = BatchExecutor(max_workers=8, max_fan_out=6, pool_size=3)
+        self.assertEqual(executor.threaded_fan_out, 3)
+        self.assertEqual(executor.max_fan_out, 6)
+        executor = BatchExecutor(max_workers=8, max_fan_out=2, pool_size=4)
+        self.assertEqual(executor.threaded_fan_out, 2)
+        self.assertEqual(BatchExecutor(max_fan_out=6).threaded_fan_out, 6)
+
+    def test_async_map(self):
+        """
+        Tests awaitables are run concurrently, deduplicated and bounded
+        """
+        running = [0]
+        peak = [0]
+
+        async def fn(item):
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+            await asyncio.sleep(0.01)
+            running[0] -= 1
+            return item * 2
+
+        loop = asyncio.new_event_loop()
+        try:
+            results = loop.run_until_complete(
+                self.executor.async_map(fn, [1, 2, 3, 1])
+            )
+        finally:
+            loop.close()
+        self.assertEqual(results, [2, 4, 6, 2])
+        self.assertEqual(peak[0], 2)
+        self.assertEqual(self.executor.stats()["deduplicated"], 1)
+
+    def test_parse_names(self):
+        """
+        Tests batch names are split and normalised
+        """
+        result, status = parse_names(" Mewtwo, pikachu,,25 ")
+        self.assertEqual(result, {"names": ["mewtwo", "pikachu", "25"]})
+        self.assertEqual(status, HTTPStatus.OK)
+
+    def test_parse_names_invalid(self):
+        """
+        Tests missing names and too many names are rejected
+        """
+        for names in (None, "", " , "):
+            result, status = parse_names(names)
+            self.assertEqual(
+                result["message"], "Error: No Pokemon names given"
+            )
+            self.assertEqual(status, HTTPStatus.BAD_REQUEST)
+
+        with patch.object(BatchExecutor, "MAX_ITEMS", 2):
+            result, status = parse_names("a,b,c")
+        self.assertEqual(
+            result["message"],
+            "Error: At most 2 Pokemon may be requested at once",
+        )
+        self.assertEqual(status, HTTPStatus.BAD_REQUEST)
+
+    def test_build_results(self):
+        """
+        Tests the batch response holds every item's result and status code
+        """
+        body = build_results(
+            ["mewtwo", "missingno"],
+            [
+                ({"name": "mewtwo"}, HTTPStatus.OK),
+                ({"message": "Error: Not Found"}, 404),
+            ],
+        )
+        self.assertEqual(
+            body,
+            {
+                "results": [
+                    {
+                        "name": "mewtwo",
+                        "status": 200,
+                        "result": {"name": "mewtwo"},
+                    },
+                    {
+                        "name": "missingno",
+                        "status": 404,
+                        "result": {"message": "Error: Not Found"},
+                    },
+                ]
+            },
+        )
+
+    def test_translation_items(self):
+        """
+        Tests each found species is given the same translation as a single
+        translated lookup would use
+        """
+        species = [
+            (
+                {"habitat": "cave", "isLegendary": False, "description": "a"},
+                200,
+            ),
+            (
+                {"habitat": "rare", "isLegendary": True, "description": "b"},
+                200,
+            ),
+            (
+                {"habitat": "sea", "isLegendary": False, "description": "c"},
+                200,
+            ),
+            ({"message": "Error: Not Found"}, 404),
+        ]
+        self.assertEqual(
+            translation_items(species),
+            [
+                (TranslationLanguage.YODA, "a"),
+                (TranslationLanguage.YODA, "b"),
+                (TranslationLanguage.SHAKESPEARE, "c"),
+                None,
+            ],
+        )
+
+    def test_group_translations(self):
+        """
+        Tests translations are grouped by language and duplicate texts are
+        dropped
+        """
+        items = [
+            (TranslationLanguage.YODA, "b"),
+            (TranslationLanguage.SHAKESPEARE, "a"),
+            None,
+            (TranslationLanguage.YODA, "a"),
+            (TranslationLanguage.YODA, "b"),
+        ]
+        self.assertEqual(
+            group_translations(items),
+            [
+                (TranslationLanguage.SHAKESPEARE, "a"),
+                (TranslationLanguage.YODA, "a"),
+                (TranslationLanguage.YODA, "b"),
+            ],
+        )
+
+    def test_apply_translations(self):
+        """
+        Tests descriptions are only replaced when translating them succeeded
+        """
+        species = [
+            ({"name": "a", "description": "hello"}, 200),
+            ({"name": "b", "description": "world"}, 200),
+            ({"message": "Error: Not Found"}, 404),
+        ]
+        items = [
+            (TranslationLanguage.YODA, "hello"),
+            (TranslationLanguage.SHAKESPEARE, "world"),
+            None,
+        ]
+        translations = {
+            items[0]: ({"translation": "hello, yoda"}, 200),
+            items[1]: ({"message": "Error: Too Many Requests"}, 429),
+        }
+        self.assertEqual(
+            apply_translations(species, items, translations),
+            [
+                ({"name": "a", "description": "hello, yoda"}, 200),
+                ({"name": "b", "description": "world"}, 200),
+                ({"message": "Error: Not Found"}, 404),
+            ],
+        )
+        self.assertEqual(species[0][0]["description"], "hello")
+
+        # Only the items the latency budget ran out on are marked as skipped
+        translations[items[0]] = ({"message": "Error: Not Found"}, 404)
+        translations[items[1]] = ({"message": "Error: Latency"}, 504)
+        self.assertEqual(
+            apply_translations(species, items, translations)[:2],
+            [
+                ({"name": "a", "description": "hello"}, 200),
+                (
+                    {
+                        "name": "b",
+                        "description": "world",
+                        "translationSkipped": True,
+                    },
+                    200,
+                ),
+            ],
+        )
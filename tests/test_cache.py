@@ -0,0 +1,414 @@
+import os
+import tempfile
+import unittest
+
+from unittest.mock import patch
+
+from modules.cache import (
+    Cache,
+    LRUCache,
+    SQLiteCache,
+    TieredCache,
+    build_cache,
+    estimate_size,
+)
+from modules.species import SpeciesRecord
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCache(unittest.TestCase):
+    def test_incomplete_backend(self):
+        """
+        Tests a backend missing part of the interface cannot be created
+        """
+
+        class GetOnlyCache(Cache):
+            def get_entry(self, key):
+                return None
+
+        with self.assertRaises(TypeError):
+            GetOnlyCache()
+        with self.assertRaises(TypeError):
+            Cache()
+
+
+class TestLRUCache(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def test_get_and_set(self):
+        """
+        Tests stored values are returned and misses give the default
+        """
+        cache = LRUCache(max_entries=2, clock=self.clock)
+        cache.set("mewtwo", {"name": "mewtwo"})
+        self.assertEqual(cache.get("mewtwo"), {"name": "mewtwo"})
+        self.assertIsNone(cache.get("pikachu"))
+        self.assertEqual(cache.get("pikachu", "default"), "default")
+        stats = cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 2)
+
+    def test_lru_eviction(self):
+        """
+        Tests the least recently used entry is evicted when full
+        """
+        cache = LRUCache(max_entries=2, clock=self.clock)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_ttl_expiry(self):
+        """
+        Tests entries expire once their TTL has passed
+        """
+        cache = LRUCache(max_entries=2, ttl=10, clock=self.clock)
+        cache.set("a", 1)
+        cache.set("b", 2, ttl=60)
+        self.clock.now += 11
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("b"), 2)
+        self.assertEqual(cache.stats()["expirations"], 1)
+        self.assertEqual(len(cache), 1)
+
+    def test_stale_entry(self):
+        """
+        Tests expired entries are served stale until their stale period ends
+        """
+        cache = LRUCache(max_entries=2, ttl=10, stale_ttl=20, clock=self.clock)
+        cache.set("a", 1)
+        self.assertEqual(cache.get_entry("a"), (1, True))
+        self.clock.now += 11
+        self.assertEqual(cache.get_entry("a"), (1, False))
+        self.assertIsNone(cache.get("a"))
+        self.clock.now += 20
+        self.assertIsNone(cache.get_entry("a"))
+        self.assertEqual(len(cache), 0)
+        stats = cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["staleHits"], 2)
+        self.assertEqual(stats["expirations"], 1)
+
+    def test_memory_ceiling(self):
+        """
+        Tests entries are evicted to stay under the memory ceiling
+        """
+        value = "x" * 100
+        max_bytes = estimate_size(value) * 2
+        cache = LRUCache(max_entries=10, max_bytes=max_bytes)
+        cache.set("a", value)
+        cache.set("b", value)
+        cache.set("c", value)
+        self.assertEqual(len(cache), 2)
+        self.assertLessEqual(cache.stats()["bytes"], max_bytes)
+        self.assertEqual(cache.stats()["avgEntryBytes"], estimate_size(value))
+        cache.set("huge", "x" * 1000)
+        self.assertIsNone(cache.get("huge"))
+
+    def test_disabled(self):
+        """
+        Tests a cache with no entries allowed never stores anything
+        """
+        cache = LRUCache(max_entries=0)
+        cache.set("a", 1)
+        self.assertIsNone(cache.get("a"))
+
+    def test_delete_and_clear(self):
+        """
+        Tests entries can be deleted and the cache cleared
+        """
+        cache = LRUCache()
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.delete("a")
+        cache.delete("missing")
+        self.assertIsNone(cache.get("a"))
+        cache.clear()
+        self.assertEqual(
+            cache.stats(),
+            {
+                "hits": 0,
+                "staleHits": 0,
+                "misses": 0,
+                "evictions": 0,
+                "expirations": 0,
+                "entries": 0,
+                "bytes": 0,
+                "avgEntryBytes": 0,
+            },
+        )
+
+    def test_time_left(self):
+        """
+        Tests how long an entry stays fresh is reported without a lookup
+        """
+        cache = LRUCache(max_entries=2, ttl=10, clock=self.clock)
+        cache.set("a", 1)
+        self.clock.now += 4
+        self.assertEqual(cache.time_left("a"), 6)
+        self.assertEqual(cache.time_left("missing"), 0)
+        self.clock.now += 10
+        self.assertEqual(cache.time_left("a"), 0)
+        self.assertEqual(cache.stats()["hits"], 0)
+        self.assertEqual(cache.stats()["misses"], 0)
+
+    def test_subscribe(self):
+        """
+        Tests listeners are told about every entry stored or removed
+        """
+        cache = LRUCache(max_entries=2, clock=self.clock)
+        changed = []
+        cache.subscribe(changed.append)
+        cache.set("a", 1)
+        cache.delete("a")
+        cache.delete("missing")
+        cache.clear()
+        self.assertEqual(changed, ["a", "a", None])
+
+    def test_estimate_size(self):
+        """
+        Tests nested values are included in the size estimate
+        """
+        flat = estimate_size({})
+        nested = estimate_size({"a": ["b", "c"]})
+        self.assertGreater(nested, flat)
+        record = SpeciesRecord("mewtwo", "rare", True, "A" * 100)
+        self.assertGreater(estimate_size(record), 100)
+
+
+class TestSQLiteCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "cache.sqlite3")
+        self.clock = FakeClock()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_persisted(self):
+        """
+        Tests values survive into a new cache using the same database
+        """
+        SQLiteCache(self.path).set(("translation", "YODA", "abc"), "Hmm")
+        cache = SQLiteCache(self.path)
+        self.assertEqual(cache.get(("translation", "YODA", "abc")), "Hmm")
+        self.assertIsNone(cache.get(("translation", "YODA", "def")))
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_record_stored_as_dict(self):
+        """
+        Tests compact records are stored as their plain JSON Dict
+        """
+        cache = SQLiteCache(self.path)
+        record = SpeciesRecord("mewtwo", "rare", True, "Created.")
+        cache.set(("id", 150), record)
+        self.assertEqual(cache.get(("id", 150)), record.to_dict())
+        with self.assertRaises(TypeError):
+            cache.set("a", object())
+
+    def test_ttl_expiry(self):
+        """
+        Tests entries expire once their TTL has passed
+        """
+        cache = SQLiteCache(self.path, ttl=10, clock=self.clock)
+        cache.set("a", {"value": 1})
+        self.assertEqual(cache.get("a"), {"value": 1})
+        self.clock.now += 11
+        self.assertIsNone(cache.get("a"))
+
+    def test_stale_entry(self):
+        """
+        Tests expired entries are served stale until their stale period ends
+        and are only pruned once it has
+        """
+        cache = SQLiteCache(self.path, ttl=10, stale_ttl=20, clock=self.clock)
+        cache.set("a", 1)
+        self.clock.now += 11
+        cache.prune()
+        self.assertEqual(cache.get_entry("a"), (1, False))
+        self.clock.now += 20
+        self.assertIsNone(cache.get_entry("a"))
+        cache.prune()
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_prune(self):
+        """
+        Tests pruning removes expired entries and the oldest excess entries
+        """
+        cache = SQLiteCache(self.path, max_entries=2, clock=self.clock)
+        cache.set("expired", 0, ttl=1)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.set("c", 3)
+        self.clock.now += 2
+        cache.prune()
+        self.assertEqual(cache.stats()["entries"], 2)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("c"), 3)
+
+    def test_time_left_and_subscribe(self):
+        """
+        Tests how long an entry stays fresh is reported and listeners are
+        told about every entry stored or removed
+        """
+        cache = SQLiteCache(self.path, clock=self.clock)
+        changed = []
+        cache.subscribe(changed.append)
+        cache.set("a", 1, ttl=10)
+        cache.set("b", 2)
+        self.clock.now += 4
+        self.assertEqual(cache.time_left("a"), 6)
+        self.assertIsNone(cache.time_left("b"))
+        self.assertEqual(cache.time_left("missing"), 0)
+        cache.delete("a")
+        cache.clear()
+        self.assertEqual(changed, ["a", "b", "a", None])
+
+    def test_unusable_database(self):
+        """
+        Tests database errors are treated as misses rather than raised
+        """
+        cache = SQLiteCache(os.path.join(self.path, "missing", "db"))
+        cache.set("a", 1)
+        self.assertIsNone(cache.get("a"))
+        self.assertGreater(cache.stats()["errors"], 0)
+
+
+class TestTieredCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "cache.sqlite3")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_promotes_from_back(self):
+        """
+        Tests a value only in the back cache is promoted to the front cache
+        """
+        back = SQLiteCache(self.path)
+        back.set("a", 1)
+        cache = TieredCache(LRUCache(), back)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.front.get("a"), 1)
+
+    def test_set_delete_clear(self):
+        """
+        Tests writes are applied to both caches
+        """
+        cache = TieredCache(LRUCache(), SQLiteCache(self.path))
+        cache.set("a", 1)
+        cache.set("b", 2)
+        self.assertEqual(cache.back.get("a"), 1)
+        cache.delete("a")
+        self.assertIsNone(cache.get("a"))
+        cache.clear()
+        self.assertIsNone(cache.get("b"))
+
+    def test_time_left_and_subscribe(self):
+        """
+        Tests the freshness of the back cache is reported when the front has
+        no entry, and listeners of the tiered cache are told about writes
+        """
+        cache = TieredCache(LRUCache(), SQLiteCache(self.path, ttl=10))
+        changed = []
+        cache.subscribe(changed.append)
+        cache.back.set("a", 1)
+        self.assertGreater(cache.time_left("a"), 0)
+        cache.set("b", 2)
+        self.assertIsNone(cache.time_left("b"))
+        cache.delete("b")
+        cache.clear()
+        self.assertEqual(changed, ["b", "b", None])
+
+    def test_stale_front_fresh_back(self):
+        """
+        Tests a fresh back value is preferred over a stale front value
+        """
+        clock = FakeClock()
+        front = LRUCache(ttl=10, stale_ttl=100, clock=clock)
+        back = SQLiteCache(self.path)
+        cache = TieredCache(front, back)
+        cache.set("a", 1)
+        back.set("a", 2)
+        clock.now += 11
+        self.assertEqual(cache.get_entry("a"), (2, True))
+        self.assertEqual(front.get_entry("a"), (2, True))
+
+    def test_stale_front_missing_back(self):
+        """
+        Tests a stale front value is returned when the back has no entry
+        """
+        clock = FakeClock()
+        front = LRUCache(ttl=10, stale_ttl=100, clock=clock)
+        cache = TieredCache(front, SQLiteCache(self.path))
+        front.set("a", 1)
+        clock.now += 11
+        self.assertEqual(cache.get_entry("a"), (1, False))
+
+    def test_front_only(self):
+        """
+        Tests the cache works without a back cache
+        """
+        cache = TieredCache(LRUCache())
+        cache.set("a", 1)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get("b", "default"), "default")
+        self.assertNotIn("back", cache.stats())
+
+
+class TestBuildCache(unittest.TestCase):
+    def test_memory_backend(self):
+        """
+        Tests the memory backend builds an in process cache
+        """
+        with patch("modules.cache.CACHE_BACKEND", "memory"):
+            cache = build_cache("species", max_entries=10, ttl=60)
+        self.assertIsInstance(cache, LRUCache)
+        self.assertEqual(cache.max_entries, 10)
+        self.assertEqual(cache.ttl, 60)
+
+    def test_shared_backend(self):
+        """
+        Tests caches built by different workers share one SQLite table
+        """
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "shared.sqlite3")
+            with patch("modules.cache.CACHE_BACKEND", "shared"), patch(
+                "modules.cache.CACHE_SHARED_PATH", path
+            ):
+                worker_one = build_cache("species", max_entries=10)
+                worker_two = build_cache("species", max_entries=10)
+                other = build_cache("translations", max_entries=10)
+            self.assertIsInstance(worker_one, SQLiteCache)
+            worker_one.set(("id", 150), {"name": "mewtwo"})
+            self.assertEqual(worker_two.get(("id", 150)), {"name": "mewtwo"})
+            self.assertIsNone(other.get(("id", 150)))
+
+    def test_unknown_backend(self):
+        """
+        Tests an unknown backend is rejected
+        """
+        with patch("modules.cache.CACHE_BACKEND", "memcached"):
+            with self.assertRaises(RuntimeError):
+                build_cache("species", max_entries=10)
+
+    def test_invalid_table_name(self):
+        """
+        Tests table names that are not identifiers are rejected
+        """
+        with self.assertRaises(ValueError):
+            SQLiteCache(":memory:", table="species; DROP TABLE x")
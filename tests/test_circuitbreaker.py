@@ -0,0 +1,125 @@
+import unittest
+
+from modules.circuitbreaker import CircuitBreaker, CircuitState
+
+
+class FakeClock:
+    def __init__(self):
+        """
+        Initialise the clock
+        """
+        self.now = 1000.0
+
+    def __call__(self):
+        """
+        Gets the current fake time
+        :return: Number of the current fake time
+        """
+        return self.now
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def build(self, **kwargs):
+        """
+        Builds a breaker driven by the fake clock
+        :return: CircuitBreaker
+        """
+        options = {
+            "window": 10,
+            "min_calls": 4,
+            "failure_rate": 0.5,
+            "slow_call_seconds": 2,
+            "slow_call_rate": 0.75,
+            "open_seconds": 30,
+            "half_open_calls": 2,
+        }
+        options.update(kwargs)
+        return CircuitBreaker(clock=self.clock, **options)
+
+    def test_opens_on_failure_rate(self):
+        """
+        Tests the circuit opens once the failure rate reaches the threshold
+        and then rejects calls
+        """
+        breaker = self.build()
+        for success in (True, False, True):
+            self.assertTrue(breaker.allow())
+            breaker.record(success)
+        # Not enough calls to judge the upstream yet
+        self.assertIs(breaker.state(), CircuitState.CLOSED)
+        breaker.record(False)
+        self.assertIs(breaker.state(), CircuitState.OPEN)
+        self.assertFalse(breaker.allow())
+        stats = breaker.stats()
+        self.assertEqual(stats["state"], "open")
+        self.assertEqual(stats["opened"], 1)
+        self.assertEqual(stats["rejected"], 1)
+
+    def test_opens_on_slow_calls(self):
+        """
+        Tests the circuit opens when most calls succeed but are too slow
+        """
+        breaker = self.build()
+        breaker.record(True, 0.1)
+        for _ in range(3):
+            breaker.record(True, 5)
+        self.assertIs(breaker.state(), CircuitState.OPEN)
+
+    def test_stays_closed(self):
+        """
+        Tests occasional failures and slow calls leave the circuit closed
+        """
+        breaker = self.build()
+        for _ in range(5):
+            breaker.record(True, 0.1)
+        breaker.record(False)
+        breaker.record(True, 5)
+        self.assertIs(breaker.state(), CircuitState.CLOSED)
+        self.assertEqual(breaker.stats()["failureRate"], 0.1429)
+
+    def test_half_open_closes(self):
+        """
+        Tests a limited number of probe calls are let through once the
+        circuit has been open long enough, closing it when they succeed
+        """
+        breaker = self.build()
+        for _ in range(4):
+            breaker.record(False)
+        self.clock.now += 30
+        self.assertIs(breaker.state(), CircuitState.HALF_OPEN)
+        self.assertTrue(breaker.allow())
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record(True, 0.1)
+        self.assertIs(breaker.state(), CircuitState.HALF_OPEN)
+        breaker.record(True, 0.1)
+        self.assertIs(breaker.state(), CircuitState.CLOSED)
+        self.assertTrue(breaker.allow())
+
+    def test_half_open_reopens(self):
+        """
+        Tests a failed or slow probe call opens the circuit again
+        """
+        breaker = self.build()
+        for _ in range(4):
+            breaker.record(False)
+        for duration in (0.1, 5):
+            self.clock.now += 30
+            self.assertTrue(breaker.allow())
+            breaker.record(duration > 1, duration)
+            self.assertIs(breaker.state(), CircuitState.OPEN)
+        self.assertEqual(breaker.stats()["opened"], 3)
+
+    def test_reset(self):
+        """
+        Tests resetting closes the circuit and forgets recorded calls
+        """
+        breaker = self.build()
+        for _ in range(4):
+            breaker.record(False)
+        breaker.reset()
+        self.assertIs(breaker.state(), CircuitState.CLOSED)
+        self.assertEqual(breaker.stats()["calls"], 0)
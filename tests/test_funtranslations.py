@@ -1,19 +1,45 @@
 from http import HTTPStatus
+import time
+import asyncio
+import httpx
+import threading
 import unittest
 
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 from requests.exceptions import ConnectTimeout
 
 from tests import mock_data
+from modules import circuitbreaker, jsoncodec, refresh, retry, singleflight
 from modules.funtranslations import (
+    AsyncFunTranslationsAPIWrapper,
     FunTranslationsAPIWrapper,
+    FunTranslationsBase,
     TranslationLanguage,
+    TranslationMode,
+    parse_latency_budget,
+    parse_translation_mode,
+    rate_limiter,
+    species_translation_language,
+    translation_cache,
+    translation_cache_key,
 )
 
 
 class TestFunTranslationsAPIWrapper(unittest.TestCase):
     def setUp(self):
         self.translate = FunTranslationsAPIWrapper()
+        # Coalesce within this process and never fall back locally, whatever
+        # the environment, such as the Docker image, configures
+        for patcher in (
+            patch.object(singleflight.group, "lock_dir", None),
+            patch.object(FunTranslationsBase, "LOCAL_FALLBACK", False),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        translation_cache.clear()
+        rate_limiter.reset()
+        circuitbreaker.funtranslations.reset()
+        retry.policy.reset()
 
     def test_build_fun_translations_url(self):
         """
@@ -28,14 +54,14 @@ class TestFunTranslationsAPIWrapper(unittest.TestCase):
             url, f"{FunTranslationsAPIWrapper.FUNTRANSLATIONS_URL}/yoda.json"
         )
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_send_fun_translator_get_429(self, mock_get):
         """
         Tests the correct response is given when a 429 is returned
         """
         params = {"text": "hello, world"}
         mock_get.return_value.status_code = 429
-        mock_get.return_value.json.return_value = mock_data.ft_code_429
+        mock_get.return_value.content = jsoncodec.dumps(mock_data.ft_code_429)
         result, status = self.translate._send_fun_translator_get(
             "/shakespeare.json", params=params
         )
@@ -43,7 +69,7 @@ class TestFunTranslationsAPIWrapper(unittest.TestCase):
         self.assertEqual(result["message"], f"Error: {expected_msg}")
         self.assertEqual(status, 429)
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_send_fun_translator_get_exception(self, mock_get):
         """
         Tests the correct response is given when an exception is raised
@@ -59,7 +85,7 @@ class TestFunTranslationsAPIWrapper(unittest.TestCase):
         )
         self.assertEqual(status, 500)
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_send_fun_translator_get_bad_data(self, mock_get):
         """
         Tests the correct response is given when bad data is received from the
@@ -67,7 +93,7 @@ class TestFunTranslationsAPIWrapper(unittest.TestCase):
         """
         params = {"text": "hello, world"}
         mock_get.return_value.status_code = 200
-        mock_get.return_value.json.side_effect = Exception
+        mock_get.return_value.content = b"not json"
         result, status = self.translate._send_fun_translator_get(
             "/shakespeare.json", params=params
         )
@@ -77,14 +103,14 @@ class TestFunTranslationsAPIWrapper(unittest.TestCase):
         )
         self.assertEqual(status, 500)
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_send_fun_translator_get_success(self, mock_get):
         """
         Tests the correct response is given when a good request is made
         """
         params = {"text": "hello, world"}
         mock_get.return_value.status_code = 200
-        mock_get.return_value.json.return_value = (
+        mock_get.return_value.content = jsoncodec.dumps(
             mock_data.ft_translate_hello_world
         )
         result, status = self.translate._send_fun_translator_get(
@@ -93,6 +119,122 @@ class TestFunTranslationsAPIWrapper(unittest.TestCase):
         self.assertEqual(result, mock_data.ft_translate_hello_world)
         self.assertEqual(status, 200)
 
+    @patch("requests.Session.get")
+    def test_send_fun_translator_get_rate_limited(self, mock_get):
+        """
+        Tests requests beyond our rate limit are refused without being sent
+        """
+        params = {"text": "hello, world"}
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.content = jsoncodec.dumps(
+            mock_data.ft_translate_hello_world
+        )
+        with patch.object(rate_limiter, "max_waiting", 0):
+            for _ in range(rate_limiter.burst):
+                result, status = self.translate._send_fun_translator_get(
+                    "/shakespeare.json", params=params
+                )
+                self.assertEqual(status, 200)
+            result, status = self.translate._send_fun_translator_get(
+                "/shakespeare.json", params=params
+            )
+        self.assertEqual(
+            result["message"],
+            "Error: Translation rate limit reached, please try again later",
+        )
+        self.assertEqual(status, 429)
+        self.assertEqual(mock_get.call_count, rate_limiter.burst)
+        self.assertEqual(rate_limiter.stats()["rejected"], 1)
+
+    @patch("requests.Session.get")
+    def test_send_fun_translator_get_deadline(self, mock_get):
+        """
+        Tests requests are bounded by the time left before the deadline and
+        are not sent at all once it has passed
+        """
+        params = {"text": "hello, world"}
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.content = jsoncodec.dumps(
+            mock_data.ft_translate_hello_world
+        )
+        translate = FunTranslationsAPIWrapper(deadline=time.monotonic() + 2)
+        result, status = translate._send_fun_translator_get(
+            "/yoda.json", params=params
+        )
+        self.assertEqual(status, 200)
+        self.assertLessEqual(max(mock_get.call_args[1]["timeout"]), 2)
+
+        translate = FunTranslationsAPIWrapper(deadline=time.monotonic())
+        result, status = translate._send_fun_translator_get(
+            "/shakespeare.json", params=params
+        )
+        self.assertEqual(
+            result["message"],
+            "Error: Latency budget exhausted before translating",
+        )
+        self.assertEqual(status, HTTPStatus.GATEWAY_TIMEOUT)
+        self.assertEqual(mock_get.call_count, 1)
+
+    @patch("requests.Session.get")
+    def test_send_fun_translator_get_coalesced_deadline(self, mock_get):
+        """
+        Tests a request joining an identical one in flight still gives up
+        once its own deadline passes
+        """
+        params = {"text": "hello, world"}
+        release = threading.Event()
+        response = MagicMock(status_code=200)
+        response.content = jsoncodec.dumps(mock_data.ft_translate_hello_world)
+
+        def slow_get(*args, **kwargs):
+            release.wait()
+            return response
+
+        mock_get.side_effect = slow_get
+        results = []
+        leader = threading.Thread(
+            target=lambda: results.append(
+                FunTranslationsAPIWrapper(
+                    deadline=time.monotonic() + 10
+                )._send_fun_translator_get("/yoda.json", params=params)
+            )
+        )
+        leader.start()
+        while singleflight.group.stats()["inFlight"] == 0:
+            time.sleep(0.001)
+        start = time.monotonic()
+        translate = FunTranslationsAPIWrapper(deadline=time.monotonic() + 0.1)
+        result, status = translate._send_fun_translator_get(
+            "/yoda.json", params=params
+        )
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(status, HTTPStatus.GATEWAY_TIMEOUT)
+        release.set()
+        leader.join()
+        self.assertEqual(results[0][1], 200)
+
+    def test_parse_latency_budget(self):
+        """
+        Tests latency budgets are parsed, defaulting to the configured budget
+        """
+        self.assertEqual(
+            parse_latency_budget(None),
+            (
+                {"budget": FunTranslationsAPIWrapper.LATENCY_BUDGET},
+                HTTPStatus.OK,
+            ),
+        )
+        self.assertEqual(
+            parse_latency_budget("0.25"), ({"budget": 0.25}, HTTPStatus.OK)
+        )
+        for budget in ("-1", "soon", "nan", "inf"):
+            result, status = parse_latency_budget(budget)
+            self.assertEqual(
+                result["message"],
+                "Error: X-Latency-Budget must be a positive number of seconds",
+            )
+            self.assertEqual(status, HTTPStatus.BAD_REQUEST)
+
     def test_translate_bad_translation_lang(self):
         """
         Tests a bad request response is given when a incorrect translation
@@ -187,3 +329,321 @@ class TestFunTranslationsAPIWrapper(unittest.TestCase):
         mock_send_get.assert_called_with(
             "/shakespeare.json", {"text": text_2_translate}
         )
+
+    @patch(
+        "modules.funtranslations.FunTranslationsAPIWrapper"
+        "._send_fun_translator_get"
+    )
+    def test_translate_cached(self, mock_send_get):
+        """
+        Tests a repeated translation is served from the cache and that the
+        cache is keyed by language
+        """
+        text_2_translate = "hello, world"
+        mock_send_get.return_value = mock_data.ft_translate_hello_world, 200
+        self.translate.translate_yoda(text_2_translate)
+        result, status = self.translate.translate_yoda(text_2_translate)
+        mock_send_get.assert_called_once()
+        expected_trans = mock_data.ft_translate_hello_world["contents"][
+            "translated"
+        ]
+        self.assertEqual(result["translation"], expected_trans)
+        self.assertEqual(status, 200)
+        self.translate.translate_shakespeare(text_2_translate)
+        self.assertEqual(mock_send_get.call_count, 2)
+
+    @patch(
+        "modules.funtranslations.FunTranslationsAPIWrapper"
+        "._send_fun_translator_get"
+    )
+    def test_translate_failure_not_cached(self, mock_send_get):
+        """
+        Tests a failed translation is not cached
+        """
+        text_2_translate = "hello, world"
+        mock_send_get.return_value = {"message": "Error: It broke!"}, 500
+        self.translate.translate_yoda(text_2_translate)
+        self.translate.translate_yoda(text_2_translate)
+        self.assertEqual(mock_send_get.call_count, 2)
+
+    def test_translation_cache_key(self):
+        """
+        Tests translation cache keys depend on the language and text
+        """
+        yoda = translation_cache_key("hello", TranslationLanguage.YODA)
+        self.assertEqual(yoda[:2], ("translation", "YODA"))
+        self.assertEqual(
+            yoda, translation_cache_key("hello", TranslationLanguage.YODA)
+        )
+        self.assertNotEqual(
+            yoda,
+            translation_cache_key("hello", TranslationLanguage.SHAKESPEARE),
+        )
+        self.assertNotEqual(
+            yoda, translation_cache_key("goodbye", TranslationLanguage.YODA)
+        )
+
+    @patch(
+        "modules.funtranslations.FunTranslationsAPIWrapper"
+        "._send_fun_translator_get"
+    )
+    def test_translate_stale(self, mock_send_get):
+        """
+        Tests a stale translation is returned immediately and refreshed in the
+        background
+        """
+        text_2_translate = "hello, world"
+        cache_key = translation_cache_key(
+            text_2_translate, TranslationLanguage.YODA
+        )
+        translation_cache.set(cache_key, "Old translation", ttl=-1)
+        mock_send_get.return_value = mock_data.ft_translate_hello_world, 200
+        result, status = self.translate.translate_yoda(text_2_translate)
+        refresh.refresher.wait(5)
+        self.assertEqual(result["translation"], "Old translation")
+        self.assertEqual(status, 200)
+        mock_send_get.assert_called_once_with(
+            "/yoda.json", {"text": text_2_translate}
+        )
+        result, status = self.translate.translate_yoda(text_2_translate)
+        expected_trans = mock_data.ft_translate_hello_world["contents"][
+            "translated"
+        ]
+        self.assertEqual(result["translation"], expected_trans)
+
+    @patch(
+        "modules.funtranslations.FunTranslationsAPIWrapper"
+        "._send_fun_translator_get"
+    )
+    def test_translate_local_fallback(self, mock_send_get):
+        """
+        Tests refused and failed translations fall back to the local engine
+        when enabled, without caching the local translation
+        """
+        text_2_translate = "It is very strong."
+        with patch.object(FunTranslationsBase, "LOCAL_FALLBACK", True):
+            for status_code in (429, 500):
+                mock_send_get.return_value = {"message": "Error"}, status_code
+                result, status = self.translate.translate_shakespeare(
+                    text_2_translate
+                )
+                self.assertEqual(result["translation"], "'Tis most mighty.")
+                self.assertEqual(status, 200)
+            mock_send_get.return_value = {"message": "Error"}, 404
+            result, status = self.translate.translate_shakespeare(
+                text_2_translate
+            )
+            self.assertEqual(result, {"message": "Error"})
+            self.assertEqual(status, 404)
+        self.assertEqual(mock_send_get.call_count, 3)
+
+    @patch(
+        "modules.funtranslations.FunTranslationsAPIWrapper"
+        "._send_fun_translator_get"
+    )
+    def test_translate_local_fallback_deadline(self, mock_send_get):
+        """
+        Tests a translation failing once the deadline has passed is given as
+        the budget running out rather than translated locally, even with the
+        local fallback enabled
+        """
+        mock_send_get.return_value = {"message": "Error"}, 500
+        translate = FunTranslationsAPIWrapper(deadline=time.monotonic())
+        with patch.object(FunTranslationsBase, "LOCAL_FALLBACK", True):
+            result, status = translate.translate_shakespeare("It is strong.")
+        self.assertEqual(
+            result["message"],
+            "Error: Latency budget exhausted before translating",
+        )
+        self.assertEqual(status, HTTPStatus.GATEWAY_TIMEOUT)
+
+    @patch("requests.Session.get")
+    def test_translate_circuit_open(self, mock_get):
+        """
+        Tests translations fail fast while the circuit is open, falling back
+        to the local engine when enabled
+        """
+        for _ in range(circuitbreaker.funtranslations.min_calls):
+            circuitbreaker.funtranslations.record(False)
+        result, status = self.translate.translate_shakespeare("It is strong.")
+        self.assertEqual(
+            result["message"],
+            "Error: Translation service is unavailable, please try again "
+            "later",
+        )
+        self.assertEqual(status, 503)
+        with patch.object(FunTranslationsBase, "LOCAL_FALLBACK", True):
+            result, status = self.translate.translate_shakespeare(
+                "It is strong."
+            )
+        self.assertEqual(result["translation"], "'Tis mighty.")
+        self.assertEqual(status, 200)
+        mock_get.assert_not_called()
+
+    @patch(
+        "modules.funtranslations.FunTranslationsAPIWrapper"
+        "._send_fun_translator_get"
+    )
+    def test_translate_local(self, mock_send_get):
+        """
+        Tests local translations never touch the network
+        """
+        result, status = self.translate.translate_local(
+            "It was created by a scientist.", TranslationLanguage.YODA
+        )
+        self.assertEqual(
+            result["translation"], "Created by a scientist, it was."
+        )
+        self.assertEqual(status, 200)
+        result, status = self.translate.translate_local("hello", "WRONG")
+        self.assertEqual(status, HTTPStatus.BAD_REQUEST)
+        mock_send_get.assert_not_called()
+
+    def test_parse_translation_mode(self):
+        """
+        Tests translation modes are parsed, defaulting to remote
+        """
+        self.assertEqual(
+            parse_translation_mode(None),
+            ({"mode": TranslationMode.REMOTE}, HTTPStatus.OK),
+        )
+        self.assertEqual(
+            parse_translation_mode("local"),
+            ({"mode": TranslationMode.LOCAL}, HTTPStatus.OK),
+        )
+        result, status = parse_translation_mode("telepathy")
+        self.assertEqual(
+            result["message"],
+            "Error: Unknown translation mode, expected one of remote, local",
+        )
+        self.assertEqual(status, HTTPStatus.BAD_REQUEST)
+
+    def test_species_translation_language(self):
+        """
+        Tests cave dwelling and legendary Pokemon are translated to Yoda and
+        every other Pokemon to Shakespeare
+        """
+        cases = [
+            ({"habitat": "Cave", "isLegendary": False}, "YODA"),
+            ({"habitat": "rare", "isLegendary": True}, "YODA"),
+            ({"habitat": "rare", "isLegendary": False}, "SHAKESPEARE"),
+        ]
+        for species, language in cases:
+            self.assertEqual(
+                species_translation_language(species),
+                TranslationLanguage[language],
+            )
+
+
+class TestAsyncFunTranslationsAPIWrapper(unittest.TestCase):
+    def setUp(self):
+        self.translate = AsyncFunTranslationsAPIWrapper()
+        self.loop = asyncio.new_event_loop()
+        translation_cache.clear()
+        singleflight.async_group.reset()
+        rate_limiter.reset()
+        circuitbreaker.funtranslations.reset()
+        retry.policy.reset()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_send_fun_translator_get_429(self):
+        """
+        Tests the correct response is given when a non-blocking request is
+        rate limited
+        """
+        response = MagicMock(status_code=429)
+        response.content = jsoncodec.dumps(mock_data.ft_code_429)
+
+        async def fake_get(pool, url, **kwargs):
+            return response
+
+        with patch("modules.sessions.AsyncSessionPool.get", new=fake_get):
+            result, status = self.loop.run_until_complete(
+                self.translate._send_fun_translator_get(
+                    "/yoda.json", {"text": "hello, world"}
+                )
+            )
+        expected_msg = mock_data.ft_code_429["error"]["message"]
+        self.assertEqual(result["message"], f"Error: {expected_msg}")
+        self.assertEqual(status, 429)
+
+    def test_send_fun_translator_get_exception(self):
+        """
+        Tests the correct response is given when a non-blocking request fails
+        """
+
+        async def fake_get(pool, url, **kwargs):
+            raise httpx.ConnectTimeout("timed out")
+
+        with patch("modules.sessions.AsyncSessionPool.get", new=fake_get):
+            result, status = self.loop.run_until_complete(
+                self.translate._send_fun_translator_get(
+                    "/yoda.json", {"text": "hello, world"}
+                )
+            )
+        self.assertEqual(
+            result["message"],
+            "Error: Failed to retrieve data, please try again later",
+        )
+        self.assertEqual(status, 500)
+
+    def test_send_fun_translator_get_retry(self):
+        """
+        Tests transient non-blocking failures are retried after a backoff
+        """
+        calls = []
+
+        async def fake_get(pool, url, **kwargs):
+            calls.append(url)
+            if len(calls) == 1:
+                raise httpx.ConnectTimeout("timed out")
+            response = MagicMock(status_code=200)
+            response.content = jsoncodec.dumps(
+                mock_data.ft_translate_hello_world
+            )
+            return response
+
+        with patch("modules.sessions.AsyncSessionPool.get", new=fake_get):
+            result, status = self.loop.run_until_complete(
+                self.translate._send_fun_translator_get(
+                    "/yoda.json", {"text": "hello, world"}
+                )
+            )
+        self.assertEqual(status, 200)
+        self.assertEqual(len(calls), 2)
+        stats = retry.policy.stats()["funtranslations"]
+        self.assertEqual(stats["retries"], 1)
+        self.assertEqual(len(stats["attempts"]), 2)
+
+    def test_translate_shakespeare(self):
+        """
+        Tests translating without blocking returns a good response and caches
+        it
+        """
+        calls = []
+
+        async def fake_send(wrapper, path, params={}):
+            calls.append((path, params))
+            return mock_data.ft_translate_hello_world, 200
+
+        with patch(
+            "modules.funtranslations.AsyncFunTranslationsAPIWrapper"
+            "._send_fun_translator_get",
+            new=fake_send,
+        ):
+            for _ in range(2):
+                result, status = self.loop.run_until_complete(
+                    self.translate.translate_shakespeare("hello, world")
+                )
+                self.assertEqual(
+                    result["translation"],
+                    mock_data.ft_translate_hello_world["contents"][
+                        "translated"
+                    ],
+                )
+                self.assertEqual(status, 200)
+        self.assertEqual(
+            calls, [("/shakespeare.json", {"text": "hello, world"})]
+        )
@@ -0,0 +1,184 @@
+import time
+import asyncio
+import threading
+import unittest
+
+from modules.hedging import Hedger
+from modules.timeouts import LatencyTracker
+
+POKEAPI_URL = "https://pokeapi.co/api/v2/pokemon-species/1"
+
+
+class SlowFirstSender:
+    def __init__(self, first_delay, fail_first=False):
+        """
+        Initialise the sender
+        :param first_delay: Number of seconds the first request takes
+        :param fail_first: Boolean whether the first request fails
+        """
+        self.first_delay = first_delay
+        self.fail_first = fail_first
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _next_call(self):
+        """
+        Counts a request
+        :return: Integer number of the request, starting at 1
+        """
+        with self._lock:
+            self.calls += 1
+            return self.calls
+
+    def __call__(self):
+        """
+        Sends a fake request, the first one is slow
+        :return: String name of the request that answered
+        """
+        call = self._next_call()
+        if call == 1:
+            time.sleep(self.first_delay)
+            if self.fail_first:
+                raise ConnectionError("reset")
+            return "first"
+        return "hedge"
+
+    async def async_send(self):
+        """
+        Sends a fake request without blocking the event loop, the first one
+        is slow
+        :return: String name of the request that answered
+        """
+        call = self._next_call()
+        if call == 1:
+            await asyncio.sleep(self.first_delay)
+            return "first"
+        return "hedge"
+
+
+class TestHedger(unittest.TestCase):
+    def setUp(self):
+        self.tracker = LatencyTracker(window=100)
+        for _ in range(10):
+            self.tracker.observe(POKEAPI_URL, 0.01)
+
+    def build(self, **kwargs):
+        """
+        Builds an enabled hedger using the test tracker
+        :return: Hedger
+        """
+        options = {"enabled": True, "min_samples": 10, "max_workers": 4}
+        options.update(kwargs)
+        return Hedger(self.tracker, **options)
+
+    def test_hedge_delay(self):
+        """
+        Tests requests are only hedged when enabled and once enough samples
+        were recorded
+        """
+        self.assertEqual(self.build().hedge_delay(POKEAPI_URL), 0.01)
+        self.assertIsNone(self.build(enabled=False).hedge_delay(POKEAPI_URL))
+        self.assertIsNone(self.build(min_samples=11).hedge_delay(POKEAPI_URL))
+
+    def test_get_not_hedged(self):
+        """
+        Tests requests answered within the percentile are not hedged
+        """
+        hedger = self.build()
+        self.assertEqual(hedger.get(POKEAPI_URL, lambda: "first"), "first")
+        self.assertEqual(
+            hedger.stats(),
+            {"requests": 1, "hedged": 0, "hedgeWins": 0, "budget": 5},
+        )
+
+    def test_get_hedge_wins(self):
+        """
+        Tests a hedge is sent once the first request is slower than the
+        percentile and the first answer wins
+        """
+        hedger = self.build()
+        sender = SlowFirstSender(0.5)
+        self.assertEqual(hedger.get(POKEAPI_URL, sender), "hedge")
+        self.assertEqual(sender.calls, 2)
+        stats = hedger.stats()
+        self.assertEqual(stats["hedged"], 1)
+        self.assertEqual(stats["hedgeWins"], 1)
+
+    def test_get_failed_request_loses(self):
+        """
+        Tests a failed request never beats one that is still running
+        """
+        hedger = self.build()
+        sender = SlowFirstSender(0.05, fail_first=True)
+        self.assertEqual(hedger.get(POKEAPI_URL, sender), "hedge")
+
+    def test_get_budget(self):
+        """
+        Tests no more hedges are sent than the budget allows
+        """
+        hedger = self.build(max_ratio=0, reserve=1)
+        self.assertEqual(
+            hedger.get(POKEAPI_URL, SlowFirstSender(0.1)), "hedge"
+        )
+        sender = SlowFirstSender(0.1)
+        self.assertEqual(hedger.get(POKEAPI_URL, sender), "first")
+        self.assertEqual(sender.calls, 1)
+        self.assertEqual(hedger.stats()["hedged"], 1)
+
+    def test_async_get_hedge_wins(self):
+        """
+        Tests hedging without blocking the event loop
+        """
+        hedger = self.build()
+        sender = SlowFirstSender(0.5)
+        loop = asyncio.new_event_loop()
+        try:
+            result = loop.run_until_complete(
+                hedger.async_get(POKEAPI_URL, sender.async_send)
+            )
+        finally:
+            loop.close()
+        self.assertEqual(result, "hedge")
+        self.assertEqual(hedger.stats()["hedgeWins"], 1)
+
+    def test_async_get_closes_finished_loser(self):
+        """
+        Tests a losing request that finished along with the winner has its
+        response closed
+        """
+
+        class Response:
+            def __init__(self):
+                self.closed = False
+
+            async def aclose(self):
+                self.closed = True
+
+        hedger = self.build()
+        responses = []
+
+        async def race():
+            # The hedge lets the first request finish in the same step
+            gate = asyncio.Event()
+
+            async def send():
+                response = Response()
+                responses.append(response)
+                if len(responses) == 1:
+                    await gate.wait()
+                else:
+                    gate.set()
+                return response
+
+            return await hedger.async_get(POKEAPI_URL, send)
+
+        loop = asyncio.new_event_loop()
+        try:
+            winner = loop.run_until_complete(race())
+        finally:
+            loop.close()
+        self.assertEqual(len(responses), 2)
+        self.assertEqual(
+            [response.closed for response in responses],
+            [response is not winner for response in responses],
+        )
@@ -0,0 +1,195 @@
+import os
+import json
+import time
+import tempfile
+import threading
+import unittest
+
+from unittest.mock import patch
+
+from modules import batch, hedging, hotkeys, refresh
+from modules.hotkeys import SPECIES, TRANSLATED, HotKeyTracker
+
+
+class TestHotKeyTracker(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "hotkeys.json")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_hot_keys_in_memory(self):
+        """
+        Tests the hottest keys come first, with names normalised
+        """
+        tracker = HotKeyTracker()
+        for name in ("pikachu", "MewTwo", "mewtwo", "eevee", "mewtwo"):
+            tracker.record(SPECIES, name)
+        tracker.record(TRANSLATED, "pikachu")
+        self.assertEqual(
+            tracker.hot_keys(1), {SPECIES: ["mewtwo"], TRANSLATED: ["pikachu"]}
+        )
+        self.assertEqual(tracker.hot_keys()[SPECIES][0], "mewtwo")
+        self.assertEqual(len(tracker.hot_keys()[SPECIES]), 3)
+
+    def test_saved_every_few_lookups(self):
+        """
+        Tests recorded lookups are merged into the file every few lookups and
+        seen by a new tracker
+        """
+        tracker = HotKeyTracker(self.path, save_every=3)
+        tracker.record(SPECIES, "mewtwo")
+        tracker.record(SPECIES, "mewtwo")
+        self.assertFalse(os.path.exists(self.path))
+        tracker.record(TRANSLATED, "pikachu")
+        self.assertEqual(tracker.stats()["saved"], 1)
+        self.assertEqual(tracker.stats()["pending"], 0)
+        self.assertEqual(
+            HotKeyTracker(self.path).hot_keys(),
+            {SPECIES: ["mewtwo"], TRANSLATED: ["pikachu"]},
+        )
+
+    def test_workers_merge_and_decay(self):
+        """
+        Tests every worker adds to the persisted counts, older counts decay
+        and only the hottest keys are kept
+        """
+        first = HotKeyTracker(self.path, max_keys=2, decay=0.5)
+        second = HotKeyTracker(self.path, max_keys=2, decay=0.5)
+        for _ in range(4):
+            first.record(SPECIES, "mewtwo")
+        first.save()
+        second.record(SPECIES, "pikachu")
+        second.record(SPECIES, "pikachu")
+        second.record(SPECIES, "pikachu")
+        second.record(SPECIES, "eevee")
+        second.save()
+        with open(self.path) as hot_file:
+            data = json.load(hot_file)
+        self.assertEqual(data[SPECIES], {"pikachu": 3, "mewtwo": 2})
+
+        # Saving with nothing recorded never decays the counts
+        second.save()
+        with open(self.path) as hot_file:
+            self.assertEqual(json.load(hot_file), data)
+
+    def test_corrupt_file_ignored(self):
+        """
+        Tests a corrupt file is treated as an empty hot set
+        """
+        with open(self.path, "w") as hot_file:
+            hot_file.write("not json")
+        tracker = HotKeyTracker(self.path)
+        self.assertEqual(tracker.hot_keys(), {SPECIES: [], TRANSLATED: []})
+        tracker.record(SPECIES, "mewtwo")
+        tracker.save()
+        self.assertEqual(
+            HotKeyTracker(self.path).hot_keys()[SPECIES], ["mewtwo"]
+        )
+
+    def test_pending_bounded(self):
+        """
+        Tests the lookups recorded between merges never grow without bound
+        """
+        tracker = HotKeyTracker(max_keys=2, save_every=1000)
+        for _ in range(3):
+            tracker.record(SPECIES, "mewtwo")
+        for number in range(10):
+            tracker.record(SPECIES, f"pokemon-{number}")
+        self.assertLessEqual(tracker.stats()["pending"], 4)
+        self.assertEqual(tracker.hot_keys(1)[SPECIES], ["mewtwo"])
+
+
+class TestWarm(unittest.TestCase):
+    @patch("modules.hotkeys.warm_translated", return_value=True)
+    @patch("modules.hotkeys.warm_species")
+    def test_warm(self, mock_species, mock_translated):
+        """
+        Tests the hottest keys of each kind are loaded through the wrappers
+        """
+        mock_species.side_effect = lambda name: name != "missingno"
+        tracker = HotKeyTracker()
+        for name in ("mewtwo", "mewtwo", "pikachu", "missingno"):
+            tracker.record(SPECIES, name)
+        tracker.record(TRANSLATED, "eevee")
+        result = hotkeys.warm(tracker, limit=2, concurrency=2)
+        self.assertEqual(result, {SPECIES: 2, TRANSLATED: 1})
+        self.assertEqual(
+            sorted(call[0][0] for call in mock_species.call_args_list),
+            ["mewtwo", "pikachu"],
+        )
+        self.assertEqual(mock_translated.call_args[0][0], "eevee")
+        self.assertEqual(tracker.stats()["warmed"], 3)
+
+    @patch("modules.hotkeys.warm_species")
+    def test_warm_leaves_no_threads(self, mock_species):
+        """
+        Tests refreshes started while warming are done, and their threads
+        stopped, before the warm-up returns
+        """
+        refreshed = threading.Event()
+
+        def load(name):
+            refresh.refresher.submit(
+                ("warm", name), lambda: time.sleep(0.05) or refreshed.set()
+            )
+            return True
+
+        mock_species.side_effect = load
+        tracker = HotKeyTracker()
+        tracker.record(SPECIES, "mewtwo")
+        hotkeys.warm(tracker)
+        self.assertTrue(refreshed.is_set())
+        self.assertIsNone(refresh.refresher._threads._executor)
+        self.assertIsNone(hedging.hedger._threads._executor)
+        self.assertIsNone(batch.executor._threads._executor)
+
+    @patch("modules.hotkeys.warm_species")
+    def test_warm_stops_at_deadline(self, mock_species):
+        """
+        Tests keys left once the warm-up runs out of time are skipped
+        """
+        mock_species.side_effect = lambda name: time.sleep(0.05) or True
+        tracker = HotKeyTracker()
+        for number in range(4):
+            tracker.record(SPECIES, f"pokemon-{number}")
+        result = hotkeys.warm(tracker, seconds=0.01, concurrency=1)
+        self.assertEqual(result[SPECIES], 1)
+
+    @patch(
+        "modules.funtranslations.FunTranslationsAPIWrapper.translate_yoda",
+        return_value=({"translation": "Created, it was."}, 200),
+    )
+    @patch("modules.pokeapi.PokeAPIWrapper.get_pokemon_species_by_name")
+    def test_warm_translated(self, mock_get_pokemon, mock_yoda):
+        """
+        Tests a translated key loads the species and its translation
+        """
+        mock_get_pokemon.return_value = (
+            {
+                "name": "mewtwo",
+                "habitat": "rare",
+                "isLegendary": True,
+                "description": "It was created.",
+            },
+            200,
+        )
+        self.assertTrue(hotkeys.warm_translated("mewtwo"))
+        mock_yoda.assert_called_once_with("It was created.")
+        mock_get_pokemon.return_value = ({"message": "Error"}, 404)
+        self.assertFalse(hotkeys.warm_translated("missingno"))
+
+    @patch("modules.hotkeys.warm")
+    def test_warm_on_start(self, mock_warm):
+        """
+        Tests the warm-up on start only runs when enabled
+        """
+        with patch.object(hotkeys, "WARM_ON_START", False):
+            self.assertIsNone(hotkeys.warm_on_start())
+        mock_warm.assert_not_called()
+        with patch.object(hotkeys, "WARM_ON_START", True):
+            with patch("gc.freeze", create=True) as mock_freeze:
+                hotkeys.warm_on_start()
+        mock_warm.assert_called_once()
+        mock_freeze.assert_called_once_with()
@@ -0,0 +1,69 @@
+import unittest
+
+from modules import httpcache
+from modules.responsecache import EncodedResponse
+
+
+class TestHttpCache(unittest.TestCase):
+    def test_cache_control(self):
+        """
+        Tests the Cache-Control header of a route is built from its max age
+        and stale-while-revalidate period
+        """
+        self.assertEqual(
+            httpcache.cache_control(60, 600),
+            "public, max-age=60, stale-while-revalidate=600",
+        )
+        self.assertEqual(httpcache.cache_control(60), "public, max-age=60")
+        self.assertEqual(httpcache.cache_control(0, 600), "no-cache")
+
+    def test_etag_matches(self):
+        """
+        Tests If-None-Match lists, wildcards and weak validators are matched
+        """
+        etag = '"abc"'
+        self.assertTrue(httpcache.etag_matches('"abc"', etag))
+        self.assertTrue(httpcache.etag_matches('"xyz", W/"abc"', etag))
+        self.assertTrue(httpcache.etag_matches(" * ", etag))
+        self.assertFalse(httpcache.etag_matches('"xyz"', etag))
+        self.assertFalse(httpcache.etag_matches("abc", etag))
+        self.assertFalse(httpcache.etag_matches("", etag))
+        self.assertFalse(httpcache.etag_matches(None, etag))
+
+    def test_prepare(self):
+        """
+        Tests a response is sent in full with its validator and caching
+        headers, or without a body when the client already holds it
+        """
+        encoded = EncodedResponse(b'{"name":"mewtwo"}\n', ())
+        prepared = httpcache.prepare(encoded, None, "public, max-age=60")
+        self.assertEqual(prepared.status, 200)
+        self.assertEqual(prepared.body, encoded.body)
+        self.assertEqual(
+            dict(prepared.headers),
+            {
+                "ETag": encoded.etag,
+                "Cache-Control": "public, max-age=60",
+                "Content-Type": "application/json",
+                "Content-Length": str(len(encoded.body)),
+            },
+        )
+
+        prepared = httpcache.prepare(
+            encoded, encoded.etag, "public, max-age=60"
+        )
+        self.assertEqual(prepared.status, 304)
+        self.assertEqual(prepared.body, b"")
+        self.assertEqual(
+            dict(prepared.headers),
+            {"ETag": encoded.etag, "Cache-Control": "public, max-age=60"},
+        )
+
+    def test_prepare_uncached(self):
+        """
+        Tests a response that is not tied to cached entries, such as a
+        fallback translation, must be revalidated
+        """
+        encoded = EncodedResponse(b'{"name":"mewtwo"}\n', None)
+        prepared = httpcache.prepare(encoded, None, "public, max-age=60")
+        self.assertEqual(dict(prepared.headers)["Cache-Control"], "no-cache")
@@ -0,0 +1,63 @@
+import json
+import unittest
+
+from unittest.mock import patch
+
+from tests import mock_data
+from modules import jsoncodec
+from modules.jsoncodec import OrjsonCodec, StdlibCodec, build_codec
+
+
+class TestJSONCodec(unittest.TestCase):
+    def test_codecs_round_trip(self):
+        """
+        Tests every installed codec decodes and encodes to the same data
+        """
+        codecs = [StdlibCodec()]
+        if jsoncodec.orjson is not None:
+            codecs.append(OrjsonCodec())
+        document = json.dumps(mock_data.get_mewtwo).encode("utf-8")
+        for codec in codecs:
+            value = codec.loads(document)
+            self.assertEqual(value, mock_data.get_mewtwo)
+            encoded = codec.dumps(value)
+            self.assertIsInstance(encoded, bytes)
+            self.assertEqual(json.loads(encoded), mock_data.get_mewtwo)
+
+    def test_codecs_encode_unicode(self):
+        """
+        Tests non ASCII text and integer keys are encoded the same way by
+        every installed codec
+        """
+        codecs = [StdlibCodec()]
+        if jsoncodec.orjson is not None:
+            codecs.append(OrjsonCodec())
+        for codec in codecs:
+            self.assertEqual(
+                codec.dumps({"name": "Flabébé", 1: None}),
+                '{"name":"Flabébé","1":null}'.encode("utf-8"),
+            )
+
+    def test_build_codec(self):
+        """
+        Tests the codec is picked by name, auto preferring orjson
+        """
+        self.assertIsInstance(build_codec("json"), StdlibCodec)
+        with patch.object(jsoncodec, "orjson", None):
+            self.assertIsInstance(build_codec("auto"), StdlibCodec)
+            with self.assertRaises(RuntimeError):
+                build_codec("orjson")
+        if jsoncodec.orjson is not None:
+            self.assertIsInstance(build_codec("auto"), OrjsonCodec)
+        with self.assertRaises(RuntimeError):
+            build_codec("yaml")
+
+    def test_benchmark(self):
+        """
+        Tests the benchmark times every installed codec
+        """
+        result = jsoncodec.benchmark(b'{"name": "mewtwo"}', number=1)
+        self.assertIn("json", result)
+        self.assertEqual(set(result["json"].keys()), {"decodeMs", "encodeMs"})
+        if jsoncodec.orjson is not None:
+            self.assertIn("orjson", result)
@@ -0,0 +1,69 @@
+import time
+import unittest
+
+from modules.localtranslations import (
+    translate_shakespeare,
+    translate_yoda,
+)
+
+
+class TestLocalTranslations(unittest.TestCase):
+    def test_translate_shakespeare(self):
+        """
+        Tests words and phrases are swapped for their Shakespearean
+        equivalent, keeping their capitalisation
+        """
+        self.assertEqual(
+            translate_shakespeare("Hello, are you my friend?"),
+            "Good morrow, art thou my sirrah?",
+        )
+        self.assertEqual(
+            translate_shakespeare("It is VERY strong, YOU are often right."),
+            "'Tis MOST mighty, Thou art oft right.",
+        )
+
+    def test_translate_shakespeare_whole_words(self):
+        """
+        Tests only whole words are swapped
+        """
+        self.assertEqual(
+            translate_shakespeare("Nobody knows this hideout."),
+            "Nobody knows this hideout.",
+        )
+
+    def test_translate_yoda(self):
+        """
+        Tests each sentence is reordered around its first verb
+        """
+        self.assertEqual(
+            translate_yoda(
+                "It was created by a scientist. PIKACHU can generate "
+                "electricity!"
+            ),
+            "Created by a scientist, it was. Generate electricity, PIKACHU "
+            "can!",
+        )
+
+    def test_translate_yoda_unchanged(self):
+        """
+        Tests sentences without a verb to reorder around are left as they are
+        """
+        self.assertEqual(
+            translate_yoda("Hello, how are you? Lives in caves."),
+            "Hello, how are you? Lives in caves.",
+        )
+
+    def test_translate_speed(self):
+        """
+        Tests a typical description is translated in well under a millisecond
+        """
+        description = (
+            "When several of these POKéMON gather, their electricity could "
+            "build and cause lightning storms. It is said to be very strong."
+        )
+        start = time.perf_counter()
+        for _ in range(1000):
+            translate_yoda(description)
+            translate_shakespeare(description)
+        average = (time.perf_counter() - start) / 2000
+        self.assertLess(average, 0.001)
@@ -0,0 +1,35 @@
+import unittest
+
+from modules.metrics import MetricsRegistry
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_increment(self):
+        """
+        Tests counters are incremented and reported
+        """
+        self.registry.increment("hits")
+        self.registry.increment("hits", 2)
+        self.assertEqual(self.registry.get("hits"), 3)
+        self.assertEqual(self.registry.get("misses"), 0)
+
+    def test_snapshot_includes_sources(self):
+        """
+        Tests registered sources are included in the snapshot
+        """
+        self.registry.increment("hits")
+        self.registry.register_source("pool", lambda: {"size": 4})
+        snapshot = self.registry.snapshot()
+        self.assertEqual(snapshot["counters"], {"hits": 1})
+        self.assertEqual(snapshot["pool"], {"size": 4})
+
+    def test_reset(self):
+        """
+        Tests resetting clears every counter
+        """
+        self.registry.increment("hits")
+        self.registry.reset()
+        self.assertEqual(self.registry.snapshot()["counters"], {})
@@ -0,0 +1,80 @@
+import os
+import time
+import asyncio
+import threading
+import unittest
+
+from unittest.mock import patch
+
+from modules.offload import ForkSafeExecutor, Offloader
+
+
+class TestOffloader(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.offloader = Offloader(max_workers=2)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_run_blocking(self):
+        """
+        Tests blocking calls run on a thread of the offloader
+        """
+        thread = self.loop.run_until_complete(
+            self.offloader.run(True, threading.get_ident)
+        )
+        self.assertNotEqual(thread, threading.get_ident())
+        self.assertEqual(self.offloader.stats()["offloaded"], 1)
+
+    def test_run_inline(self):
+        """
+        Tests calls that only touch memory run on the event loop thread
+        """
+        result = self.loop.run_until_complete(
+            self.offloader.run(False, lambda a, b: (a, b), 1, 2)
+        )
+        self.assertEqual(result, (1, 2))
+        thread = self.loop.run_until_complete(
+            self.offloader.run(False, threading.get_ident)
+        )
+        self.assertEqual(thread, threading.get_ident())
+        self.assertEqual(self.offloader.stats()["inline"], 2)
+
+    def test_reset(self):
+        """
+        Tests resetting clears the counters
+        """
+        self.loop.run_until_complete(self.offloader.run(False, int))
+        self.offloader.reset()
+        self.assertEqual(self.offloader.stats(), {"offloaded": 0, "inline": 0})
+
+
+class TestForkSafeExecutor(unittest.TestCase):
+    def test_rebuilt_after_fork(self):
+        """
+        Tests the threads are started on first use and a forked process does
+        not reuse the parent's threads
+        """
+        started = []
+        threads = ForkSafeExecutor(2, on_start=lambda: started.append(1))
+        self.assertEqual(started, [])
+        executor = threads.get()
+        self.assertIs(threads.get(), executor)
+        with patch("os.getpid", return_value=os.getpid() + 1):
+            self.assertIsNot(threads.get(), executor)
+        self.assertEqual(started, [1, 1])
+        threads.shutdown()
+
+    def test_shutdown(self):
+        """
+        Tests shutting down waits for every call and stops the threads, a
+        later call starts new ones
+        """
+        threads = ForkSafeExecutor(2)
+        calls = []
+        threads.get().submit(lambda: time.sleep(0.05) or calls.append(1))
+        threads.shutdown()
+        self.assertEqual(calls, [1])
+        self.assertEqual(threads.get().submit(lambda: 2).result(), 2)
+        threads.shutdown()
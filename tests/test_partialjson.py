@@ -0,0 +1,93 @@
+import json
+import unittest
+
+from tests import mock_data
+from modules.partialjson import TopLevelScanner
+
+
+def scan(document, key, chunk_size):
+    """
+    Feeds a JSON document to a scanner in chunks
+    :param document: Bytes of the JSON document
+    :param key: String top level key to find
+    :param chunk_size: Integer number of bytes fed at a time
+    :return: Tuple of the scanner and the Integer number of bytes fed
+    """
+    scanner = TopLevelScanner(key)
+    fed = 0
+    for start in range(0, len(document), chunk_size):
+        end = start + chunk_size
+        chunk = document[start:end]
+        fed += len(chunk)
+        if scanner.feed(chunk):
+            break
+    return scanner, fed
+
+
+class TestTopLevelScanner(unittest.TestCase):
+    def test_pokemon_species(self):
+        """
+        Tests the species of a /pokemon/ response is found whatever the
+        chunk size, without reading past it
+        """
+        document = json.dumps(mock_data.get_mewtwo).encode("utf-8")
+        for chunk_size in (61, 4096, len(document)):
+            scanner, fed = scan(document, "species", chunk_size)
+            self.assertTrue(scanner.found)
+            self.assertEqual(scanner.value, mock_data.get_mewtwo["species"])
+        scanner, fed = scan(document, "species", 4096)
+        self.assertLess(fed, len(document))
+
+    def test_nested_and_string_keys(self):
+        """
+        Tests keys nested deeper, inside strings or used as values are
+        skipped
+        """
+        document = {
+            "abilities": [{"species": "nested"}],
+            "name": "species",
+            "text": 'a "species": {"url": "fake"} [{',
+            "escaped\\": "\\\\",
+            "species": {"url": "real"},
+        }
+        for indent in (None, 2):
+            encoded = json.dumps(document, indent=indent).encode("utf-8")
+            for chunk_size in (1, 3, 1000):
+                scanner, _ = scan(encoded, "species", chunk_size)
+                self.assertEqual(scanner.value, {"url": "real"})
+
+    def test_missing(self):
+        """
+        Tests a document without the key at the top level is not matched
+        """
+        scanner, _ = scan(b'{"a": {"species": 1}, "b": [2]}', "species", 5)
+        self.assertFalse(scanner.found)
+        self.assertIsNone(scanner.value)
+
+    def test_number_split_across_chunks(self):
+        """
+        Tests a number is only taken once it is whole, whichever chunk
+        boundary splits it
+        """
+        for document in (
+            b'{"species": 2.5}',
+            b'{"species": 12, "a": 1}',
+            b'{"species": -3e10 }',
+        ):
+            expected = json.loads(document)["species"]
+            for split in range(1, len(document)):
+                scanner = TopLevelScanner("species")
+                scanner.feed(document[:split])
+                scanner.feed(document[split:])
+                self.assertEqual(scanner.value, expected, (document, split))
+
+    def test_number_at_end_of_stream(self):
+        """
+        Tests a number running up to the end of a truncated document is
+        taken once the stream has ended
+        """
+        scanner = TopLevelScanner("species")
+        self.assertFalse(scanner.feed(b'{"species": 25'))
+        self.assertFalse(scanner.found)
+        self.assertTrue(scanner.close())
+        self.assertEqual(scanner.value, 25)
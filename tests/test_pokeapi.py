@@ -1,15 +1,46 @@
+import json
+import time
+import asyncio
+import httpx
+import threading
 import unittest
 
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 from requests.exceptions import ConnectTimeout
 
 from tests import mock_data
-from modules.pokeapi import PokeAPIWrapper
+from modules import (
+    cache,
+    circuitbreaker,
+    jsoncodec,
+    refresh,
+    retry,
+    singleflight,
+    speciesindex,
+)
+from modules.pokeapi import (
+    AsyncPokeAPIWrapper,
+    PokeAPIWrapper,
+    not_found_cache,
+    species_cache,
+)
+from modules.species import SpeciesRecord
 
 
 class TestPokeAPIWrapper(unittest.TestCase):
     def setUp(self):
         self.poke = PokeAPIWrapper()
+        speciesindex.index.clear()
+        species_cache.clear()
+        not_found_cache.clear()
+        # Coalesce within this process, whatever the environment, such as the
+        # Docker image, configures
+        patcher = patch.object(singleflight.group, "lock_dir", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        singleflight.group.reset()
+        circuitbreaker.pokeapi.reset()
+        retry.policy.reset()
 
     def test_build_pokeapi_url(self):
         """
@@ -20,7 +51,7 @@ class TestPokeAPIWrapper(unittest.TestCase):
         url = self.poke._build_pokeapi_url("pokemon/test")
         self.assertEqual(url, f"{PokeAPIWrapper.POKEAPI_URL}/pokemon/test")
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_send_pokeapi_get_404(self, mock_get):
         """
         Tests the correct response is given when a 404 is returned
@@ -31,7 +62,7 @@ class TestPokeAPIWrapper(unittest.TestCase):
         self.assertEqual(result["message"], "Error: Not Found")
         self.assertEqual(status, 404)
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_send_pokeapi_get_exception(self, mock_get):
         """
         Tests the correct response is given when an exception is raised
@@ -44,14 +75,103 @@ class TestPokeAPIWrapper(unittest.TestCase):
         )
         self.assertEqual(status, 500)
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
+    def test_send_pokeapi_get_only_key(self, mock_get):
+        """
+        Tests a response can be streamed for a single top level key, without
+        parsing the whole document
+        """
+        body = json.dumps(mock_data.get_mewtwo).encode("utf-8")
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.iter_content.return_value = iter(
+            [body[:1000], body[1000:]]
+        )
+        result, status = self.poke._send_pokeapi_get(
+            "/pokemon/mewtwo", only_key="species"
+        )
+        self.assertEqual(result, {"species": mock_data.get_mewtwo["species"]})
+        self.assertEqual(status, 200)
+        self.assertTrue(mock_get.call_args[1]["stream"])
+        mock_get.return_value.json.assert_not_called()
+
+        mock_get.return_value.iter_content.return_value = iter([b'{"a": 1}'])
+        result, status = self.poke._send_pokeapi_get(
+            "/pokemon/missingno", only_key="species"
+        )
+        self.assertEqual(
+            result["message"],
+            "Error: Bad response received from remote server",
+        )
+        self.assertEqual(status, 500)
+
+    @patch("time.sleep")
+    @patch("requests.Session.get")
+    def test_send_pokeapi_get_retry(self, mock_get, mock_sleep):
+        """
+        Tests transient failures are retried after a backoff and every
+        attempt is timed
+        """
+        response = MagicMock(status_code=200)
+        response.content = jsoncodec.dumps({"name": "mewtwo"})
+        mock_get.side_effect = [ConnectTimeout(), response]
+        result, status = self.poke._send_pokeapi_get("/pokemon/mewtwo")
+        self.assertEqual(result, {"name": "mewtwo"})
+        self.assertEqual(status, 200)
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertEqual(mock_sleep.call_count, 1)
+        stats = retry.policy.stats()["pokeapi"]
+        self.assertEqual(stats["retries"], 1)
+        self.assertEqual(stats["attempts"]["1"]["count"], 1)
+        self.assertEqual(stats["attempts"]["2"]["count"], 1)
+
+    @patch("time.sleep")
+    @patch("requests.Session.get")
+    def test_send_pokeapi_get_retry_budget(self, mock_get, mock_sleep):
+        """
+        Tests failures are not retried once the retry budget is spent, and
+        that responses such as a 404 are never retried
+        """
+        mock_get.return_value.status_code = 404
+        self.poke._send_pokeapi_get("/pokemon/test")
+        self.assertEqual(mock_get.call_count, 1)
+
+        mock_get.reset_mock()
+        mock_get.side_effect = ConnectTimeout
+        while retry.budget.withdraw():
+            pass
+        result, status = self.poke._send_pokeapi_get("/pokemon/test")
+        self.assertEqual(status, 500)
+        self.assertEqual(mock_get.call_count, 1)
+        mock_sleep.assert_not_called()
+        self.assertEqual(retry.policy.stats()["pokeapi"]["budgetExhausted"], 1)
+
+    @patch("requests.Session.get")
+    def test_send_pokeapi_get_circuit_open(self, mock_get):
+        """
+        Tests requests fail fast without reaching Pokeapi.co once enough of
+        them failed to open the circuit
+        """
+        mock_get.side_effect = ConnectTimeout
+        for _ in range(circuitbreaker.pokeapi.min_calls):
+            self.poke._send_pokeapi_get("/pokemon/test")
+        mock_get.reset_mock()
+        result, status = self.poke._send_pokeapi_get("/pokemon/test")
+        self.assertEqual(
+            result["message"],
+            "Error: Pokeapi.co is unavailable, please try again later",
+        )
+        self.assertEqual(status, 503)
+        mock_get.assert_not_called()
+        self.assertEqual(circuitbreaker.pokeapi.stats()["state"], "open")
+
+    @patch("requests.Session.get")
     def test_send_pokeapi_bad_data(self, mock_get):
         """
         Tests the correct response is given when bad data is received from the
         API
         """
         mock_get.return_value.status_code = 200
-        mock_get.return_value.json.side_effect = Exception
+        mock_get.return_value.content = b"not json"
         result, status = self.poke._send_pokeapi_get("/pokemon/test")
         self.assertEqual(
             result["message"],
@@ -59,13 +179,13 @@ class TestPokeAPIWrapper(unittest.TestCase):
         )
         self.assertEqual(status, 500)
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_send_pokeapi_get_success(self, mock_get):
         """
         Tests the correct response is given when a good request is made
         """
         mock_get.return_value.status_code = 200
-        mock_get.return_value.json.return_value = mock_data.get_mewtwo
+        mock_get.return_value.content = jsoncodec.dumps(mock_data.get_mewtwo)
         result, status = self.poke._send_pokeapi_get("/pokemon/mewtwo")
         self.assertEqual(result, mock_data.get_mewtwo)
         self.assertEqual(status, 200)
@@ -116,6 +236,107 @@ class TestPokeAPIWrapper(unittest.TestCase):
         self.assertEqual(result["description"], "Some description")
         self.assertEqual(status, 200)
 
+    @patch("modules.pokeapi.PokeAPIWrapper.get_pokemon_species_by_id")
+    @patch("modules.pokeapi.PokeAPIWrapper._send_pokeapi_get")
+    def test_get_pokemon_species_by_name_indexed(
+        self, mock_send_get, mock_get_species
+    ):
+        """
+        Tests a name found in the species index skips the /pokemon/ lookup
+        and a looked up name is added to the index
+        """
+        mock_send_get.return_value = mock_data.get_mewtwo, 200
+        mock_get_species.return_value = {
+            "name": "mewtwo",
+            "habitat": "rare",
+            "isLegendary": True,
+            "description": "It was created by a scientist.",
+        }, 200
+        self.poke.get_pokemon_species_by_name("Mewtwo")
+        mock_send_get.assert_called_once_with(
+            "/pokemon/mewtwo", only_key="species"
+        )
+        self.assertEqual(speciesindex.index.get("mewtwo"), 150)
+
+        result, status = self.poke.get_pokemon_species_by_name("mewtwo")
+        mock_send_get.assert_called_once()
+        mock_get_species.assert_called_with(150)
+        self.assertEqual(result["name"], "mewtwo")
+        self.assertEqual(status, 200)
+
+    @patch("modules.pokeapi.PokeAPIWrapper.crawl_species")
+    @patch("modules.pokeapi.PokeAPIWrapper._send_pokeapi_get")
+    def test_seed_species_index(self, mock_send_get, mock_crawl):
+        """
+        Tests the species index is seeded with the varieties of every
+        species, not the species names
+        """
+        mock_send_get.return_value = {
+            "count": 2,
+            "results": [
+                {
+                    "name": "deoxys",
+                    "url": "https://pokeapi.co/api/v2/pokemon-species/386/",
+                },
+                {
+                    "name": "mewtwo",
+                    "url": "https://pokeapi.co/api/v2/pokemon-species/150/",
+                },
+            ],
+        }, 200
+        varieties = {
+            150: ["mewtwo", "mewtwo-mega-x"],
+            386: ["deoxys-normal", "deoxys-attack"],
+        }
+        mock_crawl.side_effect = lambda sid: (
+            {"species": {}, "varieties": varieties[sid]},
+            200,
+        )
+        result, status = self.poke.seed_species_index()
+        self.assertEqual(result, {"seeded": 4})
+        self.assertEqual(status, 200)
+        self.assertEqual(speciesindex.index.get("deoxys-normal"), 386)
+        self.assertEqual(speciesindex.index.get("mewtwo-mega-x"), 150)
+        self.assertEqual(speciesindex.index.get("mewtwo"), 150)
+        self.assertIsNone(speciesindex.index.get("deoxys"))
+
+        speciesindex.index.clear()
+        mock_crawl.side_effect = lambda sid: (
+            ({"species": {}, "varieties": varieties[sid]}, 200)
+            if sid == 150
+            else ({"message": "Error"}, 503)
+        )
+        result, status = self.poke.seed_species_index()
+        self.assertEqual(status, 503)
+        self.assertEqual(result["seeded"], 2)
+        self.assertEqual(result["failed"], [386])
+        self.assertEqual(speciesindex.index.get("mewtwo"), 150)
+
+    @patch("modules.pokeapi.PokeAPIWrapper._send_pokeapi_get")
+    def test_list_species(self, mock_send_get):
+        """
+        Tests every species name is mapped to its ID without touching the
+        species index
+        """
+        mock_send_get.return_value = {
+            "count": 1,
+            "results": [
+                {
+                    "name": "mewtwo",
+                    "url": "https://pokeapi.co/api/v2/pokemon-species/150/",
+                },
+            ],
+        }, 200
+        result, status = self.poke.list_species()
+        self.assertEqual(result, {"species": {"mewtwo": 150}})
+        self.assertEqual(status, 200)
+        self.assertIsNone(speciesindex.index.get("mewtwo"))
+
+        mock_send_get.return_value = {"results": [{"name": "x"}]}, 200
+        result, status = self.poke.list_species()
+        self.assertEqual(result, {"message": "Error: Failed to parse data"})
+        self.assertEqual(status, 500)
+
     @patch("modules.pokeapi.PokeAPIWrapper._send_pokeapi_get")
     def test_get_pokemon_species_by_id_bad_api_response(self, mock_send_get):
         """
@@ -156,3 +377,411 @@ class TestPokeAPIWrapper(unittest.TestCase):
             "splicing and DNA engineering experiments.",
         )
         self.assertEqual(status, 200)
+
+    @patch("modules.pokeapi.PokeAPIWrapper._send_pokeapi_get")
+    def test_crawl_species(self, mock_send_get):
+        """
+        Tests crawling a species caches it and lists its variety names
+        """
+        mock_send_get.return_value = mock_data.get_mewtwo_species, 200
+        result, status = self.poke.crawl_species(150)
+        self.assertEqual(status, 200)
+        self.assertEqual(result["species"]["name"], "mewtwo")
+        self.assertEqual(
+            result["varieties"], ["mewtwo", "mewtwo-mega-x", "mewtwo-mega-y"]
+        )
+        self.assertIsNotNone(species_cache.get(("id", 150)))
+        mock_send_get.return_value = {"name": "mewtwo"}, 200
+        result, status = self.poke.crawl_species(150)
+        self.assertEqual(status, 500)
+        mock_send_get.return_value = {"message": "Error: Not Found"}, 404
+        result, status = self.poke.crawl_species(150)
+        self.assertEqual(status, 404)
+
+    @patch("modules.pokeapi.PokeAPIWrapper._send_pokeapi_get")
+    def test_get_pokemon_species_by_id_cached(self, mock_send_get):
+        """
+        Tests a cached species is returned without calling the API and that
+        callers cannot modify the cached record
+        """
+        mock_send_get.return_value = mock_data.get_mewtwo_species, 200
+        result, status = self.poke.get_pokemon_species_by_id(150)
+        result["description"] = "Modified by the caller"
+        result, status = self.poke.get_pokemon_species_by_id(150)
+        mock_send_get.assert_called_once()
+        self.assertEqual(result["name"], "mewtwo")
+        self.assertNotEqual(result["description"], "Modified by the caller")
+        self.assertEqual(status, 200)
+        self.assertEqual(species_cache.stats()["hits"], 1)
+
+    @patch("modules.pokeapi.PokeAPIWrapper._send_pokeapi_get")
+    def test_get_pokemon_species_by_name_cached(self, mock_send_get):
+        """
+        Tests a cached Pokemon name is returned without calling the API, and
+        shares its record with the cached ID when the cache is in memory
+        """
+        mock_send_get.side_effect = [
+            (mock_data.get_mewtwo, 200),
+            (mock_data.get_mewtwo_species, 200),
+        ]
+        self.poke.get_pokemon_species_by_name("mewtwo")
+        result, status = self.poke.get_pokemon_species_by_name("MEWTWO")
+        self.assertEqual(mock_send_get.call_count, 2)
+        self.assertEqual(result["name"], "mewtwo")
+        self.assertEqual(status, 200)
+        by_id = species_cache.get(("id", 150))
+        by_name = species_cache.get(("name", "mewtwo"))
+        self.assertEqual(by_name, by_id)
+        if isinstance(species_cache, cache.SQLiteCache):
+            # The shared backend keeps species as JSON and reads back Dicts
+            self.assertIsInstance(by_name, dict)
+        else:
+            self.assertIsInstance(by_name, SpeciesRecord)
+            self.assertIs(by_name.description, by_id.description)
+
+    @patch("requests.Session.get")
+    def test_send_pokeapi_get_coalesced(self, mock_get):
+        """
+        Tests concurrent requests for the same path share one upstream request
+        """
+        release = threading.Event()
+
+        def slow_get(*args, **kwargs):
+            release.wait()
+            return mock_get.return_value
+
+        mock_get.side_effect = slow_get
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.content = jsoncodec.dumps(mock_data.get_mewtwo)
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(
+                    self.poke._send_pokeapi_get("/pokemon/mewtwo")
+                )
+            )
+            for _ in range(3)
+        ]
+        for thread in threads:
+            thread.start()
+        while singleflight.group.stats()["coalesced"] < 2:
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+        mock_get.assert_called_once()
+        self.assertEqual(results, [(mock_data.get_mewtwo, 200)] * 3)
+
+    @patch("modules.pokeapi.PokeAPIWrapper._send_pokeapi_get")
+    def test_get_pokemon_species_by_name_not_found_cached(self, mock_send_get):
+        """
+        Tests an unknown Pokemon name is remembered without touching the
+        species cache
+        """
+        send_pokeapi_get_response = {"message": "Error: Not Found"}
+        mock_send_get.return_value = send_pokeapi_get_response, 404
+        self.poke.get_pokemon_species_by_name("missingno")
+        result, status = self.poke.get_pokemon_species_by_name("MissingNo")
+        mock_send_get.assert_called_once()
+        self.assertEqual(result, send_pokeapi_get_response)
+        self.assertEqual(status, 404)
+        self.assertEqual(species_cache.stats()["entries"], 0)
+
+    @patch("modules.pokeapi.PokeAPIWrapper._send_pokeapi_get")
+    def test_get_pokemon_species_by_name_error_not_cached(self, mock_send_get):
+        """
+        Tests upstream failures other than not found are not remembered
+        """
+        send_pokeapi_get_response = {
+            "message": "Error: Failed to retrieve data, please try again later"
+        }
+        mock_send_get.return_value = send_pokeapi_get_response, 500
+        self.poke.get_pokemon_species_by_name("mewtwo")
+        self.poke.get_pokemon_species_by_name("mewtwo")
+        self.assertEqual(mock_send_get.call_count, 2)
+
+    @patch("modules.pokeapi.PokeAPIWrapper._send_pokeapi_get")
+    def test_get_pokemon_species_by_id_stale(self, mock_send_get):
+        """
+        Tests a stale species is returned immediately and refreshed in the
+        background, and kept when the refresh fails
+        """
+        species_cache.set(("id", 150), {"name": "old mewtwo"}, ttl=-1)
+        mock_send_get.return_value = {"message": "Error: It broke!"}, 500
+        result, status = self.poke.get_pokemon_species_by_id(150)
+        refresh.refresher.wait(5)
+        self.assertEqual(result, {"name": "old mewtwo"})
+        self.assertEqual(status, 200)
+        mock_send_get.assert_called_once_with("/pokemon-species/150/")
+
+        result, status = self.poke.get_pokemon_species_by_id(150)
+        refresh.refresher.wait(5)
+        self.assertEqual(result, {"name": "old mewtwo"})
+        self.assertEqual(status, 200)
+
+        mock_send_get.return_value = mock_data.get_mewtwo_species, 200
+        self.poke.get_pokemon_species_by_id(150)
+        refresh.refresher.wait(5)
+        result, status = self.poke.get_pokemon_species_by_id(150)
+        self.assertEqual(result["name"], "mewtwo")
+        self.assertEqual(mock_send_get.call_count, 3)
+
+    @patch("modules.pokeapi.PokeAPIWrapper._send_pokeapi_get")
+    def test_get_pokemon_species_by_name_stale(self, mock_send_get):
+        """
+        Tests a stale species cached under a name is refreshed in the
+        background
+        """
+        speciesindex.index.add("mewtwo", 150)
+        species_cache.set(("name", "mewtwo"), {"name": "old mewtwo"}, ttl=-1)
+        mock_send_get.return_value = mock_data.get_mewtwo_species, 200
+        result, status = self.poke.get_pokemon_species_by_name("mewtwo")
+        refresh.refresher.wait(5)
+        self.assertEqual(result, {"name": "old mewtwo"})
+        mock_send_get.assert_called_once_with("/pokemon-species/150/")
+        result, status = self.poke.get_pokemon_species_by_name("mewtwo")
+        self.assertEqual(result["name"], "mewtwo")
+        self.assertEqual(status, 200)
+
+
+class TestAsyncPokeAPIWrapper(unittest.TestCase):
+    def setUp(self):
+        self.poke = AsyncPokeAPIWrapper()
+        self.loop = asyncio.new_event_loop()
+        speciesindex.index.clear()
+        species_cache.clear()
+        not_found_cache.clear()
+        singleflight.async_group.reset()
+        circuitbreaker.pokeapi.reset()
+        retry.policy.reset()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_send_pokeapi_get_success(self):
+        """
+        Tests the correct response is given when a good non-blocking request
+        is made
+        """
+        response = MagicMock(status_code=200)
+        response.content = jsoncodec.dumps(mock_data.get_mewtwo)
+
+        async def fake_get(pool, url, **kwargs):
+            return response
+
+        with patch("modules.sessions.AsyncSessionPool.get", new=fake_get):
+            result, status = self.loop.run_until_complete(
+                self.poke._send_pokeapi_get("/pokemon/mewtwo")
+            )
+        self.assertEqual(result, mock_data.get_mewtwo)
+        self.assertEqual(status, 200)
+
+    def test_send_pokeapi_get_exception(self):
+        """
+        Tests the correct response is given when a non-blocking request fails
+        """
+
+        async def fake_get(pool, url, **kwargs):
+            raise httpx.ConnectTimeout("timed out")
+
+        with patch("modules.sessions.AsyncSessionPool.get", new=fake_get):
+            result, status = self.loop.run_until_complete(
+                self.poke._send_pokeapi_get("/pokemon/mewtwo")
+            )
+        self.assertEqual(
+            result["message"],
+            "Error: Failed to retrieve data, please try again later",
+        )
+        self.assertEqual(status, 500)
+
+    def test_send_pokeapi_get_coalesced(self):
+        """
+        Tests concurrent coroutines requesting the same path share a single
+        upstream request
+        """
+        calls = []
+        response = MagicMock(status_code=200)
+        response.content = jsoncodec.dumps(mock_data.get_mewtwo)
+
+        async def fake_get(pool, url, **kwargs):
+            calls.append(url)
+            await asyncio.sleep(0.01)
+            return response
+
+        async def fetch_many():
+            return await asyncio.gather(
+                *[
+                    self.poke._send_pokeapi_get("/pokemon/mewtwo")
+                    for _ in range(5)
+                ]
+            )
+
+        with patch("modules.sessions.AsyncSessionPool.get", new=fake_get):
+            results = self.loop.run_until_complete(fetch_many())
+        self.assertEqual(len(calls), 1)
+        for result, status in results:
+            self.assertEqual(result, mock_data.get_mewtwo)
+            self.assertEqual(status, 200)
+        self.assertEqual(singleflight.async_group.stats()["coalesced"], 4)
+
+    def test_send_pokeapi_get_only_key(self):
+        """
+        Tests a non-blocking response can be streamed for a single top level
+        key
+        """
+        body = json.dumps(mock_data.get_mewtwo).encode("utf-8")
+        calls = []
+
+        async def fake_get(pool, url, stream=False, **kwargs):
+            calls.append(stream)
+            return httpx.Response(200, content=body)
+
+        with patch("modules.sessions.AsyncSessionPool.get", new=fake_get):
+            result, status = self.loop.run_until_complete(
+                self.poke._send_pokeapi_get(
+                    "/pokemon/mewtwo", only_key="species"
+                )
+            )
+        self.assertEqual(result, {"species": mock_data.get_mewtwo["species"]})
+        self.assertEqual(status, 200)
+        self.assertEqual(calls, [True])
+
+    def test_get_pokemon_species_by_name_good(self):
+        """
+        Tests getting a pokemon without blocking returns a good response and
+        caches it
+        """
+        responses = {
+            "/pokemon/mewtwo": (mock_data.get_mewtwo, 200),
+            "/pokemon-species/150/": (mock_data.get_mewtwo_species, 200),
+        }
+        calls = []
+
+        async def fake_send(wrapper, path, only_key=None):
+            calls.append(path)
+            return responses[path]
+
+        with patch(
+            "modules.pokeapi.AsyncPokeAPIWrapper._send_pokeapi_get",
+            new=fake_send,
+        ):
+            result, status = self.loop.run_until_complete(
+                self.poke.get_pokemon_species_by_name("MewTwo")
+            )
+            cached, cached_status = self.loop.run_until_complete(
+                self.poke.get_pokemon_species_by_name("mewtwo")
+            )
+        self.assertEqual(status, 200)
+        self.assertEqual(result["name"], "mewtwo")
+        self.assertEqual(result["habitat"], "rare")
+        self.assertEqual(result["isLegendary"], True)
+        self.assertEqual(cached, result)
+        self.assertEqual(cached_status, 200)
+        self.assertEqual(calls, ["/pokemon/mewtwo", "/pokemon-species/150/"])
+        self.assertEqual(speciesindex.index.get("mewtwo"), 150)
+
+    def test_list_species(self):
+        """
+        Tests the async wrapper lists every species without blocking
+        """
+
+        async def fake_send(wrapper, path, only_key=None):
+            return {
+                "results": [
+                    {
+                        "name": "mewtwo",
+                        "url": "https://pokeapi.co/api/v2/"
+                        "pokemon-species/150/",
+                    },
+                ],
+            }, 200
+
+        with patch(
+            "modules.pokeapi.AsyncPokeAPIWrapper._send_pokeapi_get",
+            new=fake_send,
+        ):
+            result, status = self.loop.run_until_complete(
+                self.poke.list_species()
+            )
+        self.assertEqual(result, {"species": {"mewtwo": 150}})
+        self.assertEqual(status, 200)
+
+    def test_seed_species_index(self):
+        """
+        Tests the async wrapper seeds the species index with the varieties
+        of every species
+        """
+
+        async def fake_send(wrapper, path, only_key=None):
+            if path.startswith("/pokemon-species/?"):
+                return {
+                    "results": [
+                        {
+                            "name": "mewtwo",
+                            "url": "https://pokeapi.co/api/v2/"
+                            "pokemon-species/150/",
+                        },
+                    ],
+                }, 200
+            return mock_data.get_mewtwo_species, 200
+
+        with patch(
+            "modules.pokeapi.AsyncPokeAPIWrapper._send_pokeapi_get",
+            new=fake_send,
+        ):
+            result, status = self.loop.run_until_complete(
+                self.poke.seed_species_index()
+            )
+        self.assertEqual(result, {"seeded": 3})
+        self.assertEqual(status, 200)
+        self.assertEqual(speciesindex.index.get("mewtwo-mega-y"), 150)
+
+    def test_blocking_caches_offloaded(self):
+        """
+        Tests caches that may block are used from the offload threads
+        """
+        threads = []
+        get_entry = species_cache.get_entry
+
+        def record_thread(key):
+            threads.append(threading.get_ident())
+            return get_entry(key)
+
+        mewtwo = {
+            "name": "mewtwo",
+            "habitat": "rare",
+            "isLegendary": True,
+            "description": "It was created by a scientist.",
+        }
+        species_cache.set(("id", 150), SpeciesRecord.from_dict(mewtwo))
+        with patch.object(species_cache, "blocking", True):
+            with patch.object(species_cache, "get_entry", new=record_thread):
+                result, status = self.loop.run_until_complete(
+                    self.poke.get_pokemon_species_by_id(150)
+                )
+        self.assertEqual(status, 200)
+        self.assertEqual(result, mewtwo)
+        self.assertEqual(len(threads), 1)
+        self.assertNotIn(threading.get_ident(), threads)
+
+    def test_get_pokemon_species_by_name_not_found(self):
+        """
+        Tests an unknown pokemon is reported and remembered without blocking
+        """
+        calls = []
+
+        async def fake_send(wrapper, path, only_key=None):
+            calls.append(path)
+            return {"message": "Error: Not Found"}, 404
+
+        with patch(
+            "modules.pokeapi.AsyncPokeAPIWrapper._send_pokeapi_get",
+            new=fake_send,
+        ):
+            for _ in range(2):
+                result, status = self.loop.run_until_complete(
+                    self.poke.get_pokemon_species_by_name("missingno")
+                )
+                self.assertEqual(result, {"message": "Error: Not Found"})
+                self.assertEqual(status, 404)
+        self.assertEqual(len(calls), 1)
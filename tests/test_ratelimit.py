@@ -0,0 +1,119 @@
+import os
+import asyncio
+import tempfile
+import unittest
+
+from modules.ratelimit import TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        """
+        Initialise the clock
+        """
+        self.now = 1000.0
+        self.slept = []
+
+    def __call__(self):
+        """
+        Gets the current fake time
+        :return: Number of the current fake time
+        """
+        return self.now
+
+    def sleep(self, seconds):
+        """
+        Records a sleep and moves the fake time forward
+        :param seconds: Number of seconds to sleep for
+        """
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+class TestTokenBucket(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def build(self, **kwargs):
+        """
+        Builds a bucket driven by the fake clock
+        :return: TokenBucket
+        """
+        return TokenBucket(clock=self.clock, sleep=self.clock.sleep, **kwargs)
+
+    def test_burst_then_refill(self):
+        """
+        Tests the burst is granted straight away and tokens are then added at
+        the configured rate
+        """
+        bucket = self.build(rate=1, burst=3)
+        for _ in range(3):
+            self.assertTrue(bucket.acquire())
+        self.assertFalse(bucket.acquire())
+        self.clock.now += 1
+        self.assertTrue(bucket.acquire())
+        self.assertEqual(self.clock.slept, [])
+        stats = bucket.stats()
+        self.assertEqual(stats["granted"], 4)
+        self.assertEqual(stats["rejected"], 1)
+
+    def test_queue_waits_for_token(self):
+        """
+        Tests callers queue in turn for future tokens within their deadline
+        """
+        bucket = self.build(rate=2, burst=1, max_waiting=2)
+        self.assertEqual(bucket.reserve(5), 0)
+        self.assertEqual(bucket.reserve(5), 0.5)
+        self.assertEqual(bucket.reserve(5), 1.0)
+        # The queue is full
+        self.assertIsNone(bucket.reserve(5))
+        self.assertEqual(bucket.stats()["queued"], 2)
+
+    def test_queue_deadline(self):
+        """
+        Tests callers are refused straight away when the next token would
+        arrive after their deadline
+        """
+        bucket = self.build(rate=0.1, burst=1, max_waiting=5)
+        self.assertTrue(bucket.acquire(1))
+        self.assertFalse(bucket.acquire(1))
+        self.assertTrue(bucket.acquire(10))
+        self.assertEqual(self.clock.slept, [10])
+
+    def test_disabled(self):
+        """
+        Tests a rate of 0 never limits requests
+        """
+        bucket = self.build(rate=0, burst=1)
+        for _ in range(10):
+            self.assertTrue(bucket.acquire())
+
+    def test_async_acquire(self):
+        """
+        Tests tokens can be taken without blocking the event loop
+        """
+        bucket = self.build(rate=1000, burst=1, max_waiting=1)
+        loop = asyncio.new_event_loop()
+        try:
+            self.assertTrue(loop.run_until_complete(bucket.async_acquire(1)))
+            self.assertTrue(loop.run_until_complete(bucket.async_acquire(1)))
+            self.assertFalse(loop.run_until_complete(bucket.async_acquire(0)))
+        finally:
+            loop.close()
+
+    def test_shared_between_workers(self):
+        """
+        Tests buckets using the same file share their tokens
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "bucket.json")
+            first = self.build(rate=1, burst=2, path=path)
+            second = self.build(rate=1, burst=2, path=path)
+            self.assertTrue(first.acquire())
+            self.assertTrue(second.acquire())
+            self.assertFalse(first.acquire())
+            self.assertFalse(second.acquire())
+            self.clock.now += 1
+            self.assertTrue(second.acquire())
+            first.reset()
+            self.assertTrue(first.acquire())
@@ -0,0 +1,80 @@
+import os
+import time
+import threading
+import unittest
+
+from unittest.mock import patch
+
+from modules.refresh import BackgroundRefresher
+
+
+class TestBackgroundRefresher(unittest.TestCase):
+    def setUp(self):
+        self.refresher = BackgroundRefresher(max_workers=2)
+
+    def test_submit_runs_in_background(self):
+        """
+        Tests submitted refreshes are run
+        """
+        calls = []
+        self.assertTrue(self.refresher.submit("a", lambda: calls.append(1)))
+        self.refresher.wait(5)
+        self.assertEqual(calls, [1])
+        self.assertEqual(self.refresher.stats()["pending"], 0)
+
+    def test_submit_deduplicated(self):
+        """
+        Tests a key is not refreshed twice while a refresh is pending
+        """
+        release = threading.Event()
+        self.assertTrue(self.refresher.submit("a", release.wait))
+        self.assertFalse(self.refresher.submit("a", release.wait))
+        release.set()
+        self.refresher.wait(5)
+        self.assertTrue(self.refresher.submit("a", lambda: None))
+        self.refresher.wait(5)
+        stats = self.refresher.stats()
+        self.assertEqual(stats["scheduled"], 2)
+        self.assertEqual(stats["deduplicated"], 1)
+
+    def test_submit_failure_recorded(self):
+        """
+        Tests a failed refresh is counted rather than raised
+        """
+
+        def fail():
+            raise ValueError("It broke!")
+
+        self.refresher.submit("a", fail)
+        self.refresher.wait(5)
+        self.assertEqual(self.refresher.stats()["failed"], 1)
+
+    def test_executor_rebuilt_after_fork(self):
+        """
+        Tests a forked process does not reuse the parent's threads, nor wait
+        on the refreshes pending in the parent
+        """
+        release = threading.Event()
+        self.refresher.submit("a", release.wait)
+        executor = self.refresher._threads.get()
+        try:
+            with patch("os.getpid", return_value=os.getpid() + 1):
+                self.assertTrue(self.refresher.submit("a", lambda: None))
+                self.assertIsNot(self.refresher._threads.get(), executor)
+        finally:
+            release.set()
+        self.refresher.wait(5)
+
+    def test_shutdown(self):
+        """
+        Tests shutting down waits for pending refreshes and stops the
+        threads, a later refresh starts new ones
+        """
+        calls = []
+        self.refresher.submit("a", lambda: time.sleep(0.05) or calls.append(1))
+        self.refresher.shutdown()
+        self.assertEqual(calls, [1])
+        self.assertIsNone(self.refresher._threads._executor)
+        self.refresher.submit("b", lambda: calls.append(2))
+        self.refresher.wait(5)
+        self.assertEqual(calls, [1, 2])
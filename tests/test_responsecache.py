@@ -0,0 +1,225 @@
+import unittest
+
+from modules import cache, funtranslations, jsoncodec, pokeapi, species
+from modules.funtranslations import TranslationLanguage, TranslationMode
+from modules.responsecache import (
+    EncodedResponse,
+    ResponseCache,
+    pokemon_key,
+    species_sources,
+    translated_key,
+    translated_sources,
+    translation_sources,
+)
+
+MEWTWO = {
+    "name": "mewtwo",
+    "habitat": "rare",
+    "isLegendary": True,
+    "description": "It was created by a scientist.",
+}
+
+
+class TestEncodedResponse(unittest.TestCase):
+    def test_from_result(self):
+        """
+        Tests the body, ETag and length are worked out from the response data
+        """
+        encoded = EncodedResponse.from_result(MEWTWO)
+        self.assertEqual(encoded.body, jsoncodec.dumps(MEWTWO) + b"\n")
+        self.assertEqual(encoded.content_length, len(encoded.body))
+        self.assertTrue(encoded.etag.startswith('"'))
+        self.assertTrue(encoded.etag.endswith('"'))
+        self.assertEqual(
+            encoded.etag, EncodedResponse.from_result(dict(MEWTWO)).etag
+        )
+        self.assertNotEqual(
+            encoded.etag,
+            EncodedResponse.from_result(dict(MEWTWO, habitat="cave")).etag,
+        )
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        self.source = cache.LRUCache(
+            max_entries=4, ttl=60, clock=lambda: self.now
+        )
+        self.responses = ResponseCache(max_entries=4)
+        self.responses._cache._clock = lambda: self.now
+
+    def test_store_and_get(self):
+        """
+        Tests a stored response is served until its source entry changes
+        """
+        self.source.set("key", "value")
+        sources = ((self.source, "key"),)
+        stored = self.responses.store(("pokemon", "mewtwo"), MEWTWO, sources)
+        self.assertIs(self.responses.get(("pokemon", "mewtwo")), stored)
+        self.source.set("key", "changed")
+        self.assertIsNone(self.responses.get(("pokemon", "mewtwo")))
+        self.assertEqual(self.responses.stats()["invalidations"], 1)
+        self.assertEqual(self.responses.stats()["entries"], 0)
+
+        self.responses.store(("pokemon", "mewtwo"), MEWTWO, sources)
+        self.source.clear()
+        self.assertIsNone(self.responses.get(("pokemon", "mewtwo")))
+
+    def test_get_never_reads_sources(self):
+        """
+        Tests a hit is served without looking up its source entries
+        """
+        self.source.set("key", "value")
+        stored = self.responses.store(
+            ("pokemon", "mewtwo"), MEWTWO, ((self.source, "key"),)
+        )
+        for _ in range(3):
+            self.assertIs(self.responses.get(("pokemon", "mewtwo")), stored)
+        self.assertEqual(self.source.stats()["hits"], 0)
+        self.assertEqual(self.source.stats()["misses"], 0)
+
+    def test_expires_with_source(self):
+        """
+        Tests a stored response is dropped once its source entry goes stale
+        """
+        self.source.set("key", "value")
+        self.now += 40
+        self.responses.store(
+            ("pokemon", "mewtwo"), MEWTWO, ((self.source, "key"),)
+        )
+        self.now += 19
+        self.assertIsNotNone(self.responses.get(("pokemon", "mewtwo")))
+        self.now += 1
+        self.assertIsNone(self.responses.get(("pokemon", "mewtwo")))
+
+        # An entry that is already stale leaves nothing to keep
+        self.responses.store(
+            ("pokemon", "mewtwo"), MEWTWO, ((self.source, "key"),)
+        )
+        self.assertIsNone(self.responses.get(("pokemon", "mewtwo")))
+
+    def test_store_without_sources(self):
+        """
+        Tests a response that is not tied to cache entries is encoded but not
+        kept
+        """
+        encoded = self.responses.store(("pokemon", "mewtwo"), MEWTWO, None)
+        self.assertEqual(encoded.body, jsoncodec.dumps(MEWTWO) + b"\n")
+        self.assertIsNone(self.responses.get(("pokemon", "mewtwo")))
+
+    def test_clear(self):
+        """
+        Tests clearing drops every response and resets the statistics
+        """
+        self.responses.store(("pokemon", "mewtwo"), MEWTWO, ())
+        self.responses.clear()
+        self.assertIsNone(self.responses.get(("pokemon", "mewtwo")))
+        self.assertEqual(self.responses.stats()["invalidations"], 0)
+        self.assertEqual(self.responses.stats()["entries"], 0)
+
+    def test_keys(self):
+        """
+        Tests the keys are built from the normalised name and mode
+        """
+        self.assertEqual(pokemon_key("MewTwo"), ("pokemon", "mewtwo"))
+        self.assertEqual(
+            translated_key(" MewTwo", TranslationMode.LOCAL),
+            ("translated", "mewtwo", "local"),
+        )
+
+
+class TestSources(unittest.TestCase):
+    def setUp(self):
+        pokeapi.species_cache.clear()
+        funtranslations.translation_cache.clear()
+
+    def tearDown(self):
+        pokeapi.species_cache.clear()
+        funtranslations.translation_cache.clear()
+
+    def test_species_sources(self):
+        """
+        Tests a species response is tied to the species cache entry it was
+        built from, and only when the entry matches it
+        """
+        self.assertIsNone(species_sources("mewtwo", MEWTWO))
+        record = species.SpeciesRecord.from_dict(MEWTWO)
+        pokeapi.species_cache.set(("name", "mewtwo"), record)
+        self.assertEqual(
+            species_sources("MewTwo", MEWTWO),
+            ((pokeapi.species_cache, ("name", "mewtwo")),),
+        )
+        self.assertIsNone(
+            species_sources("mewtwo", dict(MEWTWO, habitat="cave"))
+        )
+
+    def test_translation_sources(self):
+        """
+        Tests only translations held in the translation cache are tied to
+        it, local translations need no entry
+        """
+        description = MEWTWO["description"]
+        self.assertEqual(
+            translation_sources(
+                TranslationLanguage.YODA,
+                description,
+                "Created, it was",
+                TranslationMode.LOCAL,
+            ),
+            (),
+        )
+        self.assertIsNone(
+            translation_sources(
+                TranslationLanguage.YODA,
+                description,
+                "Created, it was",
+                TranslationMode.REMOTE,
+            )
+        )
+        key = funtranslations.translation_cache_key(
+            description, TranslationLanguage.YODA
+        )
+        funtranslations.translation_cache.set(key, "Created, it was")
+        self.assertEqual(
+            translation_sources(
+                TranslationLanguage.YODA,
+                description,
+                "Created, it was",
+                TranslationMode.REMOTE,
+            ),
+            ((funtranslations.translation_cache, key),),
+        )
+        self.assertIsNone(
+            translation_sources(
+                TranslationLanguage.YODA,
+                description,
+                "A fallback translation",
+                TranslationMode.REMOTE,
+            )
+        )
+
+    def test_translated_sources(self):
+        """
+        Tests a translated response needs its species entry as well
+        """
+        self.assertIsNone(
+            translated_sources(
+                "mewtwo",
+                MEWTWO,
+                TranslationLanguage.YODA,
+                "Created, it was",
+                TranslationMode.LOCAL,
+            )
+        )
+        record = species.SpeciesRecord.from_dict(MEWTWO)
+        pokeapi.species_cache.set(("name", "mewtwo"), record)
+        self.assertEqual(
+            translated_sources(
+                "mewtwo",
+                MEWTWO,
+                TranslationLanguage.YODA,
+                "Created, it was",
+                TranslationMode.LOCAL,
+            ),
+            ((pokeapi.species_cache, ("name", "mewtwo")),),
+        )
@@ -0,0 +1,85 @@
+import unittest
+
+from modules.retry import RetryBudget, RetryPolicy
+
+
+class TestRetryBudget(unittest.TestCase):
+    def test_budget(self):
+        """
+        Tests every request earns a share of a retry, up to the reserve
+        """
+        budget = RetryBudget(ratio=0.1, reserve=2)
+        self.assertTrue(budget.withdraw())
+        self.assertTrue(budget.withdraw())
+        self.assertFalse(budget.withdraw())
+        for _ in range(9):
+            budget.deposit()
+        self.assertFalse(budget.withdraw())
+        budget.deposit()
+        self.assertTrue(budget.withdraw())
+        for _ in range(100):
+            budget.deposit()
+        self.assertEqual(budget.tokens(), 2)
+
+
+class TestRetryPolicy(unittest.TestCase):
+    def build(self, **kwargs):
+        """
+        Builds a policy always drawing the longest backoff
+        :return: RetryPolicy
+        """
+        return RetryPolicy(
+            RetryBudget(ratio=0.1, reserve=10),
+            max_attempts=3,
+            base_delay=0.1,
+            max_delay=0.3,
+            random=lambda: 1.0,
+            **kwargs
+        )
+
+    def test_backoff(self):
+        """
+        Tests the backoff doubles with every attempt up to the maximum and
+        is jittered
+        """
+        policy = self.build()
+        self.assertEqual(policy.backoff(0), 0.1)
+        self.assertEqual(policy.backoff(1), 0.2)
+        self.assertEqual(policy.backoff(2), 0.3)
+        jittered = RetryPolicy(RetryBudget(), random=lambda: 0.5)
+        self.assertEqual(jittered.backoff(0), 0.025)
+
+    def test_next_delay(self):
+        """
+        Tests attempts are retried until the attempt limit, the deadline or
+        the budget runs out
+        """
+        policy = self.build()
+        self.assertEqual(policy.next_delay("pokeapi", 0), 0.1)
+        self.assertEqual(policy.next_delay("pokeapi", 1), 0.2)
+        self.assertIsNone(policy.next_delay("pokeapi", 2))
+        self.assertIsNone(policy.next_delay("pokeapi", 0, time_left=0.05))
+        while policy.budget.withdraw():
+            pass
+        self.assertIsNone(policy.next_delay("pokeapi", 0))
+        stats = policy.stats()["pokeapi"]
+        self.assertEqual(stats["retries"], 2)
+        self.assertEqual(stats["budgetExhausted"], 1)
+
+    def test_record_attempt(self):
+        """
+        Tests the timings of every attempt are reported
+        """
+        policy = self.build()
+        policy.record_attempt("pokeapi", 0, 0.1)
+        policy.record_attempt("pokeapi", 0, 0.3)
+        policy.record_attempt("pokeapi", 1, 0.5)
+        self.assertEqual(
+            policy.stats()["pokeapi"]["attempts"],
+            {
+                "1": {"count": 2, "avgSeconds": 0.2, "maxSeconds": 0.3},
+                "2": {"count": 1, "avgSeconds": 0.5, "maxSeconds": 0.5},
+            },
+        )
+        policy.reset()
+        self.assertEqual(policy.stats(), {"budget": 10})
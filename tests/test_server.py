@@ -1,7 +1,9 @@
 import unittest
 
 from unittest.mock import patch
-from server import app
+from server import app, output_encoded
+from modules import httpcache, hotkeys, pokeapi, responsecache, species
+from modules.funtranslations import FunTranslationsBase
 
 
 class PokemonTests(unittest.TestCase):
@@ -9,6 +11,17 @@ class PokemonTests(unittest.TestCase):
         app.config["TESTING"] = True
         app.config["WTF_CSRF_ENABLED"] = False
         self.app = app.test_client()
+        # Keep the hot set in memory, whatever the environment, such as the
+        # Docker image, configures
+        patcher = patch.object(hotkeys.tracker, "_path", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        hotkeys.tracker.reset()
+        responsecache.responses.clear()
+        pokeapi.species_cache.clear()
+
+    def tearDown(self):
+        pokeapi.species_cache.clear()
 
     @patch("modules.pokeapi.PokeAPIWrapper.get_pokemon_species_by_name")
     def test_pokemon_get(self, mock_get_pokemon):
@@ -37,6 +50,95 @@ class PokemonTests(unittest.TestCase):
         pokemon_json = response.json
         self.assertEqual(pokemon_json, result)
 
+    @patch("modules.pokeapi.PokeAPIWrapper.get_pokemon_species_by_name")
+    def test_pokemon_get_records_hot_keys(self, mock_get_pokemon):
+        """
+        Tests only Pokemon that were found are recorded as hot keys
+        """
+        mock_get_pokemon.return_value = ({"name": "mewtwo"}, 200)
+        self.app.get("/pokemon/MewTwo")
+        mock_get_pokemon.return_value = ({"message": "Error: Not Found"}, 404)
+        self.app.get("/pokemon/missingno")
+        self.assertEqual(
+            hotkeys.tracker.hot_keys(),
+            {hotkeys.SPECIES: ["mewtwo"], hotkeys.TRANSLATED: []},
+        )
+
+    @patch("modules.pokeapi.PokeAPIWrapper.get_pokemon_species_by_name")
+    def test_pokemon_get_encoded_response_cached(self, mock_get_pokemon):
+        """
+        Tests a species response is encoded once, with its ETag and length,
+        and encoded again once the cached species changes
+        """
+        result = {
+            "name": "mewtwo",
+            "habitat": "rare",
+            "isLegendary": True,
+            "description": "Some description",
+        }
+        mock_get_pokemon.return_value = (result, 200)
+        pokeapi.species_cache.set(
+            ("name", "mewtwo"), species.SpeciesRecord.from_dict(result)
+        )
+        first = self.app.get("/pokemon/mewtwo")
+        second = self.app.get("/pokemon/MewTwo")
+        self.assertEqual(mock_get_pokemon.call_count, 1)
+        self.assertEqual(second.json, result)
+        self.assertEqual(second.headers["ETag"], first.headers["ETag"])
+        self.assertEqual(
+            second.headers["Content-Length"], str(len(second.data))
+        )
+
+        changed = dict(result, description="A new description")
+        mock_get_pokemon.return_value = (changed, 200)
+        pokeapi.species_cache.set(
+            ("name", "mewtwo"), species.SpeciesRecord.from_dict(changed)
+        )
+        third = self.app.get("/pokemon/mewtwo")
+        self.assertEqual(mock_get_pokemon.call_count, 2)
+        self.assertEqual(third.json, changed)
+        self.assertNotEqual(third.headers["ETag"], first.headers["ETag"])
+
+    @patch("modules.pokeapi.PokeAPIWrapper.get_pokemon_species_by_name")
+    def test_pokemon_get_not_modified(self, mock_get_pokemon):
+        """
+        Tests a client sending the ETag it holds gets a 304 without a body,
+        along with the caching headers of the route
+        """
+        result = {
+            "name": "mewtwo",
+            "habitat": "rare",
+            "isLegendary": True,
+            "description": "Some description",
+        }
+        mock_get_pokemon.return_value = (result, 200)
+        pokeapi.species_cache.set(
+            ("name", "mewtwo"), species.SpeciesRecord.from_dict(result)
+        )
+        first = self.app.get("/pokemon/mewtwo")
+        self.assertEqual(
+            first.headers["Cache-Control"], httpcache.POKEMON_CACHE_CONTROL
+        )
+        etag = first.headers["ETag"]
+        response = self.app.get(
+            "/pokemon/mewtwo", headers={"If-None-Match": etag}
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b"")
+        self.assertEqual(response.headers["ETag"], etag)
+        # The test client adds its own default type, so check the response
+        # the app builds
+        encoded = responsecache.responses.get(("pokemon", "mewtwo"))
+        with app.test_request_context(headers={"If-None-Match": etag}):
+            response = output_encoded(encoded, httpcache.POKEMON_CACHE_CONTROL)
+        self.assertEqual(response.status_code, 304)
+        self.assertNotIn("Content-Type", response.headers)
+        response = self.app.get(
+            "/pokemon/mewtwo", headers={"If-None-Match": '"other"'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, result)
+
     @patch(
         "modules.funtranslations.FunTranslationsAPIWrapper."
         "translate_shakespeare"
@@ -139,3 +241,214 @@ class PokemonTests(unittest.TestCase):
         mock_yoda.assert_called()
         self.assertEqual(response.status_code, poke_status_code)
         self.assertEqual(response.json, poke_result)
+
+    def test_metrics_get(self):
+        """
+        Tests the metrics endpoint reports the registry snapshot
+        """
+        response = self.app.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("counters", response.json)
+        self.assertIn("connections", response.json)
+
+    @patch("modules.pokeapi.PokeAPIWrapper.get_pokemon_species_by_name")
+    def test_pokemon_batch_get(self, mock_get_pokemon):
+        """
+        Tests the batch endpoint returns every Pokemon's result and status
+        code in the order requested, looking each one up by name like the
+        single Pokemon endpoint, numbers included
+        """
+        results = {
+            "mewtwo": ({"name": "mewtwo"}, 200),
+            "missingno": ({"message": "Error: Not Found"}, 404),
+            "25": ({"name": "pikachu"}, 200),
+        }
+        mock_get_pokemon.side_effect = lambda name: results[name]
+        response = self.app.get("/pokemon?names=Mewtwo,missingno,25,mewtwo")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json["results"],
+            [
+                {
+                    "name": "mewtwo",
+                    "status": 200,
+                    "result": {"name": "mewtwo"},
+                },
+                {
+                    "name": "missingno",
+                    "status": 404,
+                    "result": {"message": "Error: Not Found"},
+                },
+                {"name": "25", "status": 200, "result": {"name": "pikachu"}},
+                {
+                    "name": "mewtwo",
+                    "status": 200,
+                    "result": {"name": "mewtwo"},
+                },
+            ],
+        )
+        self.assertEqual(mock_get_pokemon.call_count, 3)
+        self.assertEqual(
+            hotkeys.tracker.hot_keys(),
+            {hotkeys.SPECIES: ["mewtwo", "25"], hotkeys.TRANSLATED: []},
+        )
+
+    def test_pokemon_batch_get_no_names(self):
+        """
+        Tests the batch endpoint rejects requests without any names
+        """
+        response = self.app.get("/pokemon")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json, {"message": "Error: No Pokemon names given"}
+        )
+
+    @patch(
+        "modules.funtranslations.FunTranslationsAPIWrapper."
+        "translate_shakespeare"
+    )
+    @patch("modules.funtranslations.FunTranslationsAPIWrapper.translate_yoda")
+    @patch("modules.pokeapi.PokeAPIWrapper.get_pokemon_species_by_name")
+    def test_pokemon_translated_batch_get(
+        self, mock_get_pokemon, mock_yoda, mock_shakespeare
+    ):
+        """
+        Tests the translated batch endpoint picks the correct translator for
+        each Pokemon and translates each distinct description only once
+        """
+        species = {
+            "zubat": {"habitat": "cave", "isLegendary": False},
+            "golbat": {"habitat": "cave", "isLegendary": False},
+            "pikachu": {"habitat": "forest", "isLegendary": False},
+        }
+
+        def get_pokemon(name):
+            if name not in species:
+                return {"message": "Error: Not Found"}, 404
+            return dict(species[name], name=name, description="hello"), 200
+
+        mock_get_pokemon.side_effect = get_pokemon
+        mock_yoda.return_value = {"translation": "hello, yoda"}, 200
+        mock_shakespeare.return_value = {"translation": "hello, bard"}, 200
+        response = self.app.get(
+            "/pokemon/translated?names=zubat,golbat,pikachu,missingno"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [
+                (
+                    item["name"],
+                    item["status"],
+                    item["result"].get("description"),
+                )
+                for item in response.json["results"]
+            ],
+            [
+                ("zubat", 200, "hello, yoda"),
+                ("golbat", 200, "hello, yoda"),
+                ("pikachu", 200, "hello, bard"),
+                ("missingno", 404, None),
+            ],
+        )
+        mock_yoda.assert_called_once_with("hello")
+        mock_shakespeare.assert_called_once_with("hello")
+
+    @patch(
+        "modules.funtranslations.FunTranslationsAPIWrapper."
+        "translate_shakespeare"
+    )
+    @patch("modules.funtranslations.FunTranslationsAPIWrapper.translate_yoda")
+    @patch("modules.pokeapi.PokeAPIWrapper.get_pokemon_species_by_name")
+    def test_pokemon_translated_batch_get_skipped(
+        self, mock_get_pokemon, mock_yoda, mock_shakespeare
+    ):
+        """
+        Tests the translated batch endpoint only marks the Pokemon whose
+        translation ran out of latency budget as skipped
+        """
+        habitats = {"zubat": "cave", "pikachu": "forest"}
+        mock_get_pokemon.side_effect = lambda name: (
+            {
+                "name": name,
+                "habitat": habitats[name],
+                "isLegendary": False,
+                "description": "hi",
+            },
+            200,
+        )
+        mock_yoda.return_value = {"message": "Error: Latency"}, 504
+        mock_shakespeare.return_value = {"message": "Error: Rate"}, 429
+        response = self.app.get("/pokemon/translated?names=zubat,pikachu")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [
+                item["result"].get("translationSkipped")
+                for item in response.json["results"]
+            ],
+            [True, None],
+        )
+
+    @patch("modules.funtranslations.FunTranslationsAPIWrapper.translate_yoda")
+    @patch("modules.pokeapi.PokeAPIWrapper.get_pokemon_species_by_name")
+    def test_pokemon_translated_get_local(self, mock_get_pokemon, mock_yoda):
+        """
+        Tests the local mode translates without calling funtranslations.com
+        """
+        mock_get_pokemon.return_value = {
+            "name": "mewtwo",
+            "habitat": "rare",
+            "isLegendary": True,
+            "description": "It was created by a scientist.",
+        }, 200
+        response = self.app.get("/pokemon/translated/mewtwo?mode=local")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json["description"], "Created by a scientist, it was."
+        )
+        mock_yoda.assert_not_called()
+
+        response = self.app.get("/pokemon/translated/mewtwo?mode=telepathy")
+        self.assertEqual(response.status_code, 400)
+
+    @patch("requests.Session.get")
+    @patch("modules.pokeapi.PokeAPIWrapper.get_pokemon_species_by_name")
+    def test_pokemon_translated_get_budget_exhausted(
+        self, mock_get_pokemon, mock_get
+    ):
+        """
+        Tests the untranslated description is returned, marked as skipped,
+        when the latency budget runs out before translating
+        """
+        poke_result = {
+            "name": "mewtwo",
+            "habitat": "rare",
+            "isLegendary": True,
+            "description": "A budget test description.",
+        }
+        mock_get_pokemon.return_value = (dict(poke_result), 200)
+        # The budget takes precedence over the local fallback
+        with patch.object(FunTranslationsBase, "LOCAL_FALLBACK", True):
+            response = self.app.get(
+                "/pokemon/translated/mewtwo",
+                headers={"X-Latency-Budget": "0"},
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json, dict(poke_result, translationSkipped=True)
+        )
+        mock_get.assert_not_called()
+        self.assertEqual(response.headers["Cache-Control"], "no-cache")
+        self.assertTrue(response.headers["ETag"].startswith('"'))
+        response = self.app.get(
+            "/pokemon/translated/mewtwo",
+            headers={
+                "X-Latency-Budget": "0",
+                "If-None-Match": response.headers["ETag"],
+            },
+        )
+        self.assertEqual(response.status_code, 304)
+
+        response = self.app.get(
+            "/pokemon/translated/mewtwo", headers={"X-Latency-Budget": "soon"}
+        )
+        self.assertEqual(response.status_code, 400)
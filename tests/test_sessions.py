@@ -0,0 +1,112 @@
+import os
+import asyncio
+import unittest
+import requests
+
+from unittest.mock import patch, MagicMock
+
+from modules import timeouts
+from modules.sessions import AsyncSessionPool, SessionPool
+
+
+class TestSessionPool(unittest.TestCase):
+    def setUp(self):
+        self.pool = SessionPool()
+
+    def test_get_session_per_host(self):
+        """
+        Tests a single session is shared per upstream host
+        """
+        first = self.pool.get_session("https://pokeapi.co/api/v2/pokemon/1")
+        second = self.pool.get_session("https://pokeapi.co/api/v2/pokemon/2")
+        other = self.pool.get_session("https://api.funtranslations.com/x")
+        self.assertIs(first, second)
+        self.assertIsNot(first, other)
+
+    def test_get_session_pool_size(self):
+        """
+        Tests the session adapter is sized from the pool configuration
+        """
+        session = self.pool.get_session("https://pokeapi.co/api/v2")
+        adapter = session.get_adapter("https://pokeapi.co")
+        self.assertEqual(adapter._pool_maxsize, SessionPool.POOL_MAXSIZE)
+        self.assertEqual(adapter._pool_block, SessionPool.POOL_BLOCK)
+
+    def test_get_session_after_fork(self):
+        """
+        Tests sessions inherited from a parent process are not reused
+        """
+        first = self.pool.get_session("https://pokeapi.co/api/v2")
+        with patch("os.getpid", return_value=os.getpid() + 1):
+            second = self.pool.get_session("https://pokeapi.co/api/v2")
+        self.assertIsNot(first, second)
+
+    @patch("requests.Session.get")
+    def test_get_uses_session(self, mock_get):
+        """
+        Tests requests are sent through the pooled session
+        """
+        mock_get.return_value = MagicMock(status_code=200)
+        response = self.pool.get("https://pokeapi.co/api/v2", timeout=1)
+        mock_get.assert_called_with("https://pokeapi.co/api/v2", timeout=1)
+        self.assertEqual(response.status_code, 200)
+
+    @patch("requests.Session.get")
+    def test_get_records_latency(self, mock_get):
+        """
+        Tests the latency of every request is recorded against its host, even
+        when it fails
+        """
+        timeouts.latency.reset()
+        mock_get.return_value = MagicMock(status_code=200)
+        self.pool.get("https://pokeapi.co/api/v2/pokemon/1")
+        mock_get.side_effect = requests.exceptions.ConnectTimeout()
+        with self.assertRaises(requests.exceptions.ConnectTimeout):
+            self.pool.get("https://pokeapi.co/api/v2/pokemon/2")
+        self.assertEqual(timeouts.latency.count("https://pokeapi.co"), 2)
+
+    def test_stats(self):
+        """
+        Tests connection reuse is reported per host
+        """
+        session = self.pool.get_session("https://pokeapi.co/api/v2")
+        adapter = session.get_adapter("https://pokeapi.co")
+        conn_pool = adapter.poolmanager.connection_from_url(
+            "https://pokeapi.co"
+        )
+        conn_pool.num_requests = 10
+        conn_pool.num_connections = 2
+        stats = self.pool.stats()["https://pokeapi.co"]
+        self.assertEqual(stats["requests"], 10)
+        self.assertEqual(stats["connections"], 2)
+        self.assertEqual(stats["reused"], 8)
+        self.assertEqual(stats["reuseRatio"], 0.8)
+
+
+class TestAsyncSessionPool(unittest.TestCase):
+    def setUp(self):
+        self.pool = AsyncSessionPool()
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.loop.run_until_complete(self.pool.close())
+        self.loop.close()
+
+    def test_get_connect_read_timeout(self):
+        """
+        Tests requests style (connect, read) timeouts are given to httpx
+        """
+        calls = []
+
+        async def fake_get(client, url, **kwargs):
+            calls.append(kwargs)
+            return MagicMock(status_code=200)
+
+        with patch("httpx.AsyncClient.get", new=fake_get):
+            self.loop.run_until_complete(
+                self.pool.get("https://pokeapi.co/api/v2", timeout=(3, 7))
+            )
+        timeout = calls[0]["timeout"]
+        self.assertEqual(timeout.connect, 3)
+        self.assertEqual(timeout.read, 7)
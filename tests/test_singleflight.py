@@ -0,0 +1,265 @@
+import os
+import time
+import fcntl
+import asyncio
+import hashlib
+import tempfile
+import threading
+import unittest
+
+from modules.singleflight import AsyncSingleFlight, SingleFlight, request_key
+
+
+class TestSingleFlight(unittest.TestCase):
+    def setUp(self):
+        self.group = SingleFlight()
+
+    def wait_for_coalesced(self, group, count):
+        """
+        Waits until the given number of callers are waiting on a leader
+        """
+        deadline = time.monotonic() + 5
+        while group.stats()["coalesced"] < count:
+            if time.monotonic() > deadline:
+                self.fail("Callers were never coalesced")
+            time.sleep(0.001)
+
+    def test_request_key(self):
+        """
+        Tests request keys ignore the order of the parameters
+        """
+        self.assertEqual(request_key("https://x/y"), "https://x/y")
+        self.assertEqual(
+            request_key("https://x/y", {"b": "2", "a": "1"}),
+            request_key("https://x/y", {"a": "1", "b": "2"}),
+        )
+        self.assertNotEqual(
+            request_key("https://x/y", {"text": "hello"}),
+            request_key("https://x/y", {"text": "world"}),
+        )
+
+    def test_do_coalesces_concurrent_calls(self):
+        """
+        Tests concurrent callers with the same key share a single call
+        """
+        release = threading.Event()
+        calls = []
+        results = []
+
+        def fetch():
+            calls.append(1)
+            release.wait()
+            return {"name": "mewtwo"}, 200
+
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(self.group.do("key", fetch))
+            )
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        self.wait_for_coalesced(self.group, 4)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [({"name": "mewtwo"}, 200)] * 5)
+        self.assertEqual(self.group.stats()["leaders"], 1)
+        self.assertEqual(self.group.stats()["inFlight"], 0)
+
+    def test_do_sequential_calls_not_shared(self):
+        """
+        Tests calls that do not overlap each run the function
+        """
+        calls = []
+        self.group.do("key", lambda: calls.append(1))
+        self.group.do("key", lambda: calls.append(1))
+        self.assertEqual(len(calls), 2)
+
+    def test_do_error_shared(self):
+        """
+        Tests an error raised by the leader is raised for every waiter
+        """
+        release = threading.Event()
+        errors = []
+
+        def fetch():
+            release.wait()
+            raise ValueError("It broke!")
+
+        def call():
+            try:
+                self.group.do("key", fetch)
+            except ValueError as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=call) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        self.wait_for_coalesced(self.group, 2)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(errors), 3)
+
+    def test_do_follower_times_out(self):
+        """
+        Tests a caller waiting on a request in flight gives up once its own
+        timeout passes, while the leader carries on
+        """
+        release = threading.Event()
+        results = []
+
+        def fetch():
+            release.wait()
+            return {"name": "mewtwo"}, 200
+
+        leader = threading.Thread(
+            target=lambda: results.append(self.group.do("key", fetch))
+        )
+        leader.start()
+        while self.group.stats()["inFlight"] == 0:
+            time.sleep(0.001)
+        start = time.monotonic()
+        result = self.group.do(
+            "key",
+            fetch,
+            timeout=0.05,
+            on_timeout=lambda: ({"message": "Out of time"}, 504),
+        )
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(result, ({"message": "Out of time"}, 504))
+        self.assertEqual(self.group.stats()["timedOut"], 1)
+        with self.assertRaises(TimeoutError):
+            self.group.do("key", fetch, timeout=0)
+        release.set()
+        leader.join()
+        self.assertEqual(results, [({"name": "mewtwo"}, 200)])
+
+    def test_do_shared_lock_times_out(self):
+        """
+        Tests a caller waiting on the host wide lock held by another worker
+        gives up once its own timeout passes
+        """
+        with tempfile.TemporaryDirectory() as lock_dir:
+            group = SingleFlight(lock_dir, result_ttl=60)
+            lock_path = os.path.join(lock_dir, f"{group_digest('key')}.lock")
+            with open(lock_path, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                result = group.do(
+                    "key",
+                    lambda: ({"name": "mewtwo"}, 200),
+                    timeout=0.05,
+                    on_timeout=lambda: ({"message": "Out of time"}, 504),
+                )
+            self.assertEqual(result, ({"message": "Out of time"}, 504))
+            self.assertEqual(group.stats()["inFlight"], 0)
+
+    def test_do_shared_across_processes(self):
+        """
+        Tests a result written by another worker is reused while fresh
+        """
+        with tempfile.TemporaryDirectory() as lock_dir:
+            worker_one = SingleFlight(lock_dir, result_ttl=60)
+            worker_two = SingleFlight(lock_dir, result_ttl=60)
+            result = worker_one.do("key", lambda: ({"name": "mewtwo"}, 200))
+            shared = worker_two.do("key", lambda: ({"name": "other"}, 200))
+            self.assertEqual(result, ({"name": "mewtwo"}, 200))
+            self.assertEqual(shared, ({"name": "mewtwo"}, 200))
+            self.assertEqual(worker_two.stats()["shared"], 1)
+
+            expired = SingleFlight(lock_dir, result_ttl=-1)
+            fresh = expired.do("key", lambda: ({"name": "other"}, 200))
+            self.assertEqual(fresh, ({"name": "other"}, 200))
+
+    def test_do_shared_lock_wait_bounded(self):
+        """
+        Tests a caller without a deadline sends its own request once the
+        host wide lock has been held too long
+        """
+        with tempfile.TemporaryDirectory() as lock_dir:
+            group = SingleFlight(lock_dir, result_ttl=60, lock_timeout=0.05)
+            lock_path = os.path.join(lock_dir, f"{group_digest('key')}.lock")
+            with open(lock_path, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                result = group.do("key", lambda: ({"name": "mewtwo"}, 200))
+            self.assertEqual(result, ({"name": "mewtwo"}, 200))
+            self.assertEqual(group.stats()["lockTimeouts"], 1)
+
+    def test_do_shared_errors_not_shared(self):
+        """
+        Tests only successful and not found results are reused by other
+        workers
+        """
+        with tempfile.TemporaryDirectory() as lock_dir:
+            worker_one = SingleFlight(lock_dir, result_ttl=60)
+            worker_two = SingleFlight(lock_dir, result_ttl=60)
+            worker_one.do("error", lambda: ({"message": "Error"}, 503))
+            result = worker_two.do("error", lambda: ({"name": "mewtwo"}, 200))
+            self.assertEqual(result, ({"name": "mewtwo"}, 200))
+
+            worker_one.do("missing", lambda: ({"message": "Not Found"}, 404))
+            result = worker_two.do("missing", lambda: ({"name": "other"}, 200))
+            self.assertEqual(result, ({"message": "Not Found"}, 404))
+            self.assertEqual(worker_two.stats()["shared"], 1)
+
+    def test_sweep(self):
+        """
+        Tests sweeping removes only old lock and result files
+        """
+        with tempfile.TemporaryDirectory() as lock_dir:
+            group = SingleFlight(lock_dir, result_ttl=1)
+            group.do("old", lambda: ({}, 200))
+            group.do("new", lambda: ({}, 200))
+            for name in os.listdir(lock_dir):
+                if name.startswith(group_digest("old")):
+                    os.utime(os.path.join(lock_dir, name), (0, 0))
+            group.sweep()
+            remaining = os.listdir(lock_dir)
+            self.assertEqual(len(remaining), 2)
+            self.assertTrue(
+                all(name.startswith(group_digest("new")) for name in remaining)
+            )
+
+
+class TestAsyncSingleFlight(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.group = AsyncSingleFlight()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_do_follower_times_out(self):
+        """
+        Tests a coroutine waiting on a request in flight gives up once its
+        own timeout passes, while the leader carries on
+        """
+
+        async def fetch():
+            await asyncio.sleep(0.2)
+            return {"name": "mewtwo"}, 200
+
+        async def run():
+            leader = asyncio.ensure_future(self.group.do("key", fetch))
+            await asyncio.sleep(0)
+            follower = await self.group.do(
+                "key",
+                fetch,
+                timeout=0.01,
+                on_timeout=lambda: ({"message": "Out of time"}, 504),
+            )
+            return follower, await leader
+
+        follower, leader = self.loop.run_until_complete(run())
+        self.assertEqual(follower, ({"message": "Out of time"}, 504))
+        self.assertEqual(leader, ({"name": "mewtwo"}, 200))
+        self.assertEqual(self.group.stats()["timedOut"], 1)
+
+
+def group_digest(key):
+    """
+    Gets the file name prefix used for a key in the shared directory
+    """
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
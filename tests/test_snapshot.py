@@ -0,0 +1,260 @@
+import os
+import time
+import asyncio
+import tempfile
+import unittest
+
+from http import HTTPStatus
+from unittest.mock import patch
+
+from modules import snapshot
+from modules.pokeapi import AsyncPokeAPIWrapper, PokeAPIBase, PokeAPIWrapper
+from modules.snapshot import (
+    Snapshot,
+    SnapshotBuilder,
+    open_snapshot,
+    write_snapshot,
+)
+
+MEWTWO = {
+    "name": "mewtwo",
+    "habitat": "rare",
+    "isLegendary": True,
+    "description": "It was created by a scientist.",
+}
+BULBASAUR = {
+    "name": "bulbasaur",
+    "habitat": "grassland",
+    "isLegendary": False,
+    "description": "A strange seed was planted on its back at birth.",
+}
+MEWTWO_CRAWL = {
+    "species": MEWTWO,
+    "varieties": ["mewtwo", "mewtwo-mega-x", "mewtwo-mega-y"],
+}
+BULBASAUR_CRAWL = {"species": BULBASAUR, "varieties": ["bulbasaur"]}
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "pokedex.snapshot")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_lookup(self):
+        """
+        Tests species are found by ID, name and alias
+        """
+        write_snapshot(
+            self.path,
+            {150: MEWTWO, 1: BULBASAUR},
+            {
+                "mewtwo": 150,
+                "bulbasaur": 1,
+                "mewtwo-mega-x": 150,
+                "eevee": 133,
+            },
+        )
+        store = Snapshot(self.path)
+        self.assertEqual(store.get_by_id(150), MEWTWO)
+        self.assertEqual(store.get_by_id(1), BULBASAUR)
+        self.assertIsNone(store.get_by_id(133))
+        self.assertEqual(store.get_by_name(" MewTwo "), MEWTWO)
+        self.assertEqual(store.get_by_name("mewtwo-mega-x"), MEWTWO)
+        self.assertIsNone(store.get_by_name("eevee"))
+        self.assertIsNone(store.get_by_name("missingno"))
+        stats = store.stats()
+        self.assertEqual(stats["records"], 2)
+        self.assertEqual(stats["names"], 3)
+        self.assertEqual(stats["hits"], 4)
+        self.assertEqual(stats["misses"], 3)
+        store.close()
+
+    def test_lookup_is_fast(self):
+        """
+        Tests lookups in a snapshot of every species stay well under a
+        millisecond
+        """
+        records = {
+            species_id: dict(MEWTWO, name=f"pokemon-{species_id}")
+            for species_id in range(1, 1026)
+        }
+        names = {record["name"]: sid for sid, record in records.items()}
+        write_snapshot(self.path, records, names)
+        store = Snapshot(self.path)
+        start = time.perf_counter()
+        for species_id in range(1, 1026):
+            self.assertEqual(
+                store.get_by_name(f"pokemon-{species_id}"),
+                records[species_id],
+            )
+        self.assertLess((time.perf_counter() - start) / 1025, 0.001)
+        store.close()
+
+    def test_invalid_file(self):
+        """
+        Tests files that are not snapshots of this version are refused
+        """
+        with open(self.path, "wb") as snapshot_file:
+            snapshot_file.write(b"not a snapshot at all")
+        with self.assertRaises(ValueError):
+            Snapshot(self.path)
+        write_snapshot(self.path, {150: MEWTWO}, {"mewtwo": 150})
+        with patch.object(snapshot, "VERSION", 2):
+            with self.assertRaises(ValueError):
+                Snapshot(self.path)
+        with self.assertRaises(RuntimeError):
+            open_snapshot(os.path.join(self.temp_dir.name, "missing"))
+        self.assertIsNone(open_snapshot(None))
+
+
+class TestSnapshotBuilder(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "pokedex.snapshot")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_build(self):
+        """
+        Tests every species is fetched and written to the snapshot
+        """
+        records = {1: BULBASAUR_CRAWL, 150: MEWTWO_CRAWL}
+        builder = SnapshotBuilder(
+            self.path, lambda sid: (records[sid], HTTPStatus.OK)
+        )
+        result, status = builder.build(
+            {"bulbasaur": 1, "mewtwo": 150}, aliases={"mewtwo-mega-y": 150}
+        )
+        self.assertEqual(status, HTTPStatus.OK)
+        self.assertEqual(result, {"records": 2, "resumed": 0, "names": 4})
+        self.assertFalse(os.path.exists(builder.checkpoint_path))
+        store = Snapshot(self.path)
+        self.assertEqual(store.get_by_name("mewtwo-mega-y"), MEWTWO)
+        self.assertEqual(store.get_by_name("mewtwo-mega-x"), MEWTWO)
+        store.close()
+
+    def test_build_variety_names(self):
+        """
+        Tests species are served under the names of their varieties, not a
+        species name Pokeapi.co has no Pokemon for
+        """
+        giratina = dict(MEWTWO, name="giratina")
+        crawled = {
+            "species": giratina,
+            "varieties": ["giratina-altered", "giratina-origin"],
+        }
+        builder = SnapshotBuilder(
+            self.path, lambda sid: (crawled, HTTPStatus.OK)
+        )
+        result, status = builder.build({"giratina": 487})
+        self.assertEqual(status, HTTPStatus.OK)
+        store = Snapshot(self.path)
+        self.assertEqual(store.get_by_name("giratina-altered"), giratina)
+        self.assertEqual(store.get_by_name("Giratina-Origin"), giratina)
+        self.assertIsNone(store.get_by_name("giratina"))
+        store.close()
+
+    def test_build_resumes(self):
+        """
+        Tests a failed build keeps what it fetched and a later build only
+        fetches the rest
+        """
+        records = {1: BULBASAUR_CRAWL, 150: MEWTWO_CRAWL}
+        fetched = []
+
+        def fetch(species_id):
+            fetched.append(species_id)
+            if species_id == 150 and fetched.count(150) == 1:
+                return {"message": "Error"}, HTTPStatus.SERVICE_UNAVAILABLE
+            return records[species_id], HTTPStatus.OK
+
+        builder = SnapshotBuilder(self.path, fetch, concurrency=1)
+        result, status = builder.build({"bulbasaur": 1, "mewtwo": 150})
+        self.assertEqual(status, HTTPStatus.SERVICE_UNAVAILABLE)
+        self.assertEqual(result["failed"], [150])
+        self.assertFalse(os.path.exists(self.path))
+
+        # A crash part way through writing a line is ignored
+        with open(builder.checkpoint_path, "ab") as checkpoint_file:
+            checkpoint_file.write(b'{"id": 15')
+        result, status = builder.build({"bulbasaur": 1, "mewtwo": 150})
+        self.assertEqual(status, HTTPStatus.OK)
+        self.assertEqual(result["resumed"], 1)
+        self.assertEqual(fetched, [1, 150, 150])
+        store = Snapshot(self.path)
+        self.assertEqual(store.get_by_id(1), BULBASAUR)
+        self.assertEqual(store.get_by_id(150), MEWTWO)
+        store.close()
+
+    def test_build_skips_old_checkpoint(self):
+        """
+        Tests checkpointed species without variety names are fetched again
+        """
+        with open(f"{self.path}.checkpoint", "wb") as checkpoint_file:
+            checkpoint_file.write(b'{"id": 1, "record": {"name": "x"}}\n')
+        builder = SnapshotBuilder(
+            self.path, lambda sid: (BULBASAUR_CRAWL, HTTPStatus.OK)
+        )
+        result, status = builder.build({"bulbasaur": 1})
+        self.assertEqual(status, HTTPStatus.OK)
+        self.assertEqual(result["resumed"], 0)
+        store = Snapshot(self.path)
+        self.assertEqual(store.get_by_name("bulbasaur"), BULBASAUR)
+        store.close()
+
+
+class TestSnapshotServing(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        path = os.path.join(self.temp_dir.name, "pokedex.snapshot")
+        write_snapshot(path, {150: MEWTWO}, {"mewtwo": 150})
+        self.store = Snapshot(path)
+
+    def tearDown(self):
+        self.store.close()
+        self.temp_dir.cleanup()
+
+    @patch("requests.Session.get")
+    def test_served_without_upstream(self, mock_get):
+        """
+        Tests species are answered from the snapshot without any upstream
+        request, unknown ones as not found
+        """
+        with patch.object(snapshot, "store", self.store):
+            with patch.object(PokeAPIBase, "POKEAPI_URL", None):
+                poke = PokeAPIWrapper()
+            result, status = poke.get_pokemon_species_by_name("MewTwo")
+            self.assertEqual(result, MEWTWO)
+            self.assertEqual(status, HTTPStatus.OK)
+            result, status = poke.get_pokemon_species_by_id(150)
+            self.assertEqual(result, MEWTWO)
+            result, status = poke.get_pokemon_species_by_name("missingno")
+            self.assertEqual(result, {"message": "Error: Not Found"})
+            self.assertEqual(status, HTTPStatus.NOT_FOUND)
+        mock_get.assert_not_called()
+
+    def test_served_without_upstream_async(self):
+        """
+        Tests the async wrapper answers from the snapshot too
+        """
+
+        async def fake_get(pool, url, **kwargs):
+            raise AssertionError("No upstream request expected")
+
+        loop = asyncio.new_event_loop()
+        with patch.object(snapshot, "store", self.store):
+            with patch("modules.sessions.AsyncSessionPool.get", new=fake_get):
+                poke = AsyncPokeAPIWrapper()
+                result, status = loop.run_until_complete(
+                    poke.get_pokemon_species_by_name("mewtwo")
+                )
+                self.assertEqual(result, MEWTWO)
+                result, status = loop.run_until_complete(
+                    poke.get_pokemon_species_by_id(1)
+                )
+                self.assertEqual(status, HTTPStatus.NOT_FOUND)
+        loop.close()
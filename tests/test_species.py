@@ -0,0 +1,83 @@
+import unittest
+
+from modules import species
+from modules.species import SpeciesRecord
+
+MEWTWO = {
+    "name": "mewtwo",
+    "habitat": "rare",
+    "isLegendary": True,
+    "description": "It was created by a scientist.",
+}
+
+
+class TestSpeciesRecord(unittest.TestCase):
+    def test_round_trip(self):
+        """
+        Tests a record gives back the species data it was built from, as a
+        fresh Dict every time
+        """
+        record = SpeciesRecord.from_dict(MEWTWO)
+        self.assertEqual(record.to_dict(), MEWTWO)
+        self.assertIsNot(record.to_dict(), record.to_dict())
+        self.assertTrue(record.is_legendary)
+        self.assertFalse(
+            SpeciesRecord.from_dict(dict(MEWTWO, isLegendary=False)).to_dict()[
+                "isLegendary"
+            ]
+        )
+
+    def test_immutable(self):
+        """
+        Tests a record can never be changed or given new attributes
+        """
+        record = SpeciesRecord.from_dict(MEWTWO)
+        with self.assertRaises(AttributeError):
+            record.name = "mew"
+        with self.assertRaises(AttributeError):
+            record.colour = "purple"
+        with self.assertRaises(AttributeError):
+            del record.habitat
+        self.assertFalse(hasattr(record, "__dict__"))
+
+    def test_interned(self):
+        """
+        Tests records share a single copy of each habitat
+        """
+        habitat = "".join(["ra", "re"])
+        first = SpeciesRecord.from_dict(MEWTWO)
+        second = SpeciesRecord.from_dict(dict(MEWTWO, habitat=habitat))
+        self.assertIs(first.habitat, second.habitat)
+
+    def test_equality(self):
+        """
+        Tests records holding the same data are equal and hash alike
+        """
+        first = SpeciesRecord.from_dict(MEWTWO)
+        second = SpeciesRecord.from_dict(dict(MEWTWO))
+        self.assertEqual(first, second)
+        self.assertEqual(hash(first), hash(second))
+        self.assertNotEqual(
+            first, SpeciesRecord.from_dict(dict(MEWTWO, isLegendary=False))
+        )
+        self.assertNotEqual(first, MEWTWO)
+
+    def test_to_dict(self):
+        """
+        Tests cached records and plain Dicts both give a fresh Dict
+        """
+        record = SpeciesRecord.from_dict(MEWTWO)
+        self.assertEqual(species.to_dict(record), MEWTWO)
+        result = species.to_dict(MEWTWO)
+        self.assertEqual(result, MEWTWO)
+        self.assertIsNot(result, MEWTWO)
+
+    def test_measure(self):
+        """
+        Tests a record keeps less memory per species than a plain Dict
+        """
+        records = [
+            dict(MEWTWO, name=f"pokemon-{number}") for number in range(200)
+        ]
+        result = species.measure(records)
+        self.assertLess(result["record"], result["dict"])
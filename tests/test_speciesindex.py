@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+
+from modules.speciesindex import SpeciesIndex, normalise_name
+
+
+class TestSpeciesIndex(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "index.json")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_normalise_name(self):
+        """
+        Tests names are normalised to a single key
+        """
+        self.assertEqual(normalise_name(" MewTwo "), "mewtwo")
+
+    def test_add_and_get(self):
+        """
+        Tests names and aliases resolve to their species ID
+        """
+        index = SpeciesIndex()
+        index.add("Deoxys-Normal", 386)
+        self.assertEqual(index.get("deoxys-normal"), 386)
+        self.assertIsNone(index.get("missingno"))
+
+    def test_persisted(self):
+        """
+        Tests a new index lazily loads the entries persisted by another
+        """
+        SpeciesIndex(self.path).seed({"bulbasaur": 1, "mewtwo": 150})
+        index = SpeciesIndex(self.path)
+        self.assertEqual(len(index), 2)
+        self.assertEqual(index.get("mewtwo"), 150)
+
+    def test_corrupt_file_ignored(self):
+        """
+        Tests a corrupt persisted file is treated as an empty index
+        """
+        with open(self.path, "w") as index_file:
+            index_file.write("not json")
+        index = SpeciesIndex(self.path)
+        self.assertIsNone(index.get("mewtwo"))
+        index.add("mewtwo", 150)
+        index.save()
+        self.assertEqual(SpeciesIndex(self.path).get("mewtwo"), 150)
+
+    def test_clear(self):
+        """
+        Tests clearing empties the in memory index only
+        """
+        index = SpeciesIndex(self.path)
+        index.seed({"mewtwo": 150})
+        index.clear()
+        self.assertIsNone(index.get("mewtwo"))
+        self.assertEqual(SpeciesIndex(self.path).get("mewtwo"), 150)
+
+    def test_items(self):
+        """
+        Tests every name and alias is listed with its species ID
+        """
+        index = SpeciesIndex()
+        index.seed({"Mewtwo": 150, "deoxys-normal": 386})
+        self.assertEqual(
+            sorted(index.items()), [("deoxys-normal", 386), ("mewtwo", 150)]
+        )
+
+    def test_learned_names_saved_in_batches(self):
+        """
+        Tests learned names are only merged into the file every save_every
+        names or when saved explicitly
+        """
+        index = SpeciesIndex(self.path, save_every=2)
+        index.add("mewtwo", 150)
+        self.assertFalse(os.path.exists(self.path))
+        index.add("mewtwo", 150)
+        self.assertFalse(os.path.exists(self.path))
+        index.add("bulbasaur", 1)
+        self.assertEqual(SpeciesIndex(self.path).get("bulbasaur"), 1)
+        index.add("deoxys-normal", 386)
+        self.assertIsNone(SpeciesIndex(self.path).get("deoxys-normal"))
+        index.save()
+        self.assertEqual(SpeciesIndex(self.path).get("deoxys-normal"), 386)
@@ -0,0 +1,113 @@
+import unittest
+
+from modules.timeouts import LatencyTracker, TimeoutPolicy, host_key
+
+POKEAPI_URL = "https://pokeapi.co/api/v2/pokemon-species/1"
+
+
+class TestLatencyTracker(unittest.TestCase):
+    def setUp(self):
+        self.tracker = LatencyTracker(window=100)
+
+    def test_host_key(self):
+        """
+        Tests latency is tracked per scheme and host
+        """
+        self.assertEqual(host_key(POKEAPI_URL), "https://pokeapi.co")
+
+    def test_percentile(self):
+        """
+        Tests percentiles are taken from the recent samples of each host
+        """
+        self.assertIsNone(self.tracker.percentile(POKEAPI_URL, 99))
+        for sample in range(1, 101):
+            self.tracker.observe(POKEAPI_URL, sample / 100)
+        self.assertEqual(self.tracker.percentile(POKEAPI_URL, 50), 0.51)
+        self.assertEqual(self.tracker.percentile(POKEAPI_URL, 99), 1.0)
+        self.assertEqual(self.tracker.count("https://pokeapi.co"), 100)
+        self.assertIsNone(
+            self.tracker.percentile("https://api.funtranslations.com", 50)
+        )
+
+    def test_window(self):
+        """
+        Tests only the most recent samples are kept
+        """
+        for _ in range(100):
+            self.tracker.observe(POKEAPI_URL, 5)
+        for _ in range(100):
+            self.tracker.observe(POKEAPI_URL, 0.1)
+        self.assertEqual(self.tracker.count(POKEAPI_URL), 100)
+        self.assertEqual(self.tracker.percentile(POKEAPI_URL, 99), 0.1)
+
+
+class TestTimeoutPolicy(unittest.TestCase):
+    def setUp(self):
+        self.tracker = LatencyTracker(window=100)
+
+    def build(self, **kwargs):
+        """
+        Builds a policy using the test tracker
+        :return: TimeoutPolicy
+        """
+        return TimeoutPolicy(
+            self.tracker, connect=3.05, read=10, min_samples=10, **kwargs
+        )
+
+    def test_static_timeout(self):
+        """
+        Tests the configured connect and read timeouts are used when the
+        adaptive mode is off
+        """
+        for _ in range(20):
+            self.tracker.observe(POKEAPI_URL, 0.1)
+        policy = self.build()
+        self.assertEqual(policy.timeout(POKEAPI_URL), (3.05, 10))
+
+    def test_adaptive_timeout(self):
+        """
+        Tests the read timeout follows the p99 latency within the floor and
+        ceiling once enough samples were recorded
+        """
+        policy = self.build(adaptive=True, floor=1, ceiling=8, multiplier=2)
+        for _ in range(9):
+            self.tracker.observe(POKEAPI_URL, 1.5)
+        # Not enough samples yet
+        self.assertEqual(policy.read_timeout(POKEAPI_URL), 10)
+        self.tracker.observe(POKEAPI_URL, 1.5)
+        self.assertEqual(policy.timeout(POKEAPI_URL), (3.05, 3))
+
+        self.tracker.reset()
+        for _ in range(10):
+            self.tracker.observe(POKEAPI_URL, 0.05)
+        self.assertEqual(policy.read_timeout(POKEAPI_URL), 1)
+
+        self.tracker.reset()
+        for _ in range(10):
+            self.tracker.observe(POKEAPI_URL, 30)
+        self.assertEqual(policy.read_timeout(POKEAPI_URL), 8)
+
+    def test_timeout_limit(self):
+        """
+        Tests neither timeout exceeds the time the caller has left
+        """
+        policy = self.build()
+        self.assertEqual(policy.timeout(POKEAPI_URL, limit=2), (2, 2))
+
+    def test_stats(self):
+        """
+        Tests the latency and read timeout of each host are reported
+        """
+        for _ in range(10):
+            self.tracker.observe(POKEAPI_URL, 0.5)
+        stats = self.build(adaptive=True).stats()
+        self.assertEqual(
+            stats["https://pokeapi.co"],
+            {
+                "samples": 10,
+                "p50": 0.5,
+                "p95": 0.5,
+                "p99": 0.5,
+                "readTimeout": 1.0,
+            },
+        )